@@ -12,6 +12,7 @@ import logging
 from config import API_TOKEN
 from parser import parse_message_text
 from scheduler import test_ping
+from resources import register_resource, get_resource
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -19,7 +20,7 @@ logger = logging.getLogger(__name__)
 
 # FSM и хранилище
 storage = MemoryStorage()
-bot = Bot(token=API_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+register_resource("aiogram_bot", lambda: Bot(token=API_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML)))
 dp = Dispatcher(storage=storage)
 
 USER_ID_FILE = "user_id.json"
@@ -62,7 +63,11 @@ async def handle_forwarded_message(message: Message):
         "date": message.date
     }
 
-    parse_message_text(message.text, source)
+    try:
+        parse_message_text(message.text, source)
+    except Exception:
+        await message.answer("❌ Не удалось обработать прайс, подробности в логе.")
+        return
     await message.answer("✅ Прайс обработан и сохранён.")
 
 @dp.message(F.text == "/ping")
@@ -71,6 +76,6 @@ async def handle_ping(message: Message):
 
 async def setup_aiogram_bot():
     try:
-        await dp.start_polling(bot)
+        await dp.start_polling(get_resource("aiogram_bot"))
     except Exception as e:
         logger.exception("Ошибка при запуске aiogram бота")
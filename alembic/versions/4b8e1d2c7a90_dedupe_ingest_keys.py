@@ -0,0 +1,111 @@
+"""dedupe ingest keys
+
+Revision ID: 4b8e1d2c7a90
+Revises: 329473a5e82a
+Create Date: 2026-10-18 11:02:41.118204
+
+Убирает дубли по ключам, на которые следующая ревизия строит уникальные
+индексы: (products.standard_id, name), (prices.product_id, message_id),
+(unmatched_models.raw_name, source_channel) и products_cleaned.name_std.
+Выживает строка с наименьшим id, ссылки на дубли переезжают к ней.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b8e1d2c7a90'
+down_revision: Union[str, None] = '329473a5e82a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _table_exists(name: str) -> bool:
+    return op.get_bind().execute(sa.text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Колонки, которые lifespan добавляет на старте, — чтобы слияние unmatched_models не зависело от порядка
+    op.execute("""
+        ALTER TABLE unmatched_models
+            ADD COLUMN IF NOT EXISTS occurrences INTEGER DEFAULT 1,
+            ADD COLUMN IF NOT EXISTS last_seen TIMESTAMP,
+            ADD COLUMN IF NOT EXISTS min_price INTEGER,
+            ADD COLUMN IF NOT EXISTS max_price INTEGER
+    """)
+
+    # 1. products_cleaned.name_std: товары и псевдонимы дублей — к эталону с наименьшим id
+    op.execute("""
+        CREATE TEMP TABLE standard_dupes ON COMMIT DROP AS
+        SELECT id AS loser, MIN(id) OVER (PARTITION BY name_std) AS survivor
+        FROM products_cleaned
+        WHERE name_std IS NOT NULL
+    """)
+    op.execute("DELETE FROM standard_dupes WHERE loser = survivor")
+    op.execute("UPDATE products p SET standard_id = d.survivor FROM standard_dupes d WHERE p.standard_id = d.loser")
+    if _table_exists("product_aliases"):
+        op.execute("UPDATE product_aliases a SET standard_id = d.survivor FROM standard_dupes d WHERE a.standard_id = d.loser")
+    op.execute("DELETE FROM products_cleaned c USING standard_dupes d WHERE c.id = d.loser")
+
+    # 2. products (standard_id, name): цены дублей — к товару с наименьшим id
+    op.execute("""
+        CREATE TEMP TABLE product_dupes ON COMMIT DROP AS
+        SELECT id AS loser, MIN(id) OVER (PARTITION BY standard_id, name) AS survivor
+        FROM products
+        WHERE standard_id IS NOT NULL AND name IS NOT NULL
+    """)
+    op.execute("DELETE FROM product_dupes WHERE loser = survivor")
+    op.execute("UPDATE prices p SET product_id = d.survivor FROM product_dupes d WHERE p.product_id = d.loser")
+    op.execute("DELETE FROM products p USING product_dupes d WHERE p.id = d.loser")
+
+    # 3. prices (product_id, message_id): после шага 2 дублей стало больше — оставляем первую цену
+    op.execute("""
+        DELETE FROM prices p
+        USING prices keep
+        WHERE keep.product_id = p.product_id AND keep.message_id = p.message_id AND keep.id < p.id
+    """)
+
+    # 4. unmatched_models (raw_name, source_channel): счётчики и диапазон цен складываются в первую строку,
+    #    а подтверждение человека (is_approved, выбранный товар и регион) переносится с последней подтверждённой
+    op.execute("""
+        WITH groups AS (
+            SELECT MIN(id) AS survivor,
+                   SUM(COALESCE(occurrences, 1)) AS occurrences,
+                   MAX(last_seen) AS last_seen,
+                   MIN(COALESCE(min_price, sample_price)) AS min_price,
+                   MAX(COALESCE(max_price, sample_price)) AS max_price,
+                   COALESCE(bool_or(is_approved), FALSE) AS is_approved,
+                   (array_agg(id ORDER BY id DESC) FILTER (WHERE is_approved))[1] AS approved_id
+            FROM unmatched_models
+            WHERE raw_name IS NOT NULL
+            GROUP BY raw_name, COALESCE(source_channel, '')
+            HAVING COUNT(*) > 1
+        )
+        UPDATE unmatched_models um SET
+            occurrences = g.occurrences,
+            last_seen = g.last_seen,
+            min_price = g.min_price,
+            max_price = g.max_price,
+            is_approved = g.is_approved,
+            model_id = COALESCE(approved.model_id, um.model_id),
+            detected_region = COALESCE(approved.detected_region, um.detected_region)
+        FROM groups g
+        LEFT JOIN unmatched_models approved ON approved.id = g.approved_id
+        WHERE um.id = g.survivor
+    """)
+    op.execute("""
+        DELETE FROM unmatched_models um
+        USING unmatched_models keep
+        WHERE keep.raw_name = um.raw_name
+          AND COALESCE(keep.source_channel, '') = COALESCE(um.source_channel, '')
+          AND keep.id < um.id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Слитые дубли не восстанавливаются
+    pass
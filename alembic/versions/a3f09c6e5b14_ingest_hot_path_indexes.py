@@ -0,0 +1,79 @@
+"""ingest hot path indexes
+
+Revision ID: a3f09c6e5b14
+Revises: 4b8e1d2c7a90
+Create Date: 2026-10-18 11:27:05.642871
+
+Уникальные индексы под ON CONFLICT в parser.py/database.py и индекс под
+выборку диалога из messages. Строятся CONCURRENTLY, без блокировки записи,
+поэтому каждый — вне транзакции миграции (autocommit_block).
+Прерванная сборка оставляет невалидный индекс — он удаляется и строится заново.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f09c6e5b14'
+down_revision: Union[str, None] = '4b8e1d2c7a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# имя → (таблица, определение); имена совпадают с __table_args__ в database.py
+INDEXES = {
+    "uq_products_standard_id_name": ("products", "UNIQUE INDEX {name} ON products (standard_id, name)"),
+    "uq_prices_product_id_message_id": ("prices", "UNIQUE INDEX {name} ON prices (product_id, message_id)"),
+    "uq_unmatched_models_raw_name_channel": (
+        "unmatched_models", "UNIQUE INDEX {name} ON unmatched_models (raw_name, (COALESCE(source_channel, '')))"
+    ),
+    "ix_messages_chat_id_timestamp": ("messages", "INDEX {name} ON messages (chat_id, timestamp)"),
+}
+
+# Уже есть у таблиц, созданных через init_db (unique=True в ORM), но не у старых баз
+NAME_STD_INDEX = "uq_products_cleaned_name_std"
+
+
+def _drop_if_invalid(bind, name: str):
+    invalid = bind.execute(sa.text("""
+        SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = :name AND NOT i.indisvalid
+    """), {"name": name}).first()
+    if invalid:
+        bind.execute(sa.text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+
+def _has_unique_index(bind, table: str, column: str) -> bool:
+    return bind.execute(sa.text("""
+        SELECT 1
+        FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+        WHERE i.indrelid = to_regclass(:table) AND i.indisunique AND i.indisvalid
+          AND i.indnatts = 1 AND a.attname = :column
+    """), {"table": table, "column": column}).first() is not None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        for name, (table, definition) in INDEXES.items():
+            if not bind.execute(sa.text("SELECT to_regclass(:table) IS NOT NULL"), {"table": table}).scalar():
+                continue
+            _drop_if_invalid(bind, name)
+            bind.execute(sa.text(f"CREATE {definition.format(name=f'CONCURRENTLY IF NOT EXISTS {name}')}"))
+
+        if not _has_unique_index(bind, "products_cleaned", "name_std"):
+            _drop_if_invalid(bind, NAME_STD_INDEX)
+            bind.execute(sa.text(
+                f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {NAME_STD_INDEX} ON products_cleaned (name_std)"
+            ))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        for name in [NAME_STD_INDEX, *INDEXES]:
+            bind.execute(sa.text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
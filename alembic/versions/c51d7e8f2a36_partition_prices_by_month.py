@@ -0,0 +1,140 @@
+"""partition prices by month
+
+Revision ID: c51d7e8f2a36
+Revises: a3f09c6e5b14
+Create Date: 2026-10-18 14:40:12.907315
+
+prices становится секционированной по месяцам таблицей с message_date типа
+timestamptz. Строки переносятся из старой таблицы одним INSERT ... SELECT:
+ISO-текст message_date приводится к timestamptz, пустые даты берутся из
+updated_at (если колонка есть), иначе — момент миграции. Таблица на время
+переноса заблокирована — запускать при остановленном парсере.
+
+Секции — prices_YYYY_MM на весь диапазон истории и три месяца вперёд, плюс
+prices_default; дальше секции ведёт partitions.maintain_price_partitions.
+Уникальность цены — (product_id, message_id, message_date): ключ секционирования
+обязан входить в уникальный индекс, а дата сообщения неизменна для message_id.
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c51d7e8f2a36'
+down_revision: Union[str, None] = 'a3f09c6e5b14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+
+def _add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _columns(bind, table: str) -> set:
+    return {row[0] for row in bind.execute(sa.text(
+        "SELECT column_name FROM information_schema.columns WHERE table_name = :table"
+    ), {"table": table})}
+
+
+def _rename_index_backed(bind, table: str, suffix: str):
+    # Имена индексов и PK глобальны в схеме — освобождаем их для новой таблицы
+    for (name,) in bind.execute(sa.text("""
+        SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = to_regclass(:table)
+    """), {"table": table}).fetchall():
+        bind.execute(sa.text(f'ALTER INDEX "{name}" RENAME TO "{name}_{suffix}"'))
+
+
+def _take_sequence(bind, old_table: str, new_table: str):
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": old_table}).scalar()
+    if sequence is None:
+        sequence = "prices_id_seq"
+        bind.execute(sa.text(f"CREATE SEQUENCE IF NOT EXISTS {sequence}"))
+        bind.execute(sa.text(f"SELECT setval('{sequence}', COALESCE((SELECT MAX(id) FROM {old_table}), 0) + 1, false)"))
+    bind.execute(sa.text(f"ALTER SEQUENCE {sequence} AS bigint"))
+    bind.execute(sa.text(f"ALTER TABLE {new_table} ALTER COLUMN id SET DEFAULT nextval('{sequence}')"))
+    bind.execute(sa.text(f"ALTER SEQUENCE {sequence} OWNED BY {new_table}.id"))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    op.execute("ALTER TABLE prices RENAME TO prices_legacy")
+    _rename_index_backed(bind, "prices_legacy", "legacy")
+
+    op.execute("""
+        CREATE TABLE prices (
+            id BIGINT NOT NULL,
+            product_id INTEGER REFERENCES products(id),
+            price INTEGER,
+            country TEXT,
+            source_account TEXT,
+            channel_name TEXT,
+            message_id BIGINT,
+            message_date TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, message_date)
+        ) PARTITION BY RANGE (message_date)
+    """)
+    _take_sequence(bind, "prices_legacy", "prices")
+
+    legacy = _columns(bind, "prices_legacy")
+    fallback = "updated_at::timestamptz, " if "updated_at" in legacy else ""
+    message_date = f"COALESCE(NULLIF(message_date::text, '')::timestamptz, {fallback}now())"
+
+    first = bind.execute(sa.text(f"SELECT MIN({message_date}) FROM prices_legacy")).scalar()
+    current = date.today().replace(day=1)
+    month = min(first.date().replace(day=1), current) if first else current
+    last = _add_months(current, MONTHS_AHEAD)
+    while month <= last:
+        op.execute(f"""
+            CREATE TABLE prices_{month.year:04d}_{month.month:02d} PARTITION OF prices
+            FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')
+        """)
+        month = _add_months(month, 1)
+    op.execute("CREATE TABLE prices_default PARTITION OF prices DEFAULT")
+
+    op.execute("CREATE UNIQUE INDEX uq_prices_product_message_date ON prices (product_id, message_id, message_date)")
+
+    op.execute(f"""
+        INSERT INTO prices (id, product_id, price, country, source_account, channel_name, message_id, message_date)
+        SELECT id, product_id, ROUND(price)::integer, country, source_account, channel_name, message_id, {message_date}
+        FROM prices_legacy
+        ON CONFLICT DO NOTHING
+    """)
+    op.execute("DROP TABLE prices_legacy")
+    op.execute("ANALYZE prices")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    op.execute("ALTER TABLE prices RENAME TO prices_partitioned")
+    _rename_index_backed(bind, "prices_partitioned", "partitioned")
+
+    op.execute("""
+        CREATE TABLE prices (
+            id INTEGER NOT NULL PRIMARY KEY,
+            product_id INTEGER REFERENCES products(id),
+            price INTEGER,
+            country TEXT,
+            source_account TEXT,
+            channel_name TEXT,
+            message_id INTEGER,
+            message_date TEXT
+        )
+    """)
+    _take_sequence(bind, "prices_partitioned", "prices")
+    op.execute("""
+        INSERT INTO prices (id, product_id, price, country, source_account, channel_name, message_id, message_date)
+        SELECT id, product_id, price, country, source_account, channel_name, message_id, to_char(message_date, 'YYYY-MM-DD"T"HH24:MI:SSOF')
+        FROM prices_partitioned
+    """)
+    op.execute("CREATE UNIQUE INDEX uq_prices_product_id_message_id ON prices (product_id, message_id)")
+    # Секции удаляются вместе с родительской таблицей
+    op.execute("DROP TABLE prices_partitioned")
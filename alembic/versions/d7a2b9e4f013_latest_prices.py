@@ -0,0 +1,86 @@
+"""latest prices
+
+Revision ID: d7a2b9e4f013
+Revises: c51d7e8f2a36
+Create Date: 2026-10-18 16:05:37.284510
+
+Сводка текущих цен latest_prices по (standard_id, region, channel), которую
+ведёт database.upsert_latest_prices. Заполняется из истории prices: последняя
+цена по ключу и последняя отличавшаяся от неё как previous_price. Таблицу
+может заранее создать init_db (create_all при старте) — тогда создание
+пропускается, а заполнение всё равно выполняется.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a2b9e4f013'
+down_revision: Union[str, None] = 'c51d7e8f2a36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    exists = op.get_bind().execute(sa.text("SELECT to_regclass('latest_prices') IS NOT NULL")).scalar()
+    if not exists:
+        op.create_table(
+            'latest_prices',
+            sa.Column('standard_id', sa.Integer, sa.ForeignKey('products_cleaned.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('region', sa.String, nullable=False, server_default=''),
+            sa.Column('channel', sa.String, nullable=False, server_default=''),
+            sa.Column('price', sa.Integer, nullable=False),
+            sa.Column('previous_price', sa.Integer),
+            sa.Column('country', sa.String),
+            sa.Column('message_date', sa.TIMESTAMP(timezone=True), nullable=False),
+            sa.Column('updated_at', sa.TIMESTAMP(timezone=True)),
+            sa.PrimaryKeyConstraint('standard_id', 'region', 'channel'),
+        )
+
+    op.execute("""
+        WITH history AS (
+            SELECT p.standard_id,
+                   COALESCE(pc.region, '') AS region,
+                   COALESCE(pr.channel_name, '') AS channel,
+                   pr.price, pr.country, pr.message_date,
+                   ROW_NUMBER() OVER w AS rn,
+                   FIRST_VALUE(pr.price) OVER w AS latest_price
+            FROM prices pr
+            JOIN products p ON p.id = pr.product_id
+            JOIN products_cleaned pc ON pc.id = p.standard_id
+            WHERE pr.price IS NOT NULL
+            WINDOW w AS (
+                PARTITION BY p.standard_id, COALESCE(pc.region, ''), COALESCE(pr.channel_name, '')
+                ORDER BY pr.message_date DESC, pr.id DESC
+            )
+        ),
+        -- Самая свежая цена ключа, отличная от последней, — одним проходом по истории
+        previous AS (
+            SELECT DISTINCT ON (standard_id, region, channel) standard_id, region, channel, price
+            FROM history
+            WHERE price <> latest_price
+            ORDER BY standard_id, region, channel, rn
+        )
+        INSERT INTO latest_prices (standard_id, region, channel, price, previous_price, country, message_date, updated_at)
+        SELECT l.standard_id, l.region, l.channel, l.price, pv.price,
+               l.country, l.message_date, now()
+        FROM history l
+        LEFT JOIN previous pv
+          ON pv.standard_id = l.standard_id AND pv.region = l.region AND pv.channel = l.channel
+        WHERE l.rn = 1
+        ON CONFLICT (standard_id, region, channel) DO UPDATE SET
+            price = EXCLUDED.price,
+            previous_price = EXCLUDED.previous_price,
+            country = EXCLUDED.country,
+            message_date = EXCLUDED.message_date,
+            updated_at = EXCLUDED.updated_at
+        WHERE EXCLUDED.message_date > latest_prices.message_date
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('latest_prices')
@@ -0,0 +1,46 @@
+"""price daily
+
+Revision ID: e8c4f1a6b725
+Revises: d7a2b9e4f013
+Create Date: 2026-10-18 17:48:20.551903
+
+Дневные агрегаты цен (min, max, last, count) по (standard_id, region, channel, day),
+в которые compaction.compact_prices сворачивает историю старше окна сырых данных.
+Если таблица уже есть, ревизия ничего не делает.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8c4f1a6b725'
+down_revision: Union[str, None] = 'd7a2b9e4f013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Таблицу могла уже создать init_db (create_all при старте)
+    exists = op.get_bind().execute(sa.text("SELECT to_regclass('price_daily') IS NOT NULL")).scalar()
+    if not exists:
+        op.create_table(
+            'price_daily',
+            sa.Column('standard_id', sa.Integer, sa.ForeignKey('products_cleaned.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('region', sa.String, nullable=False, server_default=''),
+            sa.Column('channel', sa.String, nullable=False, server_default=''),
+            sa.Column('day', sa.Date, nullable=False),
+            sa.Column('min_price', sa.Integer, nullable=False),
+            sa.Column('max_price', sa.Integer, nullable=False),
+            sa.Column('last_price', sa.Integer, nullable=False),
+            sa.Column('last_at', sa.TIMESTAMP(timezone=True), nullable=False),
+            sa.Column('count', sa.Integer, nullable=False),
+            sa.PrimaryKeyConstraint('standard_id', 'region', 'channel', 'day'),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('price_daily')
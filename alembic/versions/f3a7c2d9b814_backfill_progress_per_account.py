@@ -0,0 +1,82 @@
+"""backfill progress per account
+
+Revision ID: f3a7c2d9b814
+Revises: e8c4f1a6b725
+Create Date: 2026-10-19 10:12:33.405127
+
+Прогресс загрузки истории (backfill_progress) ведётся по паре (channel_id,
+account_id): id сообщений обычных чатов у каждого аккаунта свои, и offset
+чужого аккаунта для них бессмыслен. Новая колонка backfill_limit хранит
+BACKFILL_LIMIT, с которым источник дочитан, — при его росте источник
+догружается. Завершённым источникам она заполняется прочитанным числом.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a7c2d9b814'
+down_revision: Union[str, None] = 'e8c4f1a6b725'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _primary_key(bind) -> tuple:
+    """(имя ограничения, отсортированные колонки) первичного ключа backfill_progress."""
+    row = bind.execute(sa.text("""
+        SELECT con.conname, array_agg(a.attname::text ORDER BY a.attname)
+        FROM pg_constraint con
+        JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = ANY(con.conkey)
+        WHERE con.conrelid = to_regclass('backfill_progress') AND con.contype = 'p'
+        GROUP BY con.conname
+    """)).first()
+    return (row[0], list(row[1])) if row else (None, [])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    # Таблицы ещё нет — init_db создаст её сразу по новой схеме
+    if not bind.execute(sa.text("SELECT to_regclass('backfill_progress') IS NOT NULL")).scalar():
+        return
+
+    op.execute("ALTER TABLE backfill_progress ADD COLUMN IF NOT EXISTS backfill_limit INTEGER")
+
+    name, columns = _primary_key(bind)
+    if columns != ["account_id", "channel_id"]:
+        op.execute("DELETE FROM backfill_progress WHERE account_id IS NULL")
+        if name:
+            op.execute(f'ALTER TABLE backfill_progress DROP CONSTRAINT "{name}"')
+        op.execute("""
+            ALTER TABLE backfill_progress
+                ALTER COLUMN account_id SET NOT NULL,
+                ADD PRIMARY KEY (channel_id, account_id)
+        """)
+
+    op.execute("UPDATE backfill_progress SET backfill_limit = fetched WHERE done AND backfill_limit IS NULL")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if not bind.execute(sa.text("SELECT to_regclass('backfill_progress') IS NOT NULL")).scalar():
+        return
+
+    # По каналу остаётся самая свежая запись
+    op.execute("""
+        DELETE FROM backfill_progress bp
+        USING backfill_progress newer
+        WHERE newer.channel_id = bp.channel_id
+          AND (COALESCE(newer.updated_at, 'epoch'), newer.account_id) > (COALESCE(bp.updated_at, 'epoch'), bp.account_id)
+    """)
+    name, _ = _primary_key(bind)
+    if name:
+        op.execute(f'ALTER TABLE backfill_progress DROP CONSTRAINT "{name}"')
+    op.execute("""
+        ALTER TABLE backfill_progress
+            ALTER COLUMN account_id DROP NOT NULL,
+            ADD PRIMARY KEY (channel_id),
+            DROP COLUMN backfill_limit
+    """)
@@ -0,0 +1,77 @@
+# alias_index.py — подтверждённые соответствия «сырой текст → эталон» в памяти процесса
+
+import logging
+import threading
+from datetime import datetime
+from sqlalchemy import text
+from database import get_session
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_aliases = {}  # alias_key(model_text) → products_cleaned.id
+_warmed = False
+# Растёт при каждой инвалидации: снимок, прочитанный до неё, не применяется
+_generation = 0
+
+alias_stats = {
+    "hits": 0,
+    "misses": 0,
+    "invalidations": 0,
+    "warmed_at": None,
+}
+
+
+def alias_key(model_text: str) -> str:
+    """Ключ псевдонима: текст строки без цены, без учёта регистра и лишних пробелов."""
+    return " ".join(model_text.casefold().split())
+
+
+def warm_alias_index():
+    global _warmed
+    with _lock:
+        generation = _generation
+    with get_session() as session:
+        rows = session.execute(text("SELECT alias, standard_id FROM product_aliases")).fetchall()
+
+    with _lock:
+        if generation != _generation:
+            return
+        _aliases.clear()
+        _aliases.update({alias: standard_id for alias, standard_id in rows})
+        _warmed = True
+        alias_stats["warmed_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    logger.info(f"🔗 Псевдонимы загружены: {len(rows)}")
+
+
+def invalidate_alias_index():
+    """Вызывается после изменения product_aliases; следующий поиск загрузит таблицу заново."""
+    global _warmed, _generation
+    with _lock:
+        _aliases.clear()
+        _warmed = False
+        _generation += 1
+        alias_stats["invalidations"] += 1
+
+
+def lookup_alias(model_text: str):
+    """standard_id по подтверждённому псевдониму или None."""
+    if not _warmed:
+        try:
+            warm_alias_index()
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось загрузить псевдонимы: {e}")
+    with _lock:
+        standard_id = _aliases.get(alias_key(model_text))
+        alias_stats["hits" if standard_id is not None else "misses"] += 1
+    return standard_id
+
+
+def get_alias_stats() -> dict:
+    with _lock:
+        stats = dict(alias_stats)
+        stats["aliases"] = len(_aliases)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else None
+    return stats
@@ -0,0 +1,67 @@
+# async_database.py — асинхронный доступ к БД для маршрутов FastAPI (asyncpg через SQLAlchemy asyncio)
+
+import logging
+
+from config import ASYNC_DB_POOL_SIZE, ASYNC_DB_MAX_OVERFLOW, ASYNC_DB_POOL_TIMEOUT, ASYNC_DB_POOL_RECYCLE
+from database import DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME
+from resources import register_resource, get_resource, reset_resource, get_resource_stats
+
+logger = logging.getLogger(__name__)
+
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+
+def _create_async_engine():
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    # Пул отдельный от синхронного engine в database.py: тот обслуживает потоки разбора,
+    # этот — только event loop, поэтому соединения не конкурируют с загрузкой цен
+    return create_async_engine(
+        ASYNC_DATABASE_URL,
+        pool_size=ASYNC_DB_POOL_SIZE,
+        max_overflow=ASYNC_DB_MAX_OVERFLOW,
+        pool_timeout=ASYNC_DB_POOL_TIMEOUT,
+        pool_recycle=ASYNC_DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+    )
+
+
+def _create_async_sessionmaker():
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    return async_sessionmaker(get_resource("async_engine"), expire_on_commit=False)
+
+
+# Engine создаётся при первом запросе: импорт модуля не требует asyncpg
+register_resource("async_engine", _create_async_engine)
+register_resource("async_sessionmaker", _create_async_sessionmaker)
+
+
+async def get_async_session():
+    """Зависимость FastAPI: асинхронная сессия на время запроса."""
+    async with get_resource("async_sessionmaker")() as session:
+        yield session
+
+
+async def dispose_async_engine():
+    """Закрывает соединения пула при остановке приложения, если engine успел создаться."""
+    if not get_resource_stats()["async_engine"]["loaded"]:
+        return
+    await get_resource("async_engine").dispose()
+    reset_resource("async_sessionmaker")
+    reset_resource("async_engine")
+    logger.info("🔌 Пул асинхронных соединений закрыт")
+
+
+def get_async_pool_stats() -> dict:
+    if not get_resource_stats()["async_engine"]["loaded"]:
+        return {"created": False}
+    pool = get_resource("async_engine").pool
+    return {
+        "created": True,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "max_overflow": ASYNC_DB_MAX_OVERFLOW,
+    }
@@ -0,0 +1,131 @@
+# backfill.py — однократная загрузка истории источников при старте процесса
+
+import asyncio
+import logging
+from config import client_configs, BACKFILL_LIMIT, BACKFILL_CONCURRENCY
+from database import get_allowed_sources_by_id, get_backfill_progress, save_backfill_progress
+from utils import get_all_clients
+from rate_limiter import get_limiter
+from crawl_scheduler import assign_channels
+
+logger = logging.getLogger(__name__)
+
+# Сколько сообщений разбирать за раз и после скольких сохранять прогресс
+BACKFILL_BATCH = 20
+
+_backfill_task = None
+
+
+def start_backfill():
+    """Запускает координатор один раз на процесс; повторные вызовы ничего не делают."""
+    global _backfill_task
+    if _backfill_task is None:
+        _backfill_task = asyncio.create_task(run_backfill())
+    return _backfill_task
+
+
+async def _wait_for_snapshots(labels, timeout: float = 30.0):
+    # Снимки источников дают access_hash и вид entity; без них подойдут и голые peer
+    from telethon_client import _source_snapshots
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline and not all(label in _source_snapshots for label in labels):
+        await asyncio.sleep(1)
+
+
+async def run_backfill(limit: int = BACKFILL_LIMIT, concurrency: int = BACKFILL_CONCURRENCY):
+    """
+    Загружает до limit последних сообщений каждого источника.
+
+    Каждый источник достаётся ровно одному аккаунту (см. assign_channels),
+    прогресс хранится в backfill_progress по паре (источник, аккаунт): после рестарта
+    загрузка продолжается с самого старого прочитанного этим аккаунтом сообщения.
+    Источники, дочитанные с тем же или большим limit, пропускаются; при росте
+    BACKFILL_LIMIT они догружаются до нового предела.
+    """
+    clients = await get_all_clients(client_configs)
+    clients_by_label = {label: client for client, label in clients}
+    await _wait_for_snapshots(clients_by_label)
+
+    sources_by_account = {}
+    for label in clients_by_label:
+        sources = []
+        for type_ in ("channel", "chat"):
+            for channel_id in await asyncio.to_thread(get_allowed_sources_by_id, type_, label):
+                sources.append({"channel_id": channel_id, "type": type_})
+        sources_by_account[label] = sources
+
+    progress = await asyncio.to_thread(get_backfill_progress)
+    assigned = assign_channels(sources_by_account)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    def is_complete(row) -> bool:
+        return bool(row and row["done"] and (row["backfill_limit"] or 0) >= limit)
+
+    async def run_one(label, source):
+        async with semaphore:
+            await backfill_source(clients_by_label[label], label, source, progress.get((source["channel_id"], label)), limit)
+
+    tasks = [
+        run_one(label, source)
+        for label, sources in assigned.items()
+        for source in sources
+        if not is_complete(progress.get((source["channel_id"], label)))
+    ]
+    logger.info(f"📦 Загрузка истории: источников {len(tasks)}, по {limit} сообщений, параллельно {concurrency}")
+
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"🔥 Ошибка при загрузке истории: {result}")
+    logger.info("📦 Загрузка истории завершена")
+
+
+async def backfill_source(client, account_id: str, source: dict, progress, limit: int):
+    from parser import parse_messages
+    from telethon_client import get_source_peer
+
+    channel_id = source["channel_id"]
+    type_ = source["type"]
+    oldest_id = (progress or {}).get("oldest_message_id") or 0
+    fetched = (progress or {}).get("fetched") or 0
+    if fetched >= limit:
+        await asyncio.to_thread(save_backfill_progress, channel_id, account_id, type_, oldest_id, fetched, True, limit)
+        return
+
+    limiter = get_limiter(account_id)
+    try:
+        entity = await limiter.call(lambda: client.get_entity(get_source_peer(account_id, type_, channel_id)))
+    except Exception as e:
+        logger.warning(f"⚠️ Ошибка при загрузке истории из {type_} {channel_id} ({account_id}): {e}")
+        return
+
+    title = getattr(entity, "title", "unknown")
+    pending = []
+
+    async def flush(done: bool = False):
+        if pending:
+            await asyncio.to_thread(parse_messages, list(pending))
+            pending.clear()
+        await asyncio.to_thread(save_backfill_progress, channel_id, account_id, type_, oldest_id or None, fetched, done, limit)
+
+    # От новых к старым; offset_id продолжает с самого старого прочитанного сообщения
+    next_oldest = oldest_id
+    read = 0
+    async for message in limiter.iter_messages(client, entity, offset_id=oldest_id, limit=limit - fetched):
+        next_oldest = message.id
+        read += 1
+        if message.text:
+            pending.append((message.text, {
+                "account_id": account_id,
+                "channel_id": entity.id,
+                "channel_name": title,
+                "message_id": message.id,
+                "date": message.date
+            }))
+        if read >= BACKFILL_BATCH:
+            oldest_id, fetched, read = next_oldest, fetched + read, 0
+            await flush()
+    oldest_id, fetched = next_oldest, fetched + read
+    await flush(done=True)
+    logger.info(f"📦 История {title} ({channel_id}) загружена аккаунтом {account_id}: {fetched} сообщений")
@@ -0,0 +1,158 @@
+"""
+Бенчмарк загрузки цен: прежняя построчная запись (замороженная копия legacy_insert_price
+ниже, 3-4 запроса на строку) против пакетного insert_prices_batch.
+
+Запуск (нужен локальный Postgres из .env / database.py):
+    python bench_ingest.py --lines 300 --messages 20
+
+Все данные создаются внутри одной транзакции и откатываются в конце,
+поэтому строки подбираются так, чтобы все они находили эталон в products_cleaned.
+Каждый замер идёт в своей точке сохранения и откатывается после неё: оба
+варианта начинают с одинакового состояния и сами создают товары в products.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from database import get_connection
+from normalizer import name_std_from_parts
+from parser import insert_prices_batch, parse_price_lines
+from tokenizer import name_key_for
+from product_index import invalidate_product_index
+
+LINEUPS = ["iPhone 15 Pro", "iPhone 15", "iPad Air", "MacBook Air", "Galaxy S24", "Pixel 8", "Redmi Note 13"]
+MEMORY = ["128", "256", "512", "1TB"]
+COLORS = ["Black", "Blue", "White", "Natural", "Gold"]
+FLAGS = ["🇺🇸", "🇭🇰", "🇯🇵", "🇪🇺", ""]
+
+
+def make_price_list(n_lines: int) -> str:
+    lines = []
+    for i in range(n_lines):
+        name = f"{random.choice(LINEUPS)} {random.choice(MEMORY)} {random.choice(COLORS)} v{i % 50}"
+        lines.append(f"{name} {random.randint(20000, 250000)}{random.choice(FLAGS)}")
+    return "\n".join(lines)
+
+
+def legacy_insert_price(session, model_text: str, price: int, flag: str, source: dict) -> bool:
+    """Копия построчной записи до пакетного варианта: отдельный запрос на каждый шаг, без ON CONFLICT."""
+    name_std = name_std_from_parts(*name_key_for(model_text))
+
+    cleaned = session.execute(
+        text("SELECT id FROM products_cleaned WHERE name_std = :name_std"),
+        {"name_std": name_std}
+    ).first()
+    if not cleaned:
+        # Прежде здесь был save_unmatched_model в своей транзакции; строки бенчмарка все находят эталон
+        return False
+    standard_id = cleaned[0]
+
+    product = session.execute(
+        text("SELECT id FROM products WHERE standard_id = :standard_id AND name = :name"),
+        {"standard_id": standard_id, "name": model_text}
+    ).first()
+    if product:
+        product_id = product[0]
+    else:
+        product_id = session.execute(
+            text("""
+                INSERT INTO products (name, standard_id, approved)
+                VALUES (:name, :standard_id, TRUE)
+                RETURNING id
+            """),
+            {"name": model_text, "standard_id": standard_id}
+        ).scalar()
+
+    existing_price = session.execute(
+        text("SELECT 1 FROM prices WHERE product_id = :product_id AND message_id = :message_id"),
+        {"product_id": product_id, "message_id": source.get("message_id")}
+    ).first()
+    if existing_price:
+        return False
+
+    session.execute(
+        text("""
+            INSERT INTO prices (product_id, price, country, source_account, channel_name, message_id, message_date)
+            VALUES (:product_id, :price, :country, :source_account, :channel_name, :message_id, :message_date)
+        """),
+        {
+            "product_id": product_id,
+            "price": price,
+            "country": flag,
+            "source_account": source.get("account_id"),
+            "channel_name": source.get("channel_name"),
+            "message_id": source.get("message_id"),
+            "message_date": source.get("date")
+        }
+    )
+    return True
+
+
+def seed_standards(session, message_text: str):
+    names = set()
+    for line in parse_price_lines(message_text):
+        if line.name_key is None:
+            continue  # узнана по псевдониму, эталон уже есть
+        brand, lineup, model, region = line.name_key
+        names.add((brand, lineup, model, region, name_std_from_parts(brand, lineup, model, region)))
+    for brand, lineup, model, region, name_std in names:
+        session.execute(text("""
+            INSERT INTO products_cleaned (brand, lineup, model, region, name_std)
+            VALUES (:brand, :lineup, :model, :region, :name_std)
+            ON CONFLICT (name_std) DO NOTHING
+        """), {"brand": brand, "lineup": lineup, "model": model, "region": region, "name_std": name_std})
+
+
+def run(session, message_text: str, messages: int, batched: bool, first_message_id: int) -> float:
+    parsed = parse_price_lines(message_text)
+    savepoint = session.begin_nested()
+    # Индекс товаров не должен помнить id из прошлого (откаченного) замера
+    invalidate_product_index()
+    started = time.perf_counter()
+    for i in range(messages):
+        source = {
+            "account_id": "bench",
+            "channel_id": 0,
+            "channel_name": "bench",
+            "message_id": first_message_id + i,
+            "date": datetime.now(timezone.utc)
+        }
+        if batched:
+            insert_prices_batch(session, [(line, source) for line in parsed])
+        else:
+            for line in parsed:
+                legacy_insert_price(session, line.model_text, line.price, line.flag, source)
+    elapsed = time.perf_counter() - started
+    savepoint.rollback()
+    invalidate_product_index()
+    return len(parsed) * messages / elapsed
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lines", type=int, default=300, help="строк в одном прайсе")
+    ap.add_argument("--messages", type=int, default=10, help="сколько прайсов загрузить")
+    args = ap.parse_args()
+
+    random.seed(42)
+    message_text = make_price_list(args.lines)
+
+    session = get_connection()
+    try:
+        seed_standards(session, message_text)
+        before = run(session, message_text, args.messages, batched=False, first_message_id=-10_000_000)
+        after = run(session, message_text, args.messages, batched=True, first_message_id=-10_000_000)
+    finally:
+        session.rollback()
+        session.close()
+
+    print(f"📊 {args.messages} прайсов × {args.lines} строк")
+    print(f"   построчно: {before:10.0f} строк/с")
+    print(f"   пакетно:   {after:10.0f} строк/с  (×{after / before:.1f})")
+
+
+if __name__ == "__main__":
+    main()
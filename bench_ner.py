@@ -0,0 +1,46 @@
+"""
+Пропускная способность NER-этапа (ner_stage) на строках, которые не распознал быстрый путь.
+
+Корпус — как в bench_tokenizer.py: файлы с прайсами или text из таблицы messages.
+    python bench_ner.py прайс.txt --batch-sizes 32 64 256 --n-process 1 2 4
+"""
+import argparse
+import time
+
+from bench_tokenizer import load_corpus
+from ner_stage import needs_ner, extract_brands
+from resources import get_resource
+from tokenizer import tokenize_line
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("paths", nargs="*", help="файлы с прайсами; без них берётся таблица messages")
+    ap.add_argument("--limit", type=int, default=2000, help="сколько сообщений взять из messages")
+    ap.add_argument("--batch-sizes", type=int, nargs="+", default=[32, 64, 256])
+    ap.add_argument("--n-process", type=int, nargs="+", default=[1, 2])
+    args = ap.parse_args()
+
+    lines = [line for line in map(tokenize_line, load_corpus(args.paths, args.limit)) if line]
+    texts = [line.model_text for line in lines if needs_ner(line)]
+    if not texts:
+        print("Нет строк без бренда — NER-этапу нечего делать")
+        return
+
+    started = time.perf_counter()
+    nlp = get_resource("nlp")
+    print(f"📦 Модель загружена за {time.perf_counter() - started:.1f} с, компоненты: {', '.join(nlp.pipe_names)}")
+    print(f"📊 Строк с ценой: {len(lines)}, без бренда: {len(texts)} ({len(texts) / len(lines):.0%})")
+
+    for n_process in args.n_process:
+        for batch_size in args.batch_sizes:
+            started = time.perf_counter()
+            brands = extract_brands(texts, batch_size=batch_size, n_process=n_process)
+            elapsed = time.perf_counter() - started
+            found = sum(1 for brand in brands if brand)
+            print(f"   n_process={n_process:<2} batch={batch_size:<4} {len(texts) / elapsed:8.0f} строк/с, "
+                  f"бренд найден в {found} ({found / len(texts):.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Микробенчмарк разбора строк прайса: прежний многопроходный разбор против tokenizer.tokenize_line.
+
+Корпус — файлы с прайсами из аргументов, а без них — text из таблицы messages:
+    python bench_tokenizer.py прайс1.txt прайс2.txt
+    python bench_tokenizer.py --limit 5000 --repeat 5
+"""
+import argparse
+import re
+import time
+
+import emoji
+
+from tokenizer import tokenize_line
+
+
+def legacy_parse_line(line: str):
+    """Копия разбора до tokenizer.py: отдельный проход на каждый шаг."""
+    match = re.search(r"(\d{5,7})(?:\s?([\U0001F1E6-\U0001F1FF]{2}))?", line)
+    if not match:
+        return None
+    price = int(match.group(1))
+    flag = match.group(2)
+    model_text = re.sub(r"(\d{5,7})(?:\s?([\U0001F1E6-\U0001F1FF]{2}))?", "", line).strip("•- ")
+
+    raw_text = "".join(
+        ch for ch in model_text
+        if not (ch in emoji.EMOJI_DATA and not re.match(r"[\U0001F1E6-\U0001F1FF]", ch))
+    )
+    flags = re.findall(r"[\U0001F1E6-\U0001F1FF]{2}", model_text)
+    region_flag = flags[0] if flags else None
+
+    text = re.sub(r"[\U0001F1E6-\U0001F1FF]{2}", "", raw_text)
+    text = re.sub(r"[^\w\s\-+]", "", text).strip()
+    parts = text.lower().split()
+
+    known_lineups = {
+        "iphone": "Apple", "ipad": "Apple", "macbook": "Apple", "airpods": "Apple",
+        "watch": "Apple", "imac": "Apple", "pixel": "Google", "galaxy": "Samsung",
+        "note": "Xiaomi", "redmi": "Redmi", "mi": "Xiaomi", "poco": "Poco",
+        "realme": "Realme", "oneplus": "OnePlus", "nokia": "Nokia",
+    }
+    brand, lineup = "Unknown", None
+    for part in parts:
+        if part in known_lineups:
+            lineup, brand = part, known_lineups[part]
+            break
+
+    model_tokens = []
+    for word in parts:
+        if re.match(r"\d{2,4}", word):
+            break
+        if word in ["teal", "blue", "black", "white", "natural", "gray", "gold", "pink", "red"]:
+            break
+        model_tokens.append(word)
+
+    region_map = {
+        '🇺🇸': 'us', '🇷🇺': 'ru', '🇪🇺': 'eu', '🇭🇰': 'hk',
+        '🇨🇳': 'cn', '🇰🇿': 'kz', '🇮🇳': 'in', '🇹🇭': 'th',
+        '🇦🇪': 'ae', '🇲🇾': 'my', '🇯🇵': 'jp', '🇰🇷': 'kr'
+    }
+    return model_text, price, flag, brand, lineup, " ".join(model_tokens).title(), region_map.get(region_flag)
+
+
+def load_corpus(paths, limit: int) -> list:
+    if paths:
+        texts = []
+        for path in paths:
+            with open(path, encoding="utf-8") as f:
+                texts.append(f.read())
+    else:
+        from sqlalchemy import text
+        from database import get_session
+        with get_session() as session:
+            rows = session.execute(text("""
+                SELECT text FROM messages
+                WHERE text IS NOT NULL
+                ORDER BY timestamp DESC
+                LIMIT :limit
+            """), {"limit": limit}).fetchall()
+        texts = [row[0] for row in rows]
+
+    return [line.strip() for message in texts for line in message.splitlines() if line.strip()]
+
+
+def measure(func, lines: list, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter_ns()
+        for line in lines:
+            func(line)
+        best = min(best, time.perf_counter_ns() - started)
+    return best / len(lines)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("paths", nargs="*", help="файлы с прайсами; без них берётся таблица messages")
+    ap.add_argument("--limit", type=int, default=2000, help="сколько сообщений взять из messages")
+    ap.add_argument("--repeat", type=int, default=5, help="повторов, берётся лучший")
+    args = ap.parse_args()
+
+    lines = load_corpus(args.paths, args.limit)
+    if not lines:
+        print("Корпус пуст")
+        return
+
+    mismatches = 0
+    for line in lines:
+        old = legacy_parse_line(line)
+        new = tokenize_line(line)
+        if (old is None) != (new is None) or (new is not None and old != (
+                new.model_text, new.price, new.flag, new.brand, new.lineup, new.model, new.region)):
+            mismatches += 1
+
+    before = measure(legacy_parse_line, lines, args.repeat)
+    after = measure(tokenize_line, lines, args.repeat)
+    print(f"📊 Строк в корпусе: {len(lines)}, расхождений: {mismatches}")
+    print(f"   прежний разбор: {before:8.0f} нс/строка")
+    print(f"   tokenize_line:  {after:8.0f} нс/строка  (×{before / after:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# compaction.py — сжатие старой истории цен в дневные агрегаты price_daily
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from config import PRICE_RAW_DAYS, PRICE_COMPACT_BATCH, PRICE_COMPACT_PAUSE_SECONDS
+from database import get_session
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_run_lock = threading.Lock()
+compaction_stats = {
+    "runs": 0,
+    "batches": 0,
+    "rows_compacted": 0,
+    "last_run": None,
+    "last_run_rows": 0,
+    "last_run_ms": 0.0,
+    "last_cutoff": None,
+    "running": False,
+}
+
+# Один пакет — одна транзакция: строки удаляются из prices и в том же запросе
+# складываются в price_daily, так что прерванный проход ничего не теряет и не удваивает
+_COMPACT_BATCH_SQL = """
+    WITH batch AS (
+        SELECT pr.id, pr.message_date
+        FROM prices pr
+        JOIN products p ON p.id = pr.product_id
+        WHERE pr.message_date < :cutoff AND p.standard_id IS NOT NULL AND pr.price IS NOT NULL
+        LIMIT :batch
+    ),
+    doomed AS (
+        DELETE FROM prices pr
+        USING batch b
+        WHERE pr.id = b.id AND pr.message_date = b.message_date
+        RETURNING pr.id, pr.product_id, pr.price, pr.channel_name, pr.message_date
+    ),
+    daily AS (
+        SELECT p.standard_id,
+               COALESCE(pc.region, '') AS region,
+               COALESCE(d.channel_name, '') AS channel,
+               (d.message_date AT TIME ZONE 'UTC')::date AS day,
+               MIN(d.price) AS min_price,
+               MAX(d.price) AS max_price,
+               (ARRAY_AGG(d.price ORDER BY d.message_date DESC, d.id DESC))[1] AS last_price,
+               MAX(d.message_date) AS last_at,
+               COUNT(*) AS count
+        FROM doomed d
+        JOIN products p ON p.id = d.product_id
+        JOIN products_cleaned pc ON pc.id = p.standard_id
+        GROUP BY 1, 2, 3, 4
+    ),
+    merged AS (
+        INSERT INTO price_daily (standard_id, region, channel, day, min_price, max_price, last_price, last_at, count)
+        SELECT standard_id, region, channel, day, min_price, max_price, last_price, last_at, count
+        FROM daily
+        ON CONFLICT (standard_id, region, channel, day) DO UPDATE SET
+            min_price = LEAST(price_daily.min_price, EXCLUDED.min_price),
+            max_price = GREATEST(price_daily.max_price, EXCLUDED.max_price),
+            last_price = CASE
+                WHEN EXCLUDED.last_at >= price_daily.last_at THEN EXCLUDED.last_price
+                ELSE price_daily.last_price
+            END,
+            last_at = GREATEST(price_daily.last_at, EXCLUDED.last_at),
+            count = price_daily.count + EXCLUDED.count
+    )
+    SELECT COUNT(*) FROM doomed
+"""
+
+
+def compaction_cutoff(raw_days: int = PRICE_RAW_DAYS):
+    """Начало дня (UTC), раньше которого цены сворачиваются в price_daily; None, если сжатие выключено."""
+    if raw_days <= 0:
+        return None
+    return (datetime.now(timezone.utc) - timedelta(days=raw_days)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def compact_prices(raw_days: int = PRICE_RAW_DAYS, batch: int = PRICE_COMPACT_BATCH,
+                   pause: float = PRICE_COMPACT_PAUSE_SECONDS) -> int:
+    """
+    Сворачивает цены старше raw_days дней в price_daily и удаляет их из prices
+    пакетами по batch строк с паузой pause между пакетами. Возвращает число свёрнутых строк.
+    """
+    cutoff = compaction_cutoff(raw_days)
+    if cutoff is None:
+        return 0
+    if not _run_lock.acquire(blocking=False):
+        logger.info("🗜️ Сжатие истории цен уже идёт — пропуск")
+        return 0
+
+    started = time.monotonic()
+    total = 0
+    with _lock:
+        compaction_stats["running"] = True
+        compaction_stats["last_cutoff"] = cutoff.isoformat()
+    try:
+        while True:
+            with get_session() as session:
+                compacted = session.execute(text(_COMPACT_BATCH_SQL), {"cutoff": cutoff, "batch": batch}).scalar()
+                session.commit()
+            total += compacted
+            with _lock:
+                compaction_stats["batches"] += 1
+                compaction_stats["rows_compacted"] += compacted
+            if compacted < batch:
+                break
+            time.sleep(pause)
+    finally:
+        elapsed = round((time.monotonic() - started) * 1000, 1)
+        with _lock:
+            compaction_stats["runs"] += 1
+            compaction_stats["running"] = False
+            compaction_stats["last_run"] = time.strftime("%Y-%m-%d %H:%M:%S")
+            compaction_stats["last_run_rows"] = total
+            compaction_stats["last_run_ms"] = elapsed
+        _run_lock.release()
+
+    if total:
+        logger.info(f"🗜️ История цен до {cutoff.date()} сжата: {total} строк за {elapsed} мс")
+    return total
+
+
+def get_compaction_stats() -> dict:
+    with _lock:
+        return dict(compaction_stats)
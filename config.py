@@ -3,13 +3,13 @@ import os
 
 load_dotenv()
 
-API_ID_1 = int(os.getenv("API_ID_1"))
+API_ID_1 = int(os.getenv("API_ID_1", 0))
 API_HASH_1 = os.getenv("API_HASH_1")
 SESSION_NAME_1 = os.getenv("SESSION_NAME_1")
 ACCOUNT_LABEL_1 = os.getenv("ACCOUNT_LABEL_1")
 
 
-API_ID_2 = int(os.getenv("API_ID_2"))
+API_ID_2 = int(os.getenv("API_ID_2", 0))
 API_HASH_2 = os.getenv("API_HASH_2")
 SESSION_NAME_2 = os.getenv("SESSION_NAME_2")
 ACCOUNT_LABEL_2 = os.getenv("ACCOUNT_LABEL_2")
@@ -31,6 +31,66 @@ client_configs = [
     }
 ]
 
+# Очередь разбора live-сообщений (ingest_queue.py)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 2))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", 1000))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 20))
+
+# Параллельный обход каналов (crawl_scheduler.py)
+CRAWL_GLOBAL_CONCURRENCY = int(os.getenv("CRAWL_GLOBAL_CONCURRENCY", 6))
+CRAWL_ACCOUNT_CONCURRENCY = int(os.getenv("CRAWL_ACCOUNT_CONCURRENCY", 3))
+
+# Лимит запросов к Telegram на аккаунт (rate_limiter.py)
+TG_RATE_PER_SEC = float(os.getenv("TG_RATE_PER_SEC", 3))
+TG_BURST = int(os.getenv("TG_BURST", 5))
+TG_MIN_RATE_PER_SEC = float(os.getenv("TG_MIN_RATE_PER_SEC", 0.2))
+
+# Дедупликация live-сообщений (dedupe.py)
+LIVE_DEDUPE_PER_CHAT = int(os.getenv("LIVE_DEDUPE_PER_CHAT", 512))
+LIVE_DEDUPE_MAX_CHATS = int(os.getenv("LIVE_DEDUPE_MAX_CHATS", 2000))
+LIVE_DEDUPE_TTL_HOURS = float(os.getenv("LIVE_DEDUPE_TTL_HOURS", 6))
+
+# Кэш разрешённых entity источников (telethon_client.py): через столько часов
+# entity перечитывается из Telegram, чтобы подхватить переименование канала
+ENTITY_CACHE_TTL_HOURS = float(os.getenv("ENTITY_CACHE_TTL_HOURS", 24))
+
+# Загрузка истории источников при старте (backfill.py)
+BACKFILL_LIMIT = int(os.getenv("BACKFILL_LIMIT", 50))
+BACKFILL_CONCURRENCY = int(os.getenv("BACKFILL_CONCURRENCY", 3))
+
+# Кэши разбора строк прайса (parse_cache.py)
+PARSE_LINE_CACHE_SIZE = int(os.getenv("PARSE_LINE_CACHE_SIZE", 50000))
+NAME_STD_CACHE_SIZE = int(os.getenv("NAME_STD_CACHE_SIZE", 50000))
+
+# Дополнительный NER-разбор строк, которые не распознал быстрый путь (ner_stage.py)
+NER_ENABLED = os.getenv("NER_ENABLED", "false").lower() in ("1", "true", "yes")
+NER_MODEL = os.getenv("NER_MODEL", "ru_core_news_sm")
+NER_BATCH_SIZE = int(os.getenv("NER_BATCH_SIZE", 64))
+NER_N_PROCESS = int(os.getenv("NER_N_PROCESS", 1))
+
+# Пропуск повторно опубликованных прайсов (parser.parse_messages)
+CONTENT_HASH_TTL_DAYS = int(os.getenv("CONTENT_HASH_TTL_DAYS", 30))
+
+# Буфер нераспознанных строк (unmatched_buffer.py)
+UNMATCHED_FLUSH_SECONDS = float(os.getenv("UNMATCHED_FLUSH_SECONDS", 30))
+UNMATCHED_FLUSH_SIZE = int(os.getenv("UNMATCHED_FLUSH_SIZE", 500))
+
+# Помесячные секции таблицы prices (partitions.py); 0 месяцев хранения — хранить всё
+PRICE_PARTITIONS_AHEAD = int(os.getenv("PRICE_PARTITIONS_AHEAD", 3))
+PRICE_RETENTION_MONTHS = int(os.getenv("PRICE_RETENTION_MONTHS", 0))
+PRICE_DROP_DETACHED = os.getenv("PRICE_DROP_DETACHED", "false").lower() in ("1", "true", "yes")
+
+# Сжатие истории цен в дневные агрегаты (compaction.py); 0 дней — не сжимать
+PRICE_RAW_DAYS = int(os.getenv("PRICE_RAW_DAYS", 90))
+PRICE_COMPACT_BATCH = int(os.getenv("PRICE_COMPACT_BATCH", 5000))
+PRICE_COMPACT_PAUSE_SECONDS = float(os.getenv("PRICE_COMPACT_PAUSE_SECONDS", 0.2))
+
+# Пул асинхронных соединений для маршрутов FastAPI (async_database.py)
+ASYNC_DB_POOL_SIZE = int(os.getenv("ASYNC_DB_POOL_SIZE", 10))
+ASYNC_DB_MAX_OVERFLOW = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", 10))
+ASYNC_DB_POOL_TIMEOUT = float(os.getenv("ASYNC_DB_POOL_TIMEOUT", 10))
+ASYNC_DB_POOL_RECYCLE = int(os.getenv("ASYNC_DB_POOL_RECYCLE", 1800))
+
 POSTGRES_HOST = os.getenv("POSTGRES_HOST")
 POSTGRES_PORT = int(os.getenv("POSTGRES_PORT", 5432))
 POSTGRES_DB = os.getenv("POSTGRES_DB")
@@ -0,0 +1,84 @@
+# crawl_scheduler.py — параллельный обход каналов всеми аккаунтами
+
+import asyncio
+import logging
+from config import CRAWL_GLOBAL_CONCURRENCY, CRAWL_ACCOUNT_CONCURRENCY
+from database import get_allowed_sources
+
+logger = logging.getLogger(__name__)
+
+
+def assign_channels(sources_by_account: dict) -> dict:
+    """
+    Распределяет каналы между аккаунтами так, чтобы каждый канал читался один раз за тик.
+
+    Канал, видимый нескольким аккаунтам, достаётся наименее загруженному из них.
+    Сначала раскладываются каналы с единственным владельцем, затем общие —
+    так общие каналы выравнивают нагрузку. Если при смене списков источников
+    канал переходит к другому аккаунту, тот продолжает с курсора канала
+    (database.get_channel_cursor ищет его по channel_id без учёта аккаунта).
+    """
+    owners = {}
+    by_id = {}
+    for label in sorted(sources_by_account):
+        for source in sources_by_account[label]:
+            owners.setdefault(source["channel_id"], []).append(label)
+            by_id.setdefault(source["channel_id"], source)
+
+    assigned = {label: [] for label in sources_by_account}
+    for channel_id in sorted(owners, key=lambda cid: (len(owners[cid]), cid)):
+        label = min(owners[channel_id], key=lambda l: (len(assigned[l]), l))
+        assigned[label].append(by_id[channel_id])
+    return assigned
+
+
+async def run_crawl_tick(clients, full_backfill: bool = False,
+                         global_limit: int = CRAWL_GLOBAL_CONCURRENCY,
+                         account_limit: int = CRAWL_ACCOUNT_CONCURRENCY) -> dict:
+    """
+    Один тик мониторинга: все аккаунты параллельно, до account_limit каналов
+    на аккаунт и не более global_limit каналов одновременно.
+    Возвращает статистику в формате parse_all_channels_with_stats по каждому аккаунту.
+    """
+    from parser import crawl_channel
+
+    clients_by_label = {label: client for client, label in clients}
+    sources_by_account = {}
+    for label in clients_by_label:
+        sources_by_account[label] = await asyncio.to_thread(get_allowed_sources, "channel", label)
+
+    assigned = assign_channels(sources_by_account)
+    global_sem = asyncio.Semaphore(max(1, global_limit))
+    account_sems = {label: asyncio.Semaphore(max(1, account_limit)) for label in assigned}
+
+    stats = {
+        label: {"channels": 0, "messages": 0, "products": 0, "details": []}
+        for label in assigned
+    }
+
+    async def crawl(label, source):
+        # Порядок захвата одинаковый для всех задач: сначала аккаунт, потом общий лимит
+        async with account_sems[label]:
+            async with global_sem:
+                detail = await crawl_channel(clients_by_label[label], source, label, full_backfill)
+        if detail is None:
+            return
+        account_stats = stats[label]
+        account_stats["channels"] += 1
+        account_stats["messages"] += detail["messages"]
+        account_stats["products"] += detail["products"]
+        account_stats["details"].append(detail)
+
+    for label, sources in assigned.items():
+        logger.info(f"🔁 Аккаунт {label}: каналов к обходу {len(sources)}")
+
+    results = await asyncio.gather(*(
+        crawl(label, source)
+        for label, sources in assigned.items()
+        for source in sources
+    ), return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"🔥 Ошибка при обходе канала: {result}")
+
+    return stats
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, text, Column, Integer, String, Boolean, BigInteger, TIMESTAMP, ForeignKey
+from sqlalchemy import create_engine, text, Column, Integer, String, Boolean, BigInteger, TIMESTAMP, ForeignKey, ARRAY, Index, Date
 from sqlalchemy.orm import sessionmaker, declarative_base, relationship
 from contextlib import contextmanager
 from typing import List, Optional
@@ -36,18 +36,51 @@ class Product(Base):
     id = Column(Integer, primary_key=True)
     name = Column(String)
     standard_id = Column(Integer, ForeignKey("products_cleaned.id"))
+    __table_args__ = (Index("uq_products_standard_id_name", "standard_id", "name", unique=True),)
     standard = relationship("ProductCleaned")
 
 class Price(Base):
+    # Секционирована по месяцам message_date: секции создаёт partitions.ensure_price_partitions,
+    # поэтому message_date входит и в первичный ключ, и в уникальный индекс
     __tablename__ = "prices"
-    id = Column(Integer, primary_key=True)
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
     product_id = Column(Integer, ForeignKey("products.id"))
     price = Column(Integer)
     country = Column(String)
     source_account = Column(String)
     channel_name = Column(String)
-    message_id = Column(Integer)
-    message_date = Column(String)
+    message_id = Column(BigInteger)
+    message_date = Column(TIMESTAMP(timezone=True), primary_key=True, server_default=text("now()"))
+    __table_args__ = (
+        Index("uq_prices_product_message_date", "product_id", "message_id", "message_date", unique=True),
+        {"postgresql_partition_by": "RANGE (message_date)"},
+    )
+
+class LatestPrice(Base):
+    # Текущая цена эталона по региону и каналу; ведётся upsert_latest_prices при загрузке.
+    # Пустая строка вместо NULL в region/channel — они часть первичного ключа
+    __tablename__ = "latest_prices"
+    standard_id = Column(Integer, ForeignKey("products_cleaned.id", ondelete="CASCADE"), primary_key=True)
+    region = Column(String, primary_key=True, default="")
+    channel = Column(String, primary_key=True, default="")
+    price = Column(Integer, nullable=False)
+    previous_price = Column(Integer)
+    country = Column(String)
+    message_date = Column(TIMESTAMP(timezone=True), nullable=False)
+    updated_at = Column(TIMESTAMP(timezone=True))
+
+class PriceDaily(Base):
+    # Дневные агрегаты цен старше окна сырых данных (compaction.py)
+    __tablename__ = "price_daily"
+    standard_id = Column(Integer, ForeignKey("products_cleaned.id", ondelete="CASCADE"), primary_key=True)
+    region = Column(String, primary_key=True, default="")
+    channel = Column(String, primary_key=True, default="")
+    day = Column(Date, primary_key=True)
+    min_price = Column(Integer, nullable=False)
+    max_price = Column(Integer, nullable=False)
+    last_price = Column(Integer, nullable=False)
+    last_at = Column(TIMESTAMP(timezone=True), nullable=False)
+    count = Column(Integer, nullable=False)
 
 class SourceID(Base):
     __tablename__ = "source_ids"
@@ -64,6 +97,14 @@ class UnmatchedModel(Base):
     source_channel = Column(String)
     first_seen = Column(String)
     sample_price = Column(Integer)
+    occurrences = Column(Integer, default=1)
+    last_seen = Column(TIMESTAMP)
+    min_price = Column(Integer)
+    max_price = Column(Integer)
+    # source_channel может быть NULL — уникальность по COALESCE, см. ON CONFLICT в save_unmatched_models
+    __table_args__ = (
+        Index("uq_unmatched_models_raw_name_channel", "raw_name", text("COALESCE(source_channel, '')"), unique=True),
+    )
 
 class Message(Base):
     __tablename__ = "messages"
@@ -76,6 +117,7 @@ class Message(Base):
     account_id = Column(String)
     direction = Column(String, default="incoming")
     approved = Column(Boolean, default=None)
+    __table_args__ = (Index("ix_messages_chat_id_timestamp", "chat_id", "timestamp"),)
 
 class ProcessedChannel(Base):
     __tablename__ = "processed_channels"
@@ -83,6 +125,74 @@ class ProcessedChannel(Base):
     account_id = Column(String)
     processed_at = Column(TIMESTAMP)
 
+class ChannelCursor(Base):
+    __tablename__ = "channel_cursors"
+    channel_id = Column(BigInteger, primary_key=True)
+    account_id = Column(String, primary_key=True)
+    last_message_id = Column(BigInteger, nullable=False, default=0)
+    last_message_date = Column(TIMESTAMP(timezone=True))
+    updated_at = Column(TIMESTAMP)
+
+class EntityCache(Base):
+    __tablename__ = "entity_cache"
+    account_id = Column(String, primary_key=True)
+    entity_id = Column(BigInteger, primary_key=True)
+    type = Column(String, nullable=False)
+    access_hash = Column(BigInteger)
+    kind = Column(String)
+    title = Column(String)
+    username = Column(String)
+    resolved_at = Column(TIMESTAMP)
+
+class BackfillProgress(Base):
+    __tablename__ = "backfill_progress"
+    channel_id = Column(BigInteger, primary_key=True)
+    account_id = Column(String, primary_key=True)
+    type = Column(String)
+    oldest_message_id = Column(BigInteger)
+    fetched = Column(Integer, nullable=False, default=0)
+    done = Column(Boolean, nullable=False, default=False)
+    backfill_limit = Column(Integer)
+    updated_at = Column(TIMESTAMP)
+
+class MessageHash(Base):
+    __tablename__ = "message_hashes"
+    channel_id = Column(BigInteger, primary_key=True)
+    content_hash = Column(String(32), primary_key=True)
+    message_id = Column(BigInteger)
+    seen_at = Column(TIMESTAMP)
+
+class ChannelLineHashes(Base):
+    __tablename__ = "channel_line_hashes"
+    channel_id = Column(BigInteger, primary_key=True)
+    message_id = Column(BigInteger)
+    line_hashes = Column(ARRAY(BigInteger), nullable=False)
+    updated_at = Column(TIMESTAMP)
+
+class Color(Base):
+    __tablename__ = "colors"
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+
+class ExcludedLine(Base):
+    # Строки, исключённые целиком через /exclude; ключ — alias_key текста без цены
+    __tablename__ = "excluded_lines"
+    id = Column(Integer, primary_key=True)
+    line_key = Column(String, unique=True, nullable=False)
+
+class ProductAlias(Base):
+    __tablename__ = "product_aliases"
+    alias = Column(String, primary_key=True)
+    standard_id = Column(Integer, ForeignKey("products_cleaned.id", ondelete="CASCADE"), nullable=False)
+    source = Column(String)
+    created_at = Column(TIMESTAMP)
+
+class NormalizerState(Base):
+    __tablename__ = "normalizer_state"
+    id = Column(Integer, primary_key=True, default=1)
+    version = Column(Integer, nullable=False)
+    rekeyed_at = Column(TIMESTAMP)
+
 def init_db():
     Base.metadata.create_all(bind=engine)
 
@@ -226,15 +336,7 @@ def get_session():
 def save_unmatched_model(raw_name: str, source_channel: str, price: int, brand=None, model=None, region=None, is_auto=False):
     session = get_connection()
     try:
-        # Не дублируем
-        exists = session.execute(
-            text("SELECT 1 FROM unmatched_models WHERE raw_name = :raw_name AND source_channel = :source_channel"),
-            {"raw_name": raw_name, "source_channel": source_channel}
-        ).first()
-        if exists:
-            return
-
-        # Сохраняем без region_flag
+        # Сохраняем без region_flag; повтор той же пары (raw_name, source_channel) не дублируем
         session.execute(
             text("""
                 INSERT INTO unmatched_models (
@@ -247,6 +349,7 @@ def save_unmatched_model(raw_name: str, source_channel: str, price: int, brand=N
                     :detected_brand, :detected_model, :detected_region,
                     :is_auto_detected
                 )
+                ON CONFLICT (raw_name, (COALESCE(source_channel, ''))) DO NOTHING
             """),
             {
                 "raw_name": raw_name,
@@ -263,6 +366,71 @@ def save_unmatched_model(raw_name: str, source_channel: str, price: int, brand=N
     finally:
         session.close()
 
+def save_unmatched_models(rows: List[dict]):
+    """
+    Пакетная запись агрегатов из unmatched_buffer одним upsert: у существующих
+    пар (raw_name, source_channel) растут счётчик, last_seen и диапазон цен,
+    новые пары добавляются. Пары в rows уникальны (буфер агрегирует по ним).
+    """
+    if not rows:
+        return
+
+    params = {
+        "raw_names": [r["raw_name"] for r in rows],
+        "source_channels": [r["source_channel"] for r in rows],
+        "prices": [r["price"] for r in rows],
+        "brands": [r.get("brand") for r in rows],
+        "models": [r.get("model") for r in rows],
+        "regions": [r.get("region") for r in rows],
+        "is_auto": [r.get("is_auto", False) for r in rows],
+        "counts": [r["count"] for r in rows],
+        "first_seen": [r["first_seen"].isoformat() for r in rows],
+        "last_seen": [r["last_seen"].isoformat() for r in rows],
+        "min_prices": [r["min_price"] for r in rows],
+        "max_prices": [r["max_price"] for r in rows]
+    }
+    values = """
+        unnest(
+            CAST(:raw_names AS text[]),
+            CAST(:source_channels AS text[]),
+            CAST(:prices AS integer[]),
+            CAST(:brands AS text[]),
+            CAST(:models AS text[]),
+            CAST(:regions AS text[]),
+            CAST(:is_auto AS boolean[]),
+            CAST(:counts AS integer[]),
+            CAST(:first_seen AS text[]),
+            CAST(:last_seen AS timestamp[]),
+            CAST(:min_prices AS integer[]),
+            CAST(:max_prices AS integer[])
+        ) AS v(raw_name, source_channel, sample_price, detected_brand, detected_model, detected_region,
+               is_auto_detected, occurrences, first_seen, last_seen, min_price, max_price)
+    """
+    session = get_connection()
+    try:
+        session.execute(
+            text(f"""
+                INSERT INTO unmatched_models (
+                    raw_name, source_channel, first_seen, sample_price,
+                    detected_brand, detected_model, detected_region,
+                    is_auto_detected, occurrences, last_seen, min_price, max_price
+                )
+                SELECT v.raw_name, v.source_channel, v.first_seen, v.sample_price,
+                       v.detected_brand, v.detected_model, v.detected_region,
+                       v.is_auto_detected, v.occurrences, v.last_seen, v.min_price, v.max_price
+                FROM {values}
+                ON CONFLICT (raw_name, (COALESCE(source_channel, ''))) DO UPDATE SET
+                    occurrences = COALESCE(unmatched_models.occurrences, 1) + EXCLUDED.occurrences,
+                    last_seen = GREATEST(unmatched_models.last_seen, EXCLUDED.last_seen),
+                    min_price = LEAST(COALESCE(unmatched_models.min_price, unmatched_models.sample_price), EXCLUDED.min_price),
+                    max_price = GREATEST(COALESCE(unmatched_models.max_price, unmatched_models.sample_price), EXCLUDED.max_price)
+            """),
+            params
+        )
+        session.commit()
+    finally:
+        session.close()
+
 def was_channel_processed(channel_id: int, account_id: str) -> bool:
     session = get_connection()
     try:
@@ -293,6 +461,309 @@ def add_processed_channel(channel_id: int, account_id: str):
     finally:
         session.close()
 
+def get_channel_cursor(channel_id: int) -> Optional[dict]:
+    # message_id в канале одинаков для всех аккаунтов: если канал перешёл к другому
+    # аккаунту, он продолжает с самого дальнего курсора, а не читает историю заново
+    with get_session() as session:
+        row = session.execute(
+            text("""
+                SELECT last_message_id, last_message_date FROM channel_cursors
+                WHERE channel_id = :channel_id
+                ORDER BY last_message_id DESC
+                LIMIT 1
+            """),
+            {"channel_id": channel_id}
+        ).first()
+        return dict(row._mapping) if row else None
+
+
+def save_channel_cursor(channel_id: int, account_id: str, last_message_id: int, last_message_date=None):
+    # Курсор только растёт: устаревшая запись не должна откатить его назад
+    with get_session() as session:
+        session.execute(
+            text("""
+                INSERT INTO channel_cursors (channel_id, account_id, last_message_id, last_message_date, updated_at)
+                VALUES (:channel_id, :account_id, :last_message_id, :last_message_date, CURRENT_TIMESTAMP)
+                ON CONFLICT (channel_id, account_id) DO UPDATE SET
+                    last_message_id = GREATEST(channel_cursors.last_message_id, EXCLUDED.last_message_id),
+                    last_message_date = CASE
+                        WHEN EXCLUDED.last_message_id >= channel_cursors.last_message_id
+                        THEN EXCLUDED.last_message_date
+                        ELSE channel_cursors.last_message_date
+                    END,
+                    updated_at = CURRENT_TIMESTAMP
+            """),
+            {
+                "channel_id": channel_id,
+                "account_id": account_id,
+                "last_message_id": last_message_id,
+                "last_message_date": last_message_date
+            }
+        )
+        session.commit()
+
+def get_cached_entities(account_id: str) -> dict:
+    """(type, entity_id) → сохранённые данные entity, разрешённые этим аккаунтом ранее."""
+    with get_session() as session:
+        rows = session.execute(
+            text("""
+                SELECT entity_id, type, access_hash, kind, title, username, resolved_at
+                FROM entity_cache WHERE account_id = :account_id
+            """),
+            {"account_id": account_id}
+        ).fetchall()
+        return {(row.type, row.entity_id): dict(row._mapping) for row in rows}
+
+
+def save_cached_entity(account_id: str, entity: dict):
+    with get_session() as session:
+        session.execute(
+            text("""
+                INSERT INTO entity_cache (account_id, entity_id, type, access_hash, kind, title, username, resolved_at)
+                VALUES (:account_id, :entity_id, :type, :access_hash, :kind, :title, :username, CURRENT_TIMESTAMP)
+                ON CONFLICT (account_id, entity_id) DO UPDATE SET
+                    type = EXCLUDED.type,
+                    access_hash = EXCLUDED.access_hash,
+                    kind = EXCLUDED.kind,
+                    title = EXCLUDED.title,
+                    username = EXCLUDED.username,
+                    resolved_at = CURRENT_TIMESTAMP
+            """),
+            {
+                "account_id": account_id,
+                **{key: entity.get(key) for key in ("entity_id", "type", "access_hash", "kind", "title", "username")}
+            }
+        )
+        session.commit()
+
+
+def get_backfill_progress() -> dict:
+    """(channel_id, account_id) → прогресс загрузки истории источника этим аккаунтом."""
+    with get_session() as session:
+        rows = session.execute(text("""
+            SELECT channel_id, account_id, type, oldest_message_id, fetched, done, backfill_limit
+            FROM backfill_progress
+        """)).fetchall()
+        return {(row.channel_id, row.account_id): dict(row._mapping) for row in rows}
+
+
+def save_backfill_progress(channel_id: int, account_id: str, type_: str, oldest_message_id: Optional[int],
+                           fetched: int, done: bool, backfill_limit: int):
+    with get_session() as session:
+        session.execute(
+            text("""
+                INSERT INTO backfill_progress (channel_id, account_id, type, oldest_message_id, fetched, done, backfill_limit, updated_at)
+                VALUES (:channel_id, :account_id, :type, :oldest_message_id, :fetched, :done, :backfill_limit, CURRENT_TIMESTAMP)
+                ON CONFLICT (channel_id, account_id) DO UPDATE SET
+                    type = EXCLUDED.type,
+                    oldest_message_id = EXCLUDED.oldest_message_id,
+                    fetched = EXCLUDED.fetched,
+                    done = EXCLUDED.done,
+                    backfill_limit = EXCLUDED.backfill_limit,
+                    updated_at = CURRENT_TIMESTAMP
+            """),
+            {
+                "channel_id": channel_id,
+                "account_id": account_id,
+                "type": type_,
+                "oldest_message_id": oldest_message_id,
+                "fetched": fetched,
+                "done": done,
+                "backfill_limit": backfill_limit
+            }
+        )
+        session.commit()
+
+def get_seen_message_hashes(session, pairs) -> set:
+    """Какие из пар (channel_id, content_hash) уже обработаны."""
+    pairs = list(set(pairs))
+    if not pairs:
+        return set()
+    rows = session.execute(
+        text("""
+            SELECT mh.channel_id, mh.content_hash
+            FROM message_hashes mh
+            JOIN unnest(CAST(:channel_ids AS bigint[]), CAST(:hashes AS text[])) AS v(channel_id, content_hash)
+              ON mh.channel_id = v.channel_id AND mh.content_hash = v.content_hash
+        """),
+        {"channel_ids": [p[0] for p in pairs], "hashes": [p[1] for p in pairs]}
+    ).fetchall()
+    return {(row.channel_id, row.content_hash) for row in rows}
+
+
+def get_last_line_hashes(session, channel_ids) -> dict:
+    """channel_id → множество хэшей строк последнего обработанного прайса канала."""
+    channel_ids = list(set(channel_ids))
+    if not channel_ids:
+        return {}
+    rows = session.execute(
+        text("SELECT channel_id, line_hashes FROM channel_line_hashes WHERE channel_id = ANY(CAST(:ids AS bigint[]))"),
+        {"ids": channel_ids}
+    ).fetchall()
+    return {row.channel_id: set(row.line_hashes) for row in rows}
+
+
+def save_content_hashes(session, message_hashes: List[tuple], line_hashes: dict, ttl_days: int):
+    """
+    Запоминает обработанные сообщения [(channel_id, content_hash, message_id), ...]
+    и хэши строк последнего прайса {channel_id: (message_id, [hash, ...])}.
+    Хэши сообщений старше ttl_days по затронутым каналам удаляются. Без commit —
+    сохраняется вместе с ценами в транзакции вызывающего.
+    """
+    now = datetime.now().isoformat()
+    if message_hashes:
+        session.execute(
+            text("""
+                INSERT INTO message_hashes (channel_id, content_hash, message_id, seen_at)
+                SELECT v.channel_id, v.content_hash, v.message_id, :now
+                FROM unnest(
+                    CAST(:channel_ids AS bigint[]),
+                    CAST(:hashes AS text[]),
+                    CAST(:message_ids AS bigint[])
+                ) AS v(channel_id, content_hash, message_id)
+                ON CONFLICT (channel_id, content_hash) DO UPDATE SET seen_at = EXCLUDED.seen_at
+            """),
+            {
+                "now": now,
+                "channel_ids": [m[0] for m in message_hashes],
+                "hashes": [m[1] for m in message_hashes],
+                "message_ids": [m[2] for m in message_hashes]
+            }
+        )
+        session.execute(
+            text("""
+                DELETE FROM message_hashes
+                WHERE channel_id = ANY(CAST(:ids AS bigint[]))
+                  AND seen_at < CAST(:now AS timestamp) - make_interval(days => :ttl_days)
+            """),
+            {"ids": list({m[0] for m in message_hashes}), "now": now, "ttl_days": ttl_days}
+        )
+
+    for channel_id, (message_id, hashes) in line_hashes.items():
+        session.execute(
+            text("""
+                INSERT INTO channel_line_hashes (channel_id, message_id, line_hashes, updated_at)
+                VALUES (:channel_id, :message_id, :line_hashes, :now)
+                ON CONFLICT (channel_id) DO UPDATE SET
+                    message_id = EXCLUDED.message_id,
+                    line_hashes = EXCLUDED.line_hashes,
+                    updated_at = EXCLUDED.updated_at
+            """),
+            {"channel_id": channel_id, "message_id": message_id, "line_hashes": list(hashes), "now": now}
+        )
+
+def save_aliases(session, aliases: List[tuple], source: str):
+    """
+    Запоминает подтверждённые человеком соответствия [(alias, standard_id), ...].
+    Без commit — пишется в транзакции вызывающего вместе с самим подтверждением.
+    """
+    aliases = {alias: standard_id for alias, standard_id in aliases if alias and standard_id}
+    if not aliases:
+        return
+    session.execute(
+        text("""
+            INSERT INTO product_aliases (alias, standard_id, source, created_at)
+            SELECT v.alias, v.standard_id, :source, CURRENT_TIMESTAMP
+            FROM unnest(CAST(:aliases AS text[]), CAST(:sids AS integer[])) AS v(alias, standard_id)
+            ON CONFLICT (alias) DO UPDATE SET
+                standard_id = EXCLUDED.standard_id,
+                source = EXCLUDED.source,
+                created_at = EXCLUDED.created_at
+        """),
+        {"aliases": list(aliases), "sids": list(aliases.values()), "source": source}
+    )
+
+
+def upsert_latest_prices(session, rows: List[tuple]):
+    """
+    Обновляет latest_prices по строкам [(standard_id, channel, price, country, message_date), ...].
+
+    Регион берётся из эталона. Более старая цена (например, из загрузки истории)
+    текущую не вытесняет; previous_price — последняя отличавшаяся цена.
+    Без commit — пишется в транзакции вызывающего вместе с самими ценами.
+    """
+    # В одном upsert ключ может встретиться только раз — оставляем самую свежую цену
+    latest = {}
+    for standard_id, channel, price, country, message_date in rows:
+        key = (standard_id, channel or "")
+        if key not in latest or message_date >= latest[key][2]:
+            latest[key] = (price, country, message_date)
+    if not latest:
+        return
+    keys = list(latest)
+    session.execute(
+        text("""
+            INSERT INTO latest_prices (standard_id, region, channel, price, previous_price, country, message_date, updated_at)
+            SELECT v.standard_id, COALESCE(pc.region, ''), v.channel, v.price, NULL, v.country, v.message_date, CURRENT_TIMESTAMP
+            FROM unnest(
+                CAST(:sids AS integer[]),
+                CAST(:channels AS text[]),
+                CAST(:prices AS integer[]),
+                CAST(:countries AS text[]),
+                CAST(:dates AS timestamptz[])
+            ) AS v(standard_id, channel, price, country, message_date)
+            JOIN products_cleaned pc ON pc.id = v.standard_id
+            ON CONFLICT (standard_id, region, channel) DO UPDATE SET
+                previous_price = CASE
+                    WHEN EXCLUDED.price <> latest_prices.price THEN latest_prices.price
+                    ELSE latest_prices.previous_price
+                END,
+                price = EXCLUDED.price,
+                country = EXCLUDED.country,
+                message_date = EXCLUDED.message_date,
+                updated_at = EXCLUDED.updated_at
+            WHERE EXCLUDED.message_date >= latest_prices.message_date
+        """),
+        {
+            "sids": [k[0] for k in keys],
+            "channels": [k[1] for k in keys],
+            "prices": [latest[k][0] for k in keys],
+            "countries": [latest[k][1] for k in keys],
+            "dates": [latest[k][2] for k in keys]
+        }
+    )
+
+
+def delete_aliases(session, aliases: List[tuple]):
+    """Удаляет соответствия [(alias, standard_id), ...], например после отвязки товара."""
+    if not aliases:
+        return
+    session.execute(
+        text("""
+            DELETE FROM product_aliases pa
+            USING unnest(CAST(:aliases AS text[]), CAST(:sids AS integer[])) AS v(alias, standard_id)
+            WHERE pa.alias = v.alias AND pa.standard_id = v.standard_id
+        """),
+        {"aliases": [a[0] for a in aliases], "sids": [a[1] for a in aliases]}
+    )
+
+def get_normalizer_version() -> Optional[int]:
+    """Версия нормализации, которой посчитаны products_cleaned.name_std (None — ещё не пересчитывались)."""
+    with get_session() as session:
+        return session.execute(text("SELECT version FROM normalizer_state WHERE id = 1")).scalar()
+
+
+def save_normalizer_version(version: int):
+    with get_session() as session:
+        session.execute(
+            text("""
+                INSERT INTO normalizer_state (id, version, rekeyed_at)
+                VALUES (1, :version, CURRENT_TIMESTAMP)
+                ON CONFLICT (id) DO UPDATE SET version = EXCLUDED.version, rekeyed_at = EXCLUDED.rekeyed_at
+            """),
+            {"version": version}
+        )
+        session.commit()
+
+def get_exclusion_phrases() -> List[str]:
+    with get_session() as session:
+        rows = session.execute(text("SELECT phrase FROM exclusion_phrases")).fetchall()
+        return [row[0].lower() for row in rows if row[0]]
+
+def get_excluded_lines() -> List[str]:
+    with get_session() as session:
+        return [row[0] for row in session.execute(text("SELECT line_key FROM excluded_lines")).fetchall()]
+
 def get_region_map() -> dict:
     with get_session() as session:
         rows = session.execute(text("SELECT flag, code FROM regions")).fetchall()
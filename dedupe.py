@@ -0,0 +1,113 @@
+# dedupe.py — ограниченная по размеру и времени память о недавно обработанных сообщениях
+
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+
+class _ChatRing:
+    """Кольцевой буфер последних message_id одного чата на двух плоских массивах.
+
+    Массивы растут по мере поступления сообщений и только после заполнения
+    начинают перезаписываться по кругу, так что тихие чаты почти не занимают памяти.
+    """
+
+    __slots__ = ("ids", "stamps", "pos", "touched")
+
+    def __init__(self):
+        self.ids = array("q")
+        self.stamps = array("d")
+        self.pos = 0
+        self.touched = 0.0
+
+    def find(self, msg_id: int) -> int:
+        try:
+            return self.ids.index(msg_id)
+        except ValueError:
+            return -1
+
+    def add(self, msg_id: int, stamp: float, capacity: int) -> bool:
+        """Добавляет id; возвращает True, если пришлось вытеснить самый старый."""
+        if len(self.ids) < capacity:
+            self.ids.append(msg_id)
+            self.stamps.append(stamp)
+            return False
+        self.ids[self.pos] = msg_id
+        self.stamps[self.pos] = stamp
+        self.pos = (self.pos + 1) % capacity
+        return True
+
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.ids) + sys.getsizeof(self.stamps)
+
+
+class RecentMessages:
+    """
+    Дедупликация (chat_id, msg_id) для live-обработчика.
+
+    На каждый чат хранится кольцо из per_chat последних id с временем добавления,
+    чатов не больше max_chats (вытесняется давно молчащий). Запись старше ttl
+    секунд считается забытой. Память — O(max_chats × per_chat × 16 байт).
+    """
+
+    def __init__(self, per_chat: int = 512, max_chats: int = 2000, ttl: float = 6 * 3600):
+        self.per_chat = per_chat
+        self.max_chats = max_chats
+        self.ttl = ttl
+        self._chats = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "added": 0, "ring_evictions": 0, "ttl_expired": 0, "chat_evictions": 0}
+
+    def seen(self, chat_id: int, msg_id: int) -> bool:
+        """True, если сообщение уже встречалось в пределах окна; иначе запоминает его."""
+        now = time.monotonic()
+        with self._lock:
+            ring = self._chats.get(chat_id)
+            if ring is None:
+                ring = self._chats[chat_id] = _ChatRing()
+                if len(self._chats) > self.max_chats:
+                    self._chats.popitem(last=False)
+                    self.stats["chat_evictions"] += 1
+            else:
+                self._chats.move_to_end(chat_id)
+            ring.touched = now
+            self._expire_chats(now)
+
+            index = ring.find(msg_id)
+            if index >= 0:
+                if now - ring.stamps[index] <= self.ttl:
+                    self.stats["hits"] += 1
+                    return True
+                # Запись устарела — обновляем её на месте
+                ring.stamps[index] = now
+                self.stats["ttl_expired"] += 1
+                return False
+
+            if ring.add(msg_id, now, self.per_chat):
+                self.stats["ring_evictions"] += 1
+            self.stats["added"] += 1
+            return False
+
+    def _expire_chats(self, now: float):
+        # Чаты упорядочены по последнему обращению: молчащие дольше ttl лежат в начале
+        while self._chats:
+            chat_id, ring = next(iter(self._chats.items()))
+            if now - ring.touched <= self.ttl:
+                break
+            del self._chats[chat_id]
+            self.stats["ttl_expired"] += len(ring.ids)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            chats = len(self._chats)
+            entries = sum(len(ring.ids) for ring in self._chats.values())
+            memory = sys.getsizeof(self._chats) + sum(ring.nbytes() for ring in self._chats.values())
+            stats = dict(self.stats)
+        return {
+            "chats": chats,
+            "entries": entries,
+            "memory_kb": round(memory / 1024, 1),
+            **stats,
+        }
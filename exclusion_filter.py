@@ -0,0 +1,165 @@
+# exclusion_filter.py — автомат Ахо-Корасик по фразам из exclusion_phrases и точные строки из excluded_lines
+
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from alias_index import alias_key
+
+logger = logging.getLogger(__name__)
+
+
+class PhraseMatcher:
+    """
+    Автомат Ахо-Корасик: поиск любой из фраз в строке за один линейный проход,
+    независимо от числа фраз. Сравнение без учёта регистра и только по границам
+    слов: «pro» не находится внутри «iphone 15 promax».
+    """
+
+    def __init__(self, phrases):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [None]   # фраза, заканчивающаяся ровно в узле
+        self._dict = [0]     # ближайший узел fail-цепочки, где заканчивается фраза
+        self.size = 0
+        for phrase in phrases:
+            phrase = phrase.strip().lower()
+            if phrase:
+                self._add(phrase)
+        self._build()
+
+    def _add(self, phrase: str):
+        node = 0
+        for ch in phrase:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(None)
+                self._dict.append(0)
+            node = nxt
+        if self._out[node] is None:
+            self._out[node] = phrase
+            self.size += 1
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                target = self._fail[child]
+                self._dict[child] = target if self._out[target] is not None else self._dict[target]
+
+    def find(self, text: str):
+        """Первая найденная фраза, стоящая в строке отдельными словами, или None."""
+        goto, fail, out, dict_link = self._goto, self._fail, self._out, self._dict
+        text = text.lower()
+        node = 0
+        for end, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            match = node if out[node] is not None else dict_link[node]
+            while match:
+                if _on_word_boundaries(text, out[match], end):
+                    return out[match]
+                match = dict_link[match]
+        return None
+
+
+def _on_word_boundaries(text: str, phrase: str, end: int) -> bool:
+    """Фраза, кончающаяся на позиции end, не продолжает соседнее слово ни слева, ни справа."""
+    start = end - len(phrase) + 1
+    if phrase[0].isalnum() and start > 0 and text[start - 1].isalnum():
+        return False
+    if phrase[-1].isalnum() and end + 1 < len(text) and text[end + 1].isalnum():
+        return False
+    return True
+
+
+_lock = threading.Lock()
+_matcher = None
+_excluded_lines = None  # ключи alias_key строк, исключённых целиком через /exclude
+
+filter_stats = {
+    "lines_checked": 0,
+    "lines_excluded": 0,
+    "rebuilds": 0,
+    "built_at": None,
+}
+
+
+def _load_matcher() -> PhraseMatcher:
+    global _matcher, _excluded_lines
+    from database import get_exclusion_phrases, get_excluded_lines
+
+    matcher = PhraseMatcher(get_exclusion_phrases())
+    excluded_lines = frozenset(get_excluded_lines())
+    with _lock:
+        _matcher = matcher
+        _excluded_lines = excluded_lines
+        filter_stats["rebuilds"] += 1
+        filter_stats["built_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    logger.info(f"🚫 Фильтр исключений собран: {matcher.size} фраз, {len(excluded_lines)} строк")
+    return matcher
+
+
+def get_matcher() -> PhraseMatcher:
+    """Текущий автомат; собирается при первом обращении и после invalidate_exclusion_filter."""
+    matcher = _matcher
+    if matcher is None:
+        try:
+            matcher = _load_matcher()
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось загрузить фразы исключений: {e}")
+            matcher = PhraseMatcher([])
+    return matcher
+
+
+def invalidate_exclusion_filter():
+    """Вызывается после изменения exclusion_phrases или excluded_lines; фильтр пересоберётся при следующей строке."""
+    global _matcher, _excluded_lines
+    with _lock:
+        _matcher = None
+        _excluded_lines = None
+
+
+def filter_excluded(lines: list) -> list:
+    """Оставляет строки, в которых нет ни одной фразы исключения."""
+    matcher = get_matcher()
+    if not matcher.size:
+        kept = lines
+    else:
+        kept = [line for line in lines if matcher.find(line) is None]
+    with _lock:
+        filter_stats["lines_checked"] += len(lines)
+        filter_stats["lines_excluded"] += len(lines) - len(kept)
+    return kept
+
+
+def is_excluded_line(model_text: str) -> bool:
+    """Строка без цены совпадает целиком (без учёта регистра и пробелов) с исключённой через /exclude."""
+    excluded = _excluded_lines
+    if excluded is None:
+        get_matcher()
+        excluded = _excluded_lines or frozenset()
+    if not excluded or alias_key(model_text) not in excluded:
+        return False
+    with _lock:
+        filter_stats["lines_excluded"] += 1
+    return True
+
+
+def get_filter_stats() -> dict:
+    with _lock:
+        stats = dict(filter_stats)
+        stats["phrases"] = _matcher.size if _matcher is not None else None
+    return stats
@@ -0,0 +1,239 @@
+"""
+Проверка планов горячих запросов загрузки цен через EXPLAIN.
+
+Запуск (нужен локальный Postgres из .env / database.py после `alembic upgrade head`):
+    python explain_check.py --rows 20000
+
+Таблицы наполняются синтетическими строками внутри одной транзакции, после
+ANALYZE для каждого запроса проверяется, что таблица читается по индексу,
+а ON CONFLICT попадает в нужный уникальный индекс. В конце всё откатывается.
+Код возврата 1, если хотя бы одна проверка не прошла.
+"""
+import argparse
+import json
+import re
+import sys
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from database import get_connection
+
+# (описание, запрос, параметры, таблица, ожидаемый индекс или None — любой индекс таблицы).
+# prices секционирована: в плане видны секции со своими именами индексов, поэтому индекс не задан
+LOOKUPS = [
+    (
+        "products_cleaned по name_std",
+        "SELECT id FROM products_cleaned WHERE name_std = :name_std",
+        {"name_std": "explain std 777"},
+        "products_cleaned", None,
+    ),
+    (
+        "products_cleaned по списку name_std (resolve_standard_ids)",
+        "SELECT name_std, id FROM products_cleaned WHERE name_std = ANY(:names)",
+        {"names": ["explain std 1", "explain std 2", "explain std 3"]},
+        "products_cleaned", None,
+    ),
+    (
+        "products по (standard_id, name)",
+        "SELECT id FROM products WHERE standard_id = (SELECT MIN(id) FROM products_cleaned) AND name = :name",
+        {"name": "explain product 1"},
+        "products", "uq_products_standard_id_name",
+    ),
+    (
+        "prices по (product_id, message_id)",
+        "SELECT 1 FROM prices WHERE product_id = (SELECT MIN(id) FROM products) AND message_id = :message_id",
+        {"message_id": -7},
+        "prices", None,
+    ),
+    (
+        "unmatched_models по (raw_name, source_channel)",
+        "SELECT 1 FROM unmatched_models WHERE raw_name = :raw_name AND COALESCE(source_channel, '') = :channel",
+        {"raw_name": "explain raw 7", "channel": "explain"},
+        "unmatched_models", "uq_unmatched_models_raw_name_channel",
+    ),
+    (
+        "processed_channels по (channel_id, account_id)",
+        "SELECT 1 FROM processed_channels WHERE channel_id = :channel_id AND account_id = :account_id",
+        {"channel_id": -7, "account_id": "explain"},
+        "processed_channels", None,
+    ),
+    (
+        "messages: последние по chat_id (get_recent_dialogue)",
+        "SELECT direction, username, text FROM messages WHERE chat_id = :chat_id ORDER BY timestamp DESC LIMIT 10",
+        {"chat_id": -7},
+        "messages", "ix_messages_chat_id_timestamp",
+    ),
+]
+
+# (описание, INSERT ... ON CONFLICT, параметры, ожидаемый арбитр или None — любой)
+UPSERTS = [
+    (
+        "products ON CONFLICT (standard_id, name)",
+        """
+            INSERT INTO products (name, standard_id, approved)
+            VALUES (:name, (SELECT MIN(id) FROM products_cleaned), TRUE)
+            ON CONFLICT (standard_id, name) DO NOTHING
+        """,
+        {"name": "explain product 1"},
+        "uq_products_standard_id_name",
+    ),
+    (
+        "prices ON CONFLICT (product_id, message_id)",
+        """
+            INSERT INTO prices (product_id, price, message_id, message_date)
+            VALUES ((SELECT MIN(id) FROM products), 1, :message_id, :message_date)
+            ON CONFLICT (product_id, message_id, message_date) DO NOTHING
+        """,
+        {"message_id": -7, "message_date": datetime.now(timezone.utc)},
+        None,
+    ),
+    (
+        "unmatched_models ON CONFLICT (raw_name, source_channel)",
+        """
+            INSERT INTO unmatched_models (raw_name, source_channel, sample_price)
+            VALUES (:raw_name, 'explain', 1)
+            ON CONFLICT (raw_name, (COALESCE(source_channel, ''))) DO UPDATE SET
+                occurrences = COALESCE(unmatched_models.occurrences, 1) + 1
+        """,
+        {"raw_name": "explain raw 7"},
+        "uq_unmatched_models_raw_name_channel",
+    ),
+]
+
+# Выборка цен за последнюю неделю не должна трогать секции прошлых месяцев
+RECENT_PRICES_SQL = "SELECT product_id, price FROM prices WHERE message_date >= :since"
+RECENT_DAYS = 7
+
+
+def seed(session, rows: int):
+    params = {"rows": rows}
+    session.execute(text("""
+        INSERT INTO products_cleaned (brand, lineup, model, region, name_std)
+        SELECT 'Explain', NULL, 'Model ' || g, NULL, 'explain std ' || g
+        FROM generate_series(1, :rows) AS g
+        ON CONFLICT DO NOTHING
+    """), params)
+    session.execute(text("""
+        INSERT INTO products (name, standard_id, approved)
+        SELECT 'explain product ' || g, c.id, TRUE
+        FROM generate_series(1, 3) AS g
+        CROSS JOIN (SELECT id FROM products_cleaned WHERE name_std LIKE 'explain std %') AS c
+        ON CONFLICT DO NOTHING
+    """), params)
+    session.execute(text("""
+        INSERT INTO prices (product_id, price, channel_name, message_id, message_date)
+        SELECT p.id, 1000, 'explain', -g, NOW() - g * INTERVAL '1 day'
+        FROM generate_series(1, 3) AS g
+        CROSS JOIN (SELECT id FROM products WHERE name LIKE 'explain product %') AS p
+        ON CONFLICT DO NOTHING
+    """), params)
+    session.execute(text("""
+        INSERT INTO unmatched_models (raw_name, source_channel, first_seen, sample_price)
+        SELECT 'explain raw ' || g, 'explain', NOW()::text, 1000
+        FROM generate_series(1, :rows) AS g
+        ON CONFLICT DO NOTHING
+    """), params)
+    session.execute(text("""
+        INSERT INTO processed_channels (channel_id, account_id, processed_at)
+        SELECT -g, 'explain', NOW()
+        FROM generate_series(1, :rows) AS g
+        ON CONFLICT DO NOTHING
+    """), params)
+    session.execute(text("""
+        INSERT INTO messages (chat_id, user_id, username, text, timestamp, account_id)
+        SELECT -(g % 500), 0, 'explain', 'explain', (NOW() - g * INTERVAL '1 minute')::text, 'explain'
+        FROM generate_series(1, :rows) AS g
+    """), params)
+    for table in ("products_cleaned", "products", "prices", "unmatched_models", "processed_channels", "messages"):
+        session.execute(text(f"ANALYZE {table}"))
+
+
+def explain(session, sql: str, params: dict) -> dict:
+    plan = session.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def walk(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk(child)
+
+
+def is_table(relation, table: str) -> bool:
+    """relation — сама таблица или её секция (prices_2026_10, prices_default)."""
+    return relation == table or bool(relation and re.fullmatch(rf"{table}_(\d{{4}}_\d{{2}}|default)", relation))
+
+
+def check_lookup(plan: dict, table: str, index) -> str:
+    """Пустая строка, если таблица читается по индексу (и по нужному, если он задан); иначе — что нашлось."""
+    scans = [n for n in walk(plan) if is_table(n.get("Relation Name"), table)]
+    # Для Bitmap Heap Scan индекс указан у дочернего Bitmap Index Scan
+    index_names = {n.get("Index Name") for n in walk(plan) if n.get("Index Name")}
+    if not scans and not index_names:
+        return "таблица не встречается в плане"
+    seq = [n for n in scans if n["Node Type"] == "Seq Scan"]
+    if seq:
+        return "Seq Scan"
+    if index is not None and index not in index_names:
+        return f"индексы {sorted(index_names) or '—'}"
+    return ""
+
+
+def check_upsert(plan: dict, arbiter) -> str:
+    arbiters = [name for n in walk(plan) for name in n.get("Conflict Arbiter Indexes", [])]
+    if not arbiters or (arbiter is not None and arbiter not in arbiters):
+        return f"арбитры {arbiters or '—'}"
+    return ""
+
+
+def check_pruning(plan: dict, since: datetime) -> str:
+    first = f"prices_{since.year:04d}_{since.month:02d}"
+    stale = sorted(
+        n["Relation Name"] for n in walk(plan)
+        if re.fullmatch(r"prices_\d{4}_\d{2}", n.get("Relation Name") or "") and n["Relation Name"] < first
+    )
+    if stale:
+        return f"лишние секции: {', '.join(stale)}"
+    return ""
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=20000, help="сколько синтетических строк добавить в каждую таблицу")
+    args = ap.parse_args()
+
+    failed = 0
+    session = get_connection()
+    try:
+        seed(session, args.rows)
+        for title, sql, params, table, index in LOOKUPS:
+            problem = check_lookup(explain(session, sql, params), table, index)
+            failed += bool(problem)
+            print(f"{'❌' if problem else '✅'} {title}{': ' + problem if problem else ''}")
+        for title, sql, params, arbiter in UPSERTS:
+            try:
+                problem = check_upsert(explain(session, sql, params), arbiter)
+            except Exception as e:
+                # Нет подходящего уникального индекса — Postgres отвергает ON CONFLICT ещё на планировании
+                session.rollback()
+                seed(session, args.rows)
+                problem = str(e).splitlines()[0]
+            failed += bool(problem)
+            print(f"{'❌' if problem else '✅'} {title}{': ' + problem if problem else ''}")
+
+        since = datetime.now(timezone.utc) - timedelta(days=RECENT_DAYS)
+        problem = check_pruning(explain(session, RECENT_PRICES_SQL, {"since": since}), since)
+        failed += bool(problem)
+        print(f"{'❌' if problem else '✅'} prices за {RECENT_DAYS} дней: отсечение секций{': ' + problem if problem else ''}")
+    finally:
+        session.rollback()
+        session.close()
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
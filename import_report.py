@@ -0,0 +1,67 @@
+"""
+Отчёт о времени импорта точек входа.
+
+Каждый модуль импортируется в отдельном процессе с python -X importtime, поэтому
+кэш модулей не искажает цифры. Печатается общее время и самые тяжёлые импорты:
+    python import_report.py
+    python import_report.py parser scheduler --top 15
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+DEFAULT_MODULES = [
+    "main",
+    "parser",
+    "scheduler",
+    "aiogram_bot",
+    "telethon_client",
+    "backfill",
+    "web.unknowns_api",
+    "web.matrix_api",
+]
+
+
+def measure(module: str):
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    imports = []
+    errors = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            errors.append(line)
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # заголовок таблицы
+        self_us, cumulative_us, name = int(parts[0]), int(parts[1]), parts[2].rstrip()
+        imports.append((cumulative_us, self_us, name))
+
+    error = errors[-1] if proc.returncode != 0 and errors else None
+    return wall_ms, imports, error
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="модули для проверки")
+    ap.add_argument("--top", type=int, default=10, help="сколько самых тяжёлых импортов показать")
+    args = ap.parse_args()
+
+    for module in args.modules:
+        wall_ms, imports, error = measure(module)
+        own = next((cum for cum, _, name in imports if name.strip() == module), None)
+        print(f"📦 {module}: процесс {wall_ms:.0f} мс, импорт {own / 1000 if own else 0:.0f} мс")
+        if error:
+            print(f"   ❌ {error}")
+        for cumulative_us, self_us, name in sorted(imports, reverse=True)[:args.top]:
+            print(f"   {cumulative_us / 1000:8.1f} мс  (свои {self_us / 1000:6.1f})  {name.strip()}")
+
+
+if __name__ == "__main__":
+    main()
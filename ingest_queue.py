@@ -0,0 +1,161 @@
+# ingest_queue.py — очередь разбора входящих сообщений вне event loop
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from config import INGEST_WORKERS, INGEST_QUEUE_SIZE, INGEST_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class IngestQueue:
+    """
+    Ограниченная очередь сообщений и пул рабочих потоков.
+
+    Обработчик Telethon только кладёт сообщение в очередь (put), а разбор прайса
+    и запись в messages выполняются потоками пачками до batch_size сообщений.
+    При переполнении put ждёт свободного места, не блокируя event loop.
+    """
+
+    def __init__(self, workers: int = INGEST_WORKERS, maxsize: int = INGEST_QUEUE_SIZE, batch_size: int = INGEST_BATCH_SIZE):
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._threads = []
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "enqueued": 0,
+            "processed": 0,
+            "failed": 0,
+            "batches": 0,
+            "backpressure_waits": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+            "processing_ms_total": 0.0,
+            "processing_ms_max": 0.0,
+        }
+
+    def start(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"ingest-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"🧵 Очередь загрузки запущена: потоков {self.workers}, размер {self._queue.maxsize}, пачка {self.batch_size}")
+
+    def stop(self, timeout: float = 10.0):
+        """Дожидается разбора уже поставленных сообщений и останавливает потоки."""
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    async def put(self, message_text: str, source: dict, log_row: dict = None):
+        item = (time.monotonic(), message_text, source, log_row)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._stats_lock:
+                self.stats["backpressure_waits"] += 1
+            await asyncio.to_thread(self._queue.put, item)
+        with self._stats_lock:
+            self.stats["enqueued"] += 1
+
+    def _next_batch(self):
+        """Блокируется до первого сообщения и добирает без ожидания до batch_size."""
+        first = self._queue.get()
+        if first is _STOP:
+            return None
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # вернём стоп-сигнал, чтобы поток завершился после этой пачки
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _worker(self):
+        from parser import parse_messages
+        from utils import log_messages
+
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            started = time.monotonic()
+            wait_ms = [(started - item[0]) * 1000 for item in batch]
+            # parse_messages пробрасывает ошибку разбора — пачка считается неудавшейся
+            try:
+                parse_messages([(text_msg, source) for _, text_msg, source, _ in batch])
+                failed = 0
+            except Exception as e:
+                logger.exception(f"🔥 Ошибка при обработке пачки из {len(batch)} сообщений")
+                failed = len(batch)
+            # Журнал входящих сообщений пишется и для неразобранной пачки
+            log_rows = [log_row for *_, log_row in batch if log_row]
+            if log_rows:
+                try:
+                    log_messages(log_rows)
+                except Exception as e:
+                    logger.warning(f"⚠️ Не удалось записать журнал сообщений: {e}")
+            processing_ms = (time.monotonic() - started) * 1000
+
+            with self._stats_lock:
+                self.stats["batches"] += 1
+                self.stats["processed"] += len(batch) - failed
+                self.stats["failed"] += failed
+                self.stats["wait_ms_total"] += sum(wait_ms)
+                self.stats["wait_ms_max"] = max(self.stats["wait_ms_max"], max(wait_ms))
+                self.stats["processing_ms_total"] += processing_ms
+                self.stats["processing_ms_max"] = max(self.stats["processing_ms_max"], processing_ms)
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        done = stats["processed"] + stats["failed"]
+        return {
+            "depth": self._queue.qsize(),
+            "capacity": self._queue.maxsize,
+            "workers": len(self._threads),
+            "enqueued": stats["enqueued"],
+            "processed": stats["processed"],
+            "failed": stats["failed"],
+            "batches": stats["batches"],
+            "backpressure_waits": stats["backpressure_waits"],
+            "avg_wait_ms": round(stats["wait_ms_total"] / done, 1) if done else None,
+            "max_wait_ms": round(stats["wait_ms_max"], 1),
+            "avg_batch_ms": round(stats["processing_ms_total"] / stats["batches"], 1) if stats["batches"] else None,
+            "max_batch_ms": round(stats["processing_ms_max"], 1),
+        }
+
+
+_ingest_queue = None
+
+
+def get_ingest_queue() -> IngestQueue:
+    global _ingest_queue
+    if _ingest_queue is None:
+        _ingest_queue = IngestQueue()
+        _ingest_queue.start()
+    return _ingest_queue
+
+
+def get_ingest_stats() -> dict:
+    return _ingest_queue.get_stats() if _ingest_queue is not None else {}
+
+
+def stop_ingest_queue():
+    if _ingest_queue is not None:
+        _ingest_queue.stop()
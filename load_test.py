@@ -0,0 +1,113 @@
+"""
+Нагрузочная проверка задержек веб-маршрутов во время обхода каналов.
+
+Запуск (приложение уже работает, например `python main.py`):
+    python load_test.py --base-url http://127.0.0.1:8000 --concurrency 20 --duration 30
+
+Два замера по --duration секунд: сначала в покое, затем во время обхода,
+который запускается запросом к --crawl-path. Для каждого выводятся
+p50/p95/p99/max задержки маршрутов; после перевода маршрутов на асинхронную
+сессию p95 под нагрузкой должен оставаться близким к замеру в покое.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_PATHS = ["/unknowns", "/unknowns/", "/unknowns/api/rows?page=1", "/matrix"]
+
+
+async def http_get(host: str, port: int, path: str, timeout: float) -> int:
+    """GET без сторонних клиентов; возвращает HTTP-статус."""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        await asyncio.wait_for(reader.read(), timeout)
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def measure(host: str, port: int, paths: list, concurrency: int, duration: float, timeout: float) -> dict:
+    latencies = {path: [] for path in paths}
+    errors = {path: 0 for path in paths}
+    deadline = time.monotonic() + duration
+
+    async def worker(n: int):
+        i = n
+        while time.monotonic() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                status = await http_get(host, port, path, timeout)
+            except Exception:
+                status = None
+            elapsed = (time.perf_counter() - started) * 1000
+            if status is not None and status < 400:
+                latencies[path].append(elapsed)
+            else:
+                errors[path] += 1
+
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return {path: (latencies[path], errors[path]) for path in paths}
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return float("nan")
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[int(q) - 1]
+
+
+def report(title: str, results: dict) -> dict:
+    print(f"\n📊 {title}")
+    print(f"   {'маршрут':<32} {'запр.':>6} {'ошиб.':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    summary = {}
+    for path, (values, errors) in results.items():
+        p50, p95, p99 = percentile(values, 50), percentile(values, 95), percentile(values, 99)
+        top = max(values) if values else float("nan")
+        summary[path] = p95
+        print(f"   {path:<32} {len(values):>6} {errors:>6} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f} {top:>8.1f}")
+    return summary
+
+
+async def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--base-url", default="http://127.0.0.1:8000")
+    ap.add_argument("--paths", nargs="+", default=DEFAULT_PATHS, help="маршруты для замера")
+    ap.add_argument("--concurrency", type=int, default=20, help="одновременных клиентов")
+    ap.add_argument("--duration", type=float, default=30, help="секунд на каждый замер")
+    ap.add_argument("--timeout", type=float, default=30, help="таймаут одного запроса, с")
+    ap.add_argument("--crawl-path", default="/monitoring/run-parser", help="запрос, запускающий обход каналов")
+    ap.add_argument("--no-crawl", action="store_true", help="только замер в покое")
+    args = ap.parse_args()
+
+    url = urlsplit(args.base_url)
+    host, port = url.hostname, url.port or 80
+
+    idle = report("в покое", await measure(host, port, args.paths, args.concurrency, args.duration, args.timeout))
+    if args.no_crawl:
+        return
+
+    # Обход идёт в том же процессе, что и веб-маршруты; ответа на запрос запуска не ждём
+    crawl = asyncio.create_task(http_get(host, port, args.crawl_path, args.duration * 10))
+    await asyncio.sleep(1)
+    busy = report("во время обхода", await measure(host, port, args.paths, args.concurrency, args.duration, args.timeout))
+    if crawl.done():
+        print("\n⚠️ Обход закончился раньше замера — увеличьте число каналов или уменьшите --duration")
+    else:
+        crawl.cancel()
+
+    print("\n📈 p95 под нагрузкой / в покое")
+    for path in args.paths:
+        ratio = busy[path] / idle[path] if idle[path] and idle[path] == idle[path] else float("nan")
+        print(f"   {path:<32} ×{ratio:.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,7 +3,7 @@ import asyncio
 import logging
 import uvicorn
 from dotenv import load_dotenv
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
@@ -20,6 +20,13 @@ from web.parsing_admin import router as parsing_admin_router
 from web.catalog_public import router as catalog_public_router
 
 from database import init_db, get_session
+from async_database import get_async_session, dispose_async_engine
+from product_index import warm_product_index
+from alias_index import warm_alias_index
+from rekey import warn_if_rekey_needed
+from partitions import maintain_price_partitions
+from ingest_queue import get_ingest_queue, stop_ingest_queue
+from unmatched_buffer import get_unmatched_buffer, stop_unmatched_buffer
 from config import API_TOKEN, client_configs
 from utils import get_all_clients
 from telethon_client import start_telethon_monitoring
@@ -27,6 +34,7 @@ from aiogram_bot import setup_aiogram_bot
 from scheduler import start_scheduler
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 
 load_dotenv()
 logging.getLogger("telethon").setLevel(logging.WARNING)
@@ -42,15 +50,19 @@ async def lifespan(app: FastAPI):
     init_db()
 
     with get_session() as session:
-        session.execute(text("TRUNCATE TABLE processed_channels"))
-        session.commit()
-        logger.info("♻️ Таблица processed_channels очищена при старте FastAPI")
-
         session.execute(text("""
             ALTER TABLE IF EXISTS products
             ADD COLUMN IF NOT EXISTS approved BOOLEAN DEFAULT FALSE
         """))
 
+        session.execute(text("""
+            ALTER TABLE IF EXISTS unmatched_models
+            ADD COLUMN IF NOT EXISTS occurrences INTEGER DEFAULT 1,
+            ADD COLUMN IF NOT EXISTS last_seen TIMESTAMP,
+            ADD COLUMN IF NOT EXISTS min_price INTEGER,
+            ADD COLUMN IF NOT EXISTS max_price INTEGER
+        """))
+
         session.execute(text("""
             CREATE TABLE IF NOT EXISTS categories (
                 id SERIAL PRIMARY KEY,
@@ -79,9 +91,30 @@ async def lifespan(app: FastAPI):
 
         session.commit()
 
+    # Секции prices на текущий и следующие месяцы — до того, как пойдут цены
+    try:
+        maintain_price_partitions()
+    except Exception as e:
+        logger.warning(f"⚠️ Секции цен не подготовлены при старте: {e}")
+
+    try:
+        warm_product_index()
+        warm_alias_index()
+    except Exception as e:
+        logger.warning(f"⚠️ Индекс товаров не прогрет при старте: {e}")
+
+    # Пересчёт name_std запускается только вручную — здесь лишь предупреждение
+    try:
+        warn_if_rekey_needed()
+    except Exception as e:
+        logger.warning(f"⚠️ Версия нормализации не проверена при старте: {e}")
+
     start_scheduler()
     asyncio.create_task(setup_aiogram_bot())
 
+    get_unmatched_buffer()
+    get_ingest_queue()
+
     clients = await get_all_clients(client_configs)
     for client, label in clients:
         monitoring_stats[label] = {"channels": 0, "messages": 0, "products": 0}  # Инициализация
@@ -89,6 +122,11 @@ async def lifespan(app: FastAPI):
 
     yield
 
+    stop_ingest_queue()
+    # После очереди: её последние пачки тоже могли добавить нераспознанные строки
+    stop_unmatched_buffer()
+    await dispose_async_engine()
+
 app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
@@ -129,20 +167,19 @@ async def monitoring_stats_view(request: Request):
     })
 
 @app.get("/unknowns", response_class=HTMLResponse)
-async def view_unknowns(request: Request):
-    with get_session() as session:
-        unknowns = session.execute(text("""
-            SELECT * FROM unmatched_models ORDER BY first_seen DESC
-        """)).fetchall()
-
-        products = session.execute(text("""
-            SELECT id, name FROM catalog_products ORDER BY name
-        """)).fetchall()
-        model_map = {row[0]: row[1] for row in products}
-
-        categories = session.execute(text("SELECT id, name FROM categories ORDER BY name")).fetchall()
-        brands = session.execute(text("SELECT DISTINCT name FROM brands ORDER BY name")).fetchall()
-        models = session.execute(text("SELECT DISTINCT name FROM models ORDER BY name")).fetchall()
+async def view_unknowns(request: Request, session: AsyncSession = Depends(get_async_session)):
+    unknowns = (await session.execute(text("""
+        SELECT * FROM unmatched_models ORDER BY first_seen DESC
+    """))).fetchall()
+
+    products = (await session.execute(text("""
+        SELECT id, name FROM catalog_products ORDER BY name
+    """))).fetchall()
+    model_map = {row[0]: row[1] for row in products}
+
+    categories = (await session.execute(text("SELECT id, name FROM categories ORDER BY name"))).fetchall()
+    brands = (await session.execute(text("SELECT DISTINCT name FROM brands ORDER BY name"))).fetchall()
+    models = (await session.execute(text("SELECT DISTINCT name FROM models ORDER BY name"))).fetchall()
 
     return templates.TemplateResponse("unknowns.html", {
         "request": request,
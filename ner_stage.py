@@ -0,0 +1,79 @@
+# ner_stage.py — пакетный NER-разбор строк, для которых быстрый путь не нашёл бренд
+
+import logging
+import threading
+import time
+from config import NER_ENABLED, NER_BATCH_SIZE, NER_N_PROCESS
+from resources import get_resource
+
+logger = logging.getLogger(__name__)
+
+# Метка spaCy, которую считаем брендом (модели ru_core_news_* размечают PER/LOC/ORG)
+BRAND_LABEL = "ORG"
+
+_lock = threading.Lock()
+ner_stats = {
+    "lines": 0,
+    "brands_found": 0,
+    "batches": 0,
+    "ms_total": 0.0,
+}
+
+
+def needs_ner(line) -> bool:
+    """Быстрый путь не смог определить бренд по словарю линеек."""
+    return line.brand == "Unknown"
+
+
+def extract_brands(texts: list, batch_size: int = NER_BATCH_SIZE, n_process: int = NER_N_PROCESS) -> list:
+    """Для каждого текста — первая сущность ORG или None; тексты идут в nlp.pipe пачками."""
+    nlp = get_resource("nlp")
+    brands = []
+    for doc in nlp.pipe(texts, batch_size=batch_size, n_process=n_process):
+        brand = next((ent.text for ent in doc.ents if ent.label_ == BRAND_LABEL), None)
+        brands.append(brand)
+    return brands
+
+
+def apply_ner_stage(lines: list, enabled: bool = NER_ENABLED) -> list:
+    """
+    Уточняет brand у PriceLine, не распознанных быстрым путём; остальные поля
+    (lineup, model, region) и name_key остаются от правил, поэтому name_std и
+    привязка к эталону от NER не зависят — уточнённый бренд попадает только
+    в описание нераспознанной строки. Возвращает список той же длины.
+    """
+    if not enabled:
+        return lines
+    pending = [i for i, line in enumerate(lines) if needs_ner(line)]
+    if not pending:
+        return lines
+
+    started = time.monotonic()
+    try:
+        brands = extract_brands([lines[i].model_text for i in pending])
+    except Exception as e:
+        logger.warning(f"⚠️ NER-разбор пропущен: {e}")
+        return lines
+
+    result = list(lines)
+    found = 0
+    for i, brand in zip(pending, brands):
+        if brand:
+            result[i] = result[i]._replace(brand=brand.strip().title())
+            found += 1
+
+    with _lock:
+        ner_stats["lines"] += len(pending)
+        ner_stats["brands_found"] += found
+        ner_stats["batches"] += 1
+        ner_stats["ms_total"] += (time.monotonic() - started) * 1000
+    return result
+
+
+def get_ner_stats() -> dict:
+    with _lock:
+        stats = dict(ner_stats)
+    stats["enabled"] = NER_ENABLED
+    stats["lines_per_sec"] = round(stats["lines"] / (stats["ms_total"] / 1000), 1) if stats["ms_total"] else None
+    stats["ms_total"] = round(stats["ms_total"], 1)
+    return stats
@@ -1,14 +1,36 @@
+# normalizer.py — единственная нормализация названий в name_std
+
 import re
 import emoji
 import unicodedata
+from tokenizer import FLAG_REGIONS
+
+# Меняется при любом изменении правил ниже: по нему rekey.py понимает,
+# что products_cleaned.name_std нужно пересчитать
+NORMALIZER_VERSION = 2
+
+_REGION_CODES = sorted({code.upper() for code in FLAG_REGIONS.values()} | {"CH", "UK"})
+# Региональный префикс в исходном написании: "US-", "TH ", "CH:" — только известные коды
+# в верхнем регистре, поэтому уже нормализованная (строчная) строка его не теряет
+_REGION_PREFIX_RE = re.compile(r"^\s*(?:" + "|".join(_REGION_CODES) + r")(?:\s*[\-:]\s*|\s+)")
+_NON_WORD_RE = re.compile(r"[^\w\s]")
+_GB_RE = re.compile(r"\b(\d+)\s*gb\b")
+
 
 def normalize_model_name(name: str) -> str:
-    name = name.strip()
-    name = emoji.replace_emoji(name, replace='')  # удалить все emoji
-    name = re.sub(r"^\s*[\U0001F1E6-\U0001F1FF]{2,}", "", name)  # удалить флаги в начале
-    name = re.sub(r"^\s*\b[a-zA-Z]{2,3}\b[\s\-:]*", "", name)  # удалить региональный префикс (например, "US-", "TH ", "CH:")
-    name = re.sub(r'\s+', ' ', name)  # убрать лишние пробелы
-    name = re.sub(r'[^\w\s]', '', name)  # убрать спецсимволы (оставить только буквы/цифры)
-    name = name.lower()
+    """
+    name_std для названия: без emoji и флагов, без регионального префикса,
+    без спецсимволов и суффикса gb у объёма, в нижнем регистре, слова через один пробел.
+    Повторная нормализация результат не меняет.
+    """
     name = unicodedata.normalize("NFKC", name)
-    return name
\ No newline at end of file
+    name = emoji.replace_emoji(name, replace="")  # emoji и флаги
+    name = _REGION_PREFIX_RE.sub("", name, count=1)
+    name = _NON_WORD_RE.sub("", name.lower())
+    name = _GB_RE.sub(r"\1", name)
+    return " ".join(name.split())
+
+
+def name_std_from_parts(brand: str, lineup, model, region) -> str:
+    """name_std по частям названия — так его считает парсер."""
+    return normalize_model_name(f"{brand} {lineup or ''} {model or ''} {region or ''}")
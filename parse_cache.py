@@ -0,0 +1,70 @@
+# parse_cache.py — ограниченные LRU-кэши строка → PriceLine и части названия → name_std
+
+import logging
+import threading
+from datetime import datetime
+from functools import lru_cache
+from config import PARSE_LINE_CACHE_SIZE, NAME_STD_CACHE_SIZE
+from normalizer import name_std_from_parts
+from tokenizer import tokenize_line
+from vocabulary import invalidate_vocabulary
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+cache_stats = {
+    "invalidations": 0,
+    "invalidated_at": None,
+}
+
+
+@lru_cache(maxsize=PARSE_LINE_CACHE_SIZE)
+def parse_line(line: str):
+    """tokenize_line с кэшем: поставщики каждый день повторяют одни и те же строки."""
+    return tokenize_line(line)
+
+
+@lru_cache(maxsize=NAME_STD_CACHE_SIZE)
+def _name_std(brand: str, lineup, model: str, region) -> str:
+    return name_std_from_parts(brand, lineup, model, region)
+
+
+def name_std_for(line) -> str:
+    """name_std разобранной строки по name_key: словари из БД и бренд, уточнённый NER, на ключ эталона не влияют."""
+    if line.name_key is not None:
+        return _name_std(*line.name_key)
+    return _name_std(line.brand, line.lineup, line.model, line.region)
+
+
+def invalidate_parse_caches():
+    """Сбрасывает кэши и словари после изменения правил разбора (регионы, линейки, бренды, цвета)."""
+    invalidate_vocabulary()
+    parse_line.cache_clear()
+    _name_std.cache_clear()
+    with _lock:
+        cache_stats["invalidations"] += 1
+        cache_stats["invalidated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    logger.info("🧹 Кэши разбора строк сброшены")
+
+
+def _info(cache) -> dict:
+    info = cache.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "max_size": info.maxsize,
+        "hit_ratio": round(info.hits / lookups, 3) if lookups else None,
+    }
+
+
+def get_parse_cache_stats() -> dict:
+    line, name = _info(parse_line), _info(_name_std)
+    with _lock:
+        stats = dict(cache_stats)
+    return {
+        **{f"line_{key}": value for key, value in line.items()},
+        **{f"name_std_{key}": value for key, value in name.items()},
+        **stats,
+    }
@@ -1,103 +1,25 @@
 import re
-import spacy
+import hashlib
 import logging
 import asyncio
-import emoji
-import unicodedata
-from datetime import datetime
 from sqlalchemy.sql import text
-from telethon.errors import ChannelPrivateError, FloodWaitError
 
-from database import get_connection, get_allowed_sources, save_unmatched_model, add_processed_channel, was_channel_processed, get_region_map
-from normalizer import normalize_model_name
-from utils import get_all_clients, ensure_messages_table, log_monitoring_result
-from config import client_configs
-from telethon_client import get_all_clients as get_cached_clients
+from database import get_connection, get_channel_cursor, save_channel_cursor
+from database import get_seen_message_hashes, get_last_line_hashes, save_content_hashes, upsert_latest_prices
+from product_index import resolve_standard_ids, resolve_product_ids
+from alias_index import lookup_alias
+from tokenizer import split_price, PriceLine
+from parse_cache import parse_line, name_std_for
+from exclusion_filter import filter_excluded, is_excluded_line
+from ner_stage import apply_ner_stage
+from rate_limiter import get_limiter
+from unmatched_buffer import get_unmatched_buffer
+from utils import ensure_messages_table, log_monitoring_result
+from config import CONTENT_HASH_TTL_DAYS
 
-nlp = spacy.load('ru_core_news_sm')
 logger = logging.getLogger(__name__)
 
 monitoring_stats = {}
-region_map = get_region_map()
-
-def fetch_exclusion_phrases():
-    session = get_connection()
-    try:
-        rows = session.execute(text("SELECT phrase FROM exclusion_phrases")).fetchall()
-        return [row[0].lower() for row in rows]
-    finally:
-        session.close()
-
-def extract_product_parts(model_text: str):
-    def extract_flag_emoji(text):
-        flags = re.findall(r'[\U0001F1E6-\U0001F1FF]{2}', text)
-        return flags[0] if flags else None
-
-    def remove_non_flag_emojis(text):
-        return ''.join(
-            ch for ch in text if not (
-                ch in emoji.EMOJI_DATA and not re.match(r'[\U0001F1E6-\U0001F1FF]', ch)
-            )
-        )
-
-    raw_text = remove_non_flag_emojis(model_text)
-    region_flag = extract_flag_emoji(model_text)
-    region = region_flag if region_flag else None
-
-    text = re.sub(r'[\U0001F1E6-\U0001F1FF]{2}', '', raw_text)
-    text = re.sub(r'[^\w\s\-+]', '', text).strip()
-
-    parts = text.lower().split()
-
-    known_lineups = {
-        "iphone": "Apple",
-        "ipad": "Apple",
-        "macbook": "Apple",
-        "airpods": "Apple",
-        "watch": "Apple",
-        "imac": "Apple",
-        "pixel": "Google",
-        "galaxy": "Samsung",
-        "note": "Xiaomi",
-        "redmi": "Redmi",
-        "mi": "Xiaomi",
-        "poco": "Poco",
-        "realme": "Realme",
-        "oneplus": "OnePlus",
-        "nokia": "Nokia",
-    }
-
-    brand = None
-    lineup = None
-    model = None
-
-    for part in parts:
-        if part in known_lineups:
-            lineup = part
-            brand = known_lineups[part]
-            break
-
-    if not brand:
-        brand = "Unknown"
-
-    model_tokens = []
-    for word in parts:
-        if re.match(r'\d{2,4}', word):
-            break
-        if word.lower() in ['teal', 'blue', 'black', 'white', 'natural', 'gray', 'gold', 'pink', 'red']:
-            break
-        model_tokens.append(word)
-
-    model = ' '.join(model_tokens).title()
-
-    region_map = {
-        '🇺🇸': 'us', '🇷🇺': 'ru', '🇪🇺': 'eu', '🇭🇰': 'hk',
-        '🇨🇳': 'cn', '🇰🇿': 'kz', '🇮🇳': 'in', '🇹🇭': 'th',
-        '🇦🇪': 'ae', '🇲🇾': 'my', '🇯🇵': 'jp', '🇰🇷': 'kr'
-    }
-    region = region_map.get(region_flag, None)
-
-    return brand, lineup, model, region
 
 def extract_products_with_flags_and_price(line):
     results = []
@@ -121,160 +43,280 @@ def extract_products_with_flags_and_price(line):
 
     return results
 
-def insert_price_or_unknown(session, model_text: str, price: int, flag: str, source: dict) -> bool:
-    brand, lineup, model, region = extract_product_parts(model_text)
-    name_std = normalize_model_name(f"{brand} {lineup or ''} {model} {region or ''}")
-
-    cleaned = session.execute(
-        text("SELECT id FROM products_cleaned WHERE name_std = :name_std"),
-        {"name_std": name_std}
-    ).first()
-
-    if not cleaned:
-        # ❌ Не удалось привязать — сохраняем как неизвестную модель
-        save_unmatched_model(
-            raw_name=model_text,
-            source_channel=source.get("channel_name"),
-            price=price,
-            brand=brand,
-            model=model,
-            region=region,
-            is_auto=False
-        )
-        return False
-
-    standard_id = cleaned[0]
+def parse_price_lines(message_text: str) -> list:
+    """Разбирает текст прайса в список PriceLine (см. tokenizer) без обращения к БД."""
+    lines = [line.strip() for line in message_text.splitlines()]
+    parsed = []
+    for line in filter_excluded([line for line in lines if line]):
+        split = split_price(line)
+        if split is None:
+            logger.debug(f"📭 Не распознано в строке: {line}")
+            continue
 
-    # Проверка — есть ли product с таким name и standard_id
-    product = session.execute(
-        text("SELECT id FROM products WHERE standard_id = :standard_id AND name = :name"),
-        {"standard_id": standard_id, "name": model_text}
-    ).first()
+        model_text, price, flag = split
+        if is_excluded_line(model_text):
+            continue
 
-    if product:
-        product_id = product[0]
-    else:
-        product_id = session.execute(
+        # Строка, которую человек уже привязал к эталону, не проходит разбор названия
+        standard_id = lookup_alias(model_text)
+        if standard_id is not None:
+            parsed.append(PriceLine(model_text, (), price, flag, None, None, None, None, None, standard_id))
+        else:
+            parsed.append(parse_line(line))
+    return parsed
+
+def insert_prices_batch(session, entries: list, unmatched_lines: list = None) -> int:
+    """
+    Пакетная запись разобранных строк.
+
+    entries — список (PriceLine, source). Все строки разрешаются
+    несколькими set-based запросами вместо 3-4 запросов на строку.
+    Возвращает количество добавленных цен; строки без эталона, если передан
+    unmatched_lines, добавляются в этот список.
+    """
+    if not entries:
+        return 0
+
+    resolved = []
+    matched = []
+    for line, source in entries:
+        if line.standard_id is not None:
+            # Узнана по псевдониму — эталон уже известен
+            matched.append((line.standard_id, (line.model_text, line.price, line.flag, source, None, None, None, None)))
+            continue
+        name_std = name_std_for(line)
+        resolved.append((line, (line.model_text, line.price, line.flag, source, line.brand, line.model, line.region, name_std)))
+
+    # 1. name_std → products_cleaned.id: индекс в памяти, промахи одним запросом
+    standard_ids = resolve_standard_ids(session, {r[7] for _, r in resolved})
+
+    unmatched = []
+    for line, r in resolved:
+        standard_id = standard_ids.get(r[7])
+        if standard_id is None:
+            unmatched.append(r)
+            if unmatched_lines is not None:
+                unmatched_lines.append(line)
+        else:
+            matched.append((standard_id, r))
+
+    # ❌ Не удалось привязать — копим в буфере, он сам запишет их пачкой
+    if unmatched:
+        get_unmatched_buffer().add([
+            {
+                "raw_name": model_text,
+                "source_channel": source.get("channel_name"),
+                "price": price,
+                "brand": brand,
+                "model": model,
+                "region": region,
+                "is_auto": False
+            }
+            for model_text, price, flag, source, brand, model, region, _ in unmatched
+        ])
+
+    if not matched:
+        return 0
+
+    # 2. (standard_id, name) → products.id, недостающие создаём одним INSERT
+    pairs = list({(standard_id, r[0]) for standard_id, r in matched})
+    product_ids = resolve_product_ids(session, pairs)
+
+    missing = [p for p in pairs if p not in product_ids]
+    if missing:
+        inserted = session.execute(
             text("""
                 INSERT INTO products (name, standard_id, approved)
-                VALUES (:name, :standard_id, TRUE)
-                RETURNING id
+                SELECT v.name, v.standard_id, TRUE
+                FROM unnest(CAST(:sids AS integer[]), CAST(:names AS text[])) AS v(standard_id, name)
+                ON CONFLICT (standard_id, name) DO NOTHING
+                RETURNING id, standard_id, name
             """),
-            {"name": model_text, "standard_id": standard_id}
-        ).scalar()
+            {"sids": [p[0] for p in missing], "names": [p[1] for p in missing]}
+        ).fetchall()
+        for row in inserted:
+            product_ids[(row.standard_id, row.name)] = row.id
+        # Их успел создать параллельный разбор — дочитываем id
+        conflicted = [p for p in missing if p not in product_ids]
+        if conflicted:
+            product_ids.update(resolve_product_ids(session, conflicted))
+
+    # 3. Цены: одна цена на (product_id, message_id), как и в построчном варианте.
+    #    Цены старше границы сжатия (например, из backfill) тоже пишутся: следующий
+    #    проход compact_prices свернёт их в price_daily, дополнив уже свёрнутые дни
+    rows = {}
+    latest = []
+    for standard_id, (model_text, price, flag, source, *_rest) in matched:
+        product_id = product_ids[(standard_id, model_text)]
+        key = (product_id, source.get("message_id"))
+        if key in rows:
+            continue
+        rows[key] = (product_id, price, flag, source)
+        latest.append((standard_id, source.get("channel_name"), price, flag, source.get("date")))
 
-    # Проверка — есть ли уже такая цена по message_id
-    existing_price = session.execute(
+    rows = list(rows.values())
+    inserted = session.execute(
         text("""
-            SELECT 1 FROM prices
-            WHERE product_id = :product_id AND message_id = :message_id
+            INSERT INTO prices (product_id, price, country, source_account, channel_name, message_id, message_date)
+            SELECT v.product_id, v.price, v.country, v.source_account, v.channel_name, v.message_id, v.message_date
+            FROM unnest(
+                CAST(:product_ids AS integer[]),
+                CAST(:prices AS integer[]),
+                CAST(:countries AS text[]),
+                CAST(:accounts AS text[]),
+                CAST(:channels AS text[]),
+                CAST(:message_ids AS bigint[]),
+                CAST(:dates AS timestamptz[])
+            ) AS v(product_id, price, country, source_account, channel_name, message_id, message_date)
+            ON CONFLICT (product_id, message_id, message_date) DO NOTHING
+            RETURNING product_id
         """),
         {
-            "product_id": product_id,
-            "message_id": source.get("message_id")
+            "product_ids": [r[0] for r in rows],
+            "prices": [r[1] for r in rows],
+            "countries": [r[2] for r in rows],
+            "accounts": [r[3].get("account_id") for r in rows],
+            "channels": [r[3].get("channel_name") for r in rows],
+            "message_ids": [r[3].get("message_id") for r in rows],
+            "dates": [r[3].get("date") for r in rows]
         }
-    ).first()
+    ).fetchall()
 
-    if existing_price:
-        return False  # ❌ Такая цена уже была, повторно не добавляем
+    # 4. Сводка текущих цен для /matrix и карточки товара
+    upsert_latest_prices(session, latest)
 
-    # ✅ Добавляем новую цену
-    session.execute(
-        text("""
-            INSERT INTO prices (product_id, price, country, source_account, channel_name, message_id, message_date)
-            VALUES (:product_id, :price, :country, :source_account, :channel_name, :message_id, :message_date)
-        """),
-        {
-            "product_id": product_id,
-            "price": price,
-            "country": flag,
-            "source_account": source.get("account_id"),
-            "channel_name": source.get("channel_name"),
-            "message_id": source.get("message_id"),
-            "message_date": source.get("date").isoformat()
-        }
-    )
+    return len(inserted)
 
-    return True
+def message_content_hash(message_text: str) -> str:
+    """Хэш текста сообщения без учёта пробелов и пустых строк."""
+    lines = (" ".join(line.split()) for line in message_text.splitlines())
+    normalized = "\n".join(line for line in lines if line)
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def price_line_hash(line) -> int:
+    """64-битный хэш разобранной строки прайса (модель, цена, флаг)."""
+    key = f"{line.model_text}\x1f{line.price}\x1f{line.flag or ''}"
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
 
-def parse_message_text(message_text: str, source: dict):
-    updated_products = 0
-    channel_id = source.get("channel_id")
-    account_id = source.get("account_id")
+
+_messages_table_ready = False
+
+def parse_messages(messages: list) -> int:
+    """
+    Разбирает пачку сообщений [(message_text, source), ...] в одной сессии.
+
+    Сообщение, уже встречавшееся в канале с тем же текстом, пропускается целиком;
+    из нового прайса обрабатываются только строки, которых не было в предыдущем
+    прайсе этого канала. Строки без эталона в хэши не попадают и разбираются
+    при каждом повторе, пока их не привяжут. Возвращает суммарное количество добавленных цен;
+    при ошибке транзакция откатывается и исключение пробрасывается дальше.
+    """
+    global _messages_table_ready
 
     session = get_connection()
     try:
-        # Проверка: источник разрешён?
-        result = session.execute(
-            text("SELECT 1 FROM source_ids WHERE channel_id = :channel_id AND account_id = :account_id"),
-            {"channel_id": channel_id, "account_id": account_id}
-        ).first()
-        if result is None:
-            logger.info(f"⛔ Источник {channel_id} (аккаунт {account_id}) не разрешён")
+        # Проверка: источник разрешён? — один запрос на пару (канал, аккаунт)
+        allowed = {}
+        candidates = []
+        for message_text, source in messages:
+            key = (source.get("channel_id"), source.get("account_id"))
+            if key not in allowed:
+                allowed[key] = session.execute(
+                    text("SELECT 1 FROM source_ids WHERE channel_id = :channel_id AND account_id = :account_id"),
+                    {"channel_id": key[0], "account_id": key[1]}
+                ).first() is not None
+                if not allowed[key]:
+                    logger.info(f"⛔ Источник {key[0]} (аккаунт {key[1]}) не разрешён")
+            if allowed[key]:
+                candidates.append((message_text, source, message_content_hash(message_text)))
+
+        if not candidates:
             return 0
 
-        # Проверка: уже обрабатывался этим аккаунтом?
-        result = session.execute(
-            text("""SELECT 1 FROM processed_channels WHERE channel_id = :channel_id AND account_id = :account_id"""),
-            {"channel_id": channel_id, "account_id": account_id}
-        ).first()
-        if result:
-            logger.info(f"🔁 Источник {channel_id} уже обработан аккаунтом {account_id}")
-            return 0
+        seen = get_seen_message_hashes(session, [(source.get("channel_id"), h) for _, source, h in candidates])
+        last_lines = get_last_line_hashes(session, [source.get("channel_id") for _, source, _ in candidates])
 
-        ensure_messages_table()
-        lines = message_text.splitlines()
-
-        for line in lines:
-            line = line.strip()
-            if not line:
+        entries = []
+        processed = []  # (channel_id, content_hash, message_id, хэши строк) по разобранным сообщениям
+        skipped_messages = skipped_lines = 0
+        for message_text, source, content_hash in candidates:
+            channel_id = source.get("channel_id")
+            if (channel_id, content_hash) in seen:
+                skipped_messages += 1
                 continue
+            seen.add((channel_id, content_hash))
 
-            match = re.search(r"(?P<price>\d{5,7})(?:\s?(?P<flag>[\U0001F1E6-\U0001F1FF]{2}))?", line)
-            if not match:
-                logger.debug(f"📭 Не распознано в строке: {line}")
+            lines = parse_price_lines(message_text)
+            hashes = [price_line_hash(line) for line in lines]
+            processed.append((channel_id, content_hash, source.get("message_id"), hashes))
+            if not lines:
                 continue
-
-            price = int(match.group("price"))
-            flag = match.group("flag") if match.group("flag") else None
-            model_text = re.sub(r"\d{5,7}(\s?[\U0001F1E6-\U0001F1FF]{2})?", "", line).strip("•- ")
-
-            success = insert_price_or_unknown(session, model_text, price, flag, source)
-            if success:
-                updated_products += 1
-                logger.info(f"✅ Добавлено: '{model_text}' за {price}₽ [{flag or 'без флага'}] — {source['channel_name']}")
-            else:
-                logger.info(f"❌ Пропущено: '{model_text}' — не добавлено — {source['channel_name']}")
-
+            previous = last_lines.get(channel_id, set())
+            for line, line_hash in zip(lines, hashes):
+                if line_hash in previous:
+                    skipped_lines += 1
+                else:
+                    entries.append((line, source))
+            last_lines[channel_id] = set(hashes)
+
+        # Строки без бренда — пачкой через NER (если включён), одной на весь batch
+        if entries:
+            refined = apply_ner_stage([line for line, _ in entries])
+            entries = [(line, source) for line, (_, source) in zip(refined, entries)]
+
+        updated_products = 0
+        unmatched_lines = []
+        if entries:
+            if not _messages_table_ready:
+                ensure_messages_table()
+                _messages_table_ready = True
+            updated_products = insert_prices_batch(session, entries, unmatched_lines)
+
+        # Запоминаются только строки, нашедшие эталон, и сообщения без нераспознанных строк:
+        # после подтверждения строки человеком повтор прайса разбирается заново и цена попадает в базу
+        unmatched_hashes = {price_line_hash(line) for line in unmatched_lines}
+        new_hashes = []
+        new_line_hashes = {}
+        for channel_id, content_hash, message_id, hashes in processed:
+            if not unmatched_hashes.intersection(hashes):
+                new_hashes.append((channel_id, content_hash, message_id))
+            if hashes:
+                new_line_hashes[channel_id] = (message_id, [h for h in hashes if h not in unmatched_hashes])
+        save_content_hashes(session, new_hashes, new_line_hashes, CONTENT_HASH_TTL_DAYS)
         session.commit()
+
+        logger.info(
+            f"✅ Добавлено цен: {updated_products} из {len(entries)} строк ({len(messages)} сообщ.; "
+            f"без изменений: {skipped_messages} сообщ., {skipped_lines} строк)"
+        )
+        return updated_products
     except Exception as e:
-        logger.warning(f"🔥 Ошибка при парсинге сообщения из {source.get('channel_name')}: {e}")
+        # Ошибка не глушится: вызывающий не должен сдвигать курсор за неразобранную пачку
+        channels = {source.get("channel_name") for _, source in messages}
+        logger.warning(f"🔥 Ошибка при парсинге сообщений из {', '.join(map(str, channels))}: {e}")
         session.rollback()
+        raise
     finally:
         session.close()
 
-    return updated_products
+def parse_message_text(message_text: str, source: dict):
+    return parse_messages([(message_text, source)])
 
-async def parse_all_channels(manual: bool = False):
+async def parse_all_channels(manual: bool = False, full_backfill: bool = False):
     from telethon_client import get_all_clients as get_cached_clients
     from config import client_configs
-    from database import get_allowed_sources
+    from crawl_scheduler import run_crawl_tick
 
-    logger = logging.getLogger(__name__)
     clients = await get_cached_clients(client_configs)
-    monitoring_stats = {}
-
-    for client, label in clients:
-        if manual:
-            logger.info(f"🧪 Ручной запуск парсинга для аккаунта: {label}")
-        else:
-            logger.info(f"🤖 Автоматический запуск парсинга для аккаунта: {label}")
-        logger.info(f"🔁 Обрабатывается аккаунт: {label}")
+    if manual:
+        logger.info(f"🧪 Ручной запуск парсинга для аккаунтов: {[label for _, label in clients]}")
+    else:
+        logger.info(f"🤖 Автоматический запуск парсинга для аккаунтов: {[label for _, label in clients]}")
 
-        sources = get_allowed_sources("channel", label)
-        stats = await parse_all_channels_with_stats(client, sources, label, manual_trigger=True)
-        monitoring_stats[label] = stats
+    monitoring_stats = await run_crawl_tick(clients, full_backfill=full_backfill)
 
+    for label, stats in monitoring_stats.items():
         # ✅ Логируем результат в monitoring_log.json
         log_monitoring_result(
             channels=stats["channels"],
@@ -285,14 +327,90 @@ async def parse_all_channels(manual: bool = False):
     return monitoring_stats
 
 
-# async-обёртка для was_channel_processed
-async def was_channel_processed_async(channel_id: int, account_id: str) -> bool:
-    from database import was_channel_processed
-    loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(None, was_channel_processed, channel_id, account_id)
+# Как часто сохранять курсор во время чтения длинной истории
+CURSOR_CHECKPOINT_EVERY = 200
+# Сколько сообщений канала разбирать за один вызов parse_messages
+CRAWL_PARSE_BATCH = 20
+
+async def crawl_channel(client, source: dict, account_label: str, full_backfill: bool = False):
+    """
+    Читает один канал: только сообщения новее сохранённого курсора (channel_cursors)
+    этого канала, каким бы аккаунтом он ни был записан; при full_backfill=True — всю историю.
+    Разбор идёт пачками в отдельном потоке, чтобы несколько каналов читались параллельно.
+    Возвращает строку детальной статистики или None, если канал недоступен.
+    """
+    channel_id = source["channel_id"]
+    limiter = get_limiter(account_label)
+
+    try:
+        entity = await limiter.call(lambda: client.get_entity(channel_id))
+    except Exception as e:
+        logger.warning(f"⚠️ Ошибка при получении entity для {channel_id}: {e}")
+        return None
+
+    cursor = None if full_backfill else await asyncio.to_thread(get_channel_cursor, channel_id)
+    min_id = cursor["last_message_id"] if cursor else 0
+
+    title = getattr(entity, "title", "unknown")
+    if min_id:
+        logger.info(f"📥 [{account_label}] Обработка канала: {title} (id={channel_id}), новее message_id={min_id}")
+    else:
+        logger.info(f"📥 [{account_label}] Полная загрузка канала: {title} (id={channel_id})")
+
+    count = 0
+    updated_total = 0
+    pending = []
+    last_id, last_date = min_id, None           # последнее прочитанное сообщение
+    done_id, done_date = min_id, None           # последнее разобранное сообщение
+    checkpoint_id = min_id
+
+    async def flush():
+        nonlocal updated_total, done_id, done_date, checkpoint_id
+        if pending:
+            # При ошибке разбора исключение уходит наверх и done_id не сдвигается:
+            # следующий запуск перечитает пачку с последнего сохранённого курсора
+            updated_total += await asyncio.to_thread(parse_messages, list(pending))
+            pending.clear()
+        done_id, done_date = last_id, last_date
+        if done_id - checkpoint_id >= CURSOR_CHECKPOINT_EVERY:
+            await asyncio.to_thread(save_channel_cursor, channel_id, account_label, done_id, done_date)
+            checkpoint_id = done_id
+
+    try:
+        # reverse=True — от старых к новым, поэтому курсор можно сохранять по ходу чтения
+        async for message in limiter.iter_messages(client, entity, min_id=min_id, reverse=True):
+            last_id, last_date = message.id, message.date
+            if not message.text:
+                continue
+
+            count += 1
+            pending.append((message.text, {
+                "account_id": account_label,
+                "channel_id": entity.id,
+                "channel_name": title,
+                "message_id": message.id,
+                "date": message.date
+            }))
+            if len(pending) >= CRAWL_PARSE_BATCH:
+                await flush()
+        await flush()
+    except Exception as e:
+        logger.exception(f"🔥 Ошибка при чтении сообщений канала {channel_id}")
+    finally:
+        # Сохраняем всё, что успели разобрать — следующий запуск продолжит с этого места
+        if done_id > checkpoint_id:
+            await asyncio.to_thread(save_channel_cursor, channel_id, account_label, done_id, done_date)
+
+    return {
+        "channel_name": title,
+        "channel_id": entity.id,
+        "messages": count,
+        "products": updated_total
+    }
 
 # основная функция
-async def parse_all_channels_with_stats(client, sources, account_label, manual_trigger=False):
+async def parse_all_channels_with_stats(client, sources, account_label, manual_trigger=False, full_backfill=False):
+    """Последовательно читает каналы одного аккаунта (см. crawl_channel)."""
 
     # Удалим дубли каналов по channel_id
     sources = list({s["channel_id"]: s for s in sources}.values())
@@ -300,63 +418,12 @@ async def parse_all_channels_with_stats(client, sources, account_label, manual_t
     stats = {"channels": 0, "messages": 0, "products": 0, "details": []}
 
     for source in sources:
-        channel_id = source["channel_id"]
-
-        if await was_channel_processed_async(channel_id, account_label):
-            logger.info(f"🔁 Источник {channel_id} уже обработан аккаунтом {account_label}")
+        detail = await crawl_channel(client, source, account_label, full_backfill)
+        if detail is None:
             continue
-
-        try:
-            entity = await client.get_entity(channel_id)
-        except Exception as e:
-            logger.warning(f"⚠️ Ошибка при получении entity для {channel_id}: {e}")
-            continue
-
-        logger.info(f"📥 Обработка канала: {getattr(entity, 'title', 'unknown')} (id={channel_id})")
         stats["channels"] += 1
-
-        count = 0
-        updated_total = 0
-
-        try:
-            async for message in client.iter_messages(entity, limit=None):  # ✅ читаем всё
-                if not message.text:
-                    continue
-
-                count += 1
-                updated = parse_message_text(message.text, {
-                    "account_id": account_label,
-                    "channel_id": entity.id,
-                    "channel_name": getattr(entity, "title", "unknown"),
-                    "message_id": message.id,
-                    "date": message.date
-                })
-
-                if updated:
-                    logger.debug(f"✅ Добавлено товаров: {updated} из сообщения {message.id}")
-
-                updated_total += updated
-                stats["products"] += updated
-        except Exception as e:
-            logger.exception(f"🔥 Ошибка при чтении сообщений канала {channel_id}")
-            continue
-
-        stats["messages"] += count
-        stats["details"].append({
-            "channel_name": getattr(entity, "title", "unknown"),
-            "channel_id": entity.id,
-            "messages": count,
-            "products": updated_total
-        })
-
-        # ❗️Не помечаем канал как обработанный, если он почти пустой
-        if count < 2:
-            logger.warning(f"⚠️ Канал {channel_id} прочитан только на {count} сообщение — НЕ помечаем как обработанный")
-            continue
-
-        # ✅ Всё ок — можно пометить как обработанный
-        loop = asyncio.get_running_loop()
-        await loop.run_in_executor(None, add_processed_channel, channel_id, account_label)
+        stats["messages"] += detail["messages"]
+        stats["products"] += detail["products"]
+        stats["details"].append(detail)
 
     return stats
-
@@ -0,0 +1,159 @@
+# partitions.py — помесячные секции таблицы prices: создание заранее и отсоединение старых
+
+import logging
+import re
+import threading
+import time
+from datetime import date
+
+from sqlalchemy import text
+
+from config import PRICE_PARTITIONS_AHEAD, PRICE_RETENTION_MONTHS, PRICE_DROP_DETACHED, PRICE_RAW_DAYS
+from compaction import compaction_cutoff
+from database import get_session
+
+logger = logging.getLogger(__name__)
+
+# prices_2026_10 — секция [2026-10-01, 2026-11-01); prices_default ловит всё вне секций
+_PARTITION_RE = re.compile(r"^prices_(\d{4})_(\d{2})$")
+DEFAULT_PARTITION = "prices_default"
+
+_lock = threading.Lock()
+partition_stats = {
+    "partitions": 0,
+    "created": 0,
+    "detached": 0,
+    "dropped": 0,
+    "errors": 0,
+    "oldest": None,
+    "newest": None,
+    "last_run": None,
+    "last_run_ms": 0.0,
+}
+
+
+def _add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"prices_{month.year:04d}_{month.month:02d}"
+
+
+def list_price_partitions(session) -> dict:
+    """Имя секции → первый день её месяца (только помесячные, без prices_default)."""
+    rows = session.execute(text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass('prices')
+    """)).fetchall()
+    partitions = {}
+    for (name,) in rows:
+        match = _PARTITION_RE.match(name)
+        if match:
+            partitions[name] = date(int(match.group(1)), int(match.group(2)), 1)
+    return partitions
+
+
+def create_price_partition(session, month: date) -> bool:
+    """Создаёт секцию месяца month; False, если она уже есть."""
+    name = partition_name(month)
+    if session.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None:
+        return False
+    session.execute(text(f"""
+        CREATE TABLE {name} PARTITION OF prices
+        FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')
+    """))
+    return True
+
+
+def ensure_price_partitions(months_ahead: int = PRICE_PARTITIONS_AHEAD) -> int:
+    """Секции на текущий месяц и months_ahead следующих. Возвращает, сколько создано."""
+    current = date.today().replace(day=1)
+    created = 0
+    with get_session() as session:
+        kind = session.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('prices')")).scalar()
+        if kind != "p":
+            # Таблица ещё не секционирована — нужна миграция (alembic upgrade head)
+            if kind is not None:
+                logger.warning("⚠️ prices не секционирована: выполните alembic upgrade head")
+            return 0
+        session.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF prices DEFAULT"))
+        session.commit()
+        for n in range(months_ahead + 1):
+            month = _add_months(current, n)
+            try:
+                if create_price_partition(session, month):
+                    session.commit()
+                    created += 1
+                    logger.info(f"🗓️ Создана секция цен {partition_name(month)}")
+            except Exception as e:
+                # Обычно: в prices_default уже лежат строки этого месяца
+                session.rollback()
+                with _lock:
+                    partition_stats["errors"] += 1
+                logger.warning(f"⚠️ Не удалось создать секцию {partition_name(month)}: {e}")
+    with _lock:
+        partition_stats["created"] += created
+    return created
+
+
+def retire_price_partitions(keep_months: int = PRICE_RETENTION_MONTHS, drop: bool = PRICE_DROP_DETACHED,
+                            raw_days: int = PRICE_RAW_DAYS) -> int:
+    """
+    Отсоединяет секции старше keep_months месяцев (0 — хранить всё).
+
+    DETACH и DROP — операции над каталогом, их цена не зависит от числа строк.
+    Отсоединённая секция остаётся обычной таблицей (архив), если drop=False.
+    Секция, в которой могут быть ещё не свёрнутые в price_daily цены, не трогается:
+    хранение короче окна сырых данных (keep_months * 30 < raw_days) отклоняется целиком.
+    """
+    if keep_months <= 0:
+        return 0
+    if raw_days > 0 and keep_months * 30 < raw_days:
+        logger.error(
+            f"🔥 PRICE_RETENTION_MONTHS={keep_months} короче PRICE_RAW_DAYS={raw_days}: "
+            f"секции цен не отсоединяются, иначе несвёрнутые цены пропадут"
+        )
+        return 0
+    cutoff = _add_months(date.today().replace(day=1), -keep_months)
+    compacted_before = compaction_cutoff(raw_days)
+    retired = 0
+    with get_session() as session:
+        for name, month in sorted(list_price_partitions(session).items(), key=lambda item: item[1]):
+            if month >= cutoff:
+                break
+            if compacted_before is not None and _add_months(month, 1) > compacted_before.date():
+                break
+            session.execute(text(f"ALTER TABLE prices DETACH PARTITION {name}"))
+            if drop:
+                session.execute(text(f"DROP TABLE {name}"))
+            session.commit()
+            retired += 1
+            logger.info(f"🗄️ Секция цен {name} {'удалена' if drop else 'отсоединена'}")
+    with _lock:
+        partition_stats["dropped" if drop else "detached"] += retired
+    return retired
+
+
+def maintain_price_partitions() -> dict:
+    """Плановый проход: секции вперёд, затем отсоединение старых."""
+    started = time.monotonic()
+    created = ensure_price_partitions()
+    retired = retire_price_partitions()
+    with get_session() as session:
+        months = sorted(list_price_partitions(session).values())
+    with _lock:
+        partition_stats["partitions"] = len(months)
+        partition_stats["oldest"] = months[0].isoformat() if months else None
+        partition_stats["newest"] = months[-1].isoformat() if months else None
+        partition_stats["last_run"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        partition_stats["last_run_ms"] = round((time.monotonic() - started) * 1000, 1)
+    return {"created": created, "retired": retired}
+
+
+def get_partition_stats() -> dict:
+    with _lock:
+        return dict(partition_stats)
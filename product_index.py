@@ -0,0 +1,203 @@
+# product_index.py — процессный кэш name_std → products_cleaned.id и (standard_id, name) → products.id
+
+import logging
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from database import get_session
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_standard_ids = {}  # name_std → products_cleaned.id
+_product_ids = {}   # (standard_id, raw name) → products.id
+_warmed = False
+# Растёт при каждой инвалидации: прочитанное из БД до неё в индекс не записывается
+_generation = 0
+
+# Идёт ли пересчёт name_std (есть колонка name_std_next): проверяется в БД не чаще раза в REKEY_CHECK_SECONDS
+REKEY_CHECK_SECONDS = 10
+_rekey_flag = False
+_rekey_checked_at = None
+
+index_stats = {
+    "standard_hits": 0,
+    "standard_misses": 0,
+    "product_hits": 0,
+    "product_misses": 0,
+    "invalidations": 0,
+    "warmed_at": None,
+}
+
+
+def warm_product_index():
+    """Загружает все эталоны и привязки в память. Вызывается при старте и после инвалидации."""
+    global _warmed
+    with _lock:
+        generation = _generation
+    with get_session() as session:
+        standards = session.execute(text("SELECT name_std, id FROM products_cleaned WHERE name_std IS NOT NULL")).fetchall()
+        products = session.execute(text("SELECT standard_id, name, id FROM products WHERE standard_id IS NOT NULL")).fetchall()
+
+    with _lock:
+        if generation != _generation:
+            # Пока читали, индекс инвалидировали — снимок мог устареть, прогреемся при следующем поиске
+            return
+        _standard_ids.clear()
+        _standard_ids.update({name_std: id_ for name_std, id_ in standards})
+        _product_ids.clear()
+        _product_ids.update({(sid, name): id_ for sid, name, id_ in products})
+        _warmed = True
+        index_stats["warmed_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    logger.info(f"🗂 Индекс товаров прогрет: {len(standards)} эталонов, {len(products)} привязок")
+
+
+def invalidate_product_index():
+    """Сбрасывает индекс после изменения привязок; следующий поиск прогреет его заново."""
+    global _warmed, _generation
+    with _lock:
+        _standard_ids.clear()
+        _product_ids.clear()
+        _warmed = False
+        _generation += 1
+        index_stats["invalidations"] += 1
+
+
+def _ensure_warm():
+    if not _warmed:
+        try:
+            warm_product_index()
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось прогреть индекс товаров: {e}")
+
+
+def set_rekey_in_progress(flag: bool):
+    """rekey.py сообщает о начале и конце пересчёта в своём процессе, не дожидаясь проверки по TTL."""
+    global _rekey_flag, _rekey_checked_at
+    with _lock:
+        _rekey_flag = flag
+        _rekey_checked_at = time.monotonic()
+
+
+def _rekey_in_progress(session) -> bool:
+    # Колонка name_std_next существует только пока идёт пересчёт — так его видно и из другого процесса (CLI)
+    global _rekey_flag, _rekey_checked_at
+    now = time.monotonic()
+    if _rekey_checked_at is not None and now - _rekey_checked_at < REKEY_CHECK_SECONDS:
+        return _rekey_flag
+    flag = session.execute(text("""
+        SELECT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = current_schema()
+              AND table_name = 'products_cleaned' AND column_name = 'name_std_next'
+        )
+    """)).scalar()
+    with _lock:
+        _rekey_flag, _rekey_checked_at = flag, now
+    return flag
+
+
+def resolve_standard_ids(session, names) -> dict:
+    """
+    name_std → id: сначала из памяти, промахи одним запросом в БД.
+
+    Во время пересчёта name_std часть эталонов ещё под старым ключом, а новый лежит
+    в name_std_next — промахи ищутся по обоим, при нескольких кандидатах берётся
+    эталон с наименьшим id (в него rekey и сольёт остальные). Такие находки в индекс
+    не пишутся: после пересчёта он всё равно сбрасывается.
+    """
+    _ensure_warm()
+    found = {}
+    missing = []
+    with _lock:
+        generation = _generation
+        for name in names:
+            standard_id = _standard_ids.get(name)
+            if standard_id is None:
+                missing.append(name)
+            else:
+                found[name] = standard_id
+        index_stats["standard_hits"] += len(found)
+        index_stats["standard_misses"] += len(missing)
+
+    rows = None
+    if missing and _rekey_in_progress(session):
+        try:
+            with session.begin_nested():
+                rows = session.execute(
+                    text("""
+                        SELECT name_std, id FROM products_cleaned WHERE name_std = ANY(:names)
+                        UNION ALL
+                        SELECT name_std_next, id FROM products_cleaned WHERE name_std_next = ANY(:names)
+                        ORDER BY 2 DESC
+                    """),
+                    {"names": missing}
+                ).fetchall()
+            found.update(rows)
+        except DBAPIError:
+            # Пересчёт закончился, пока флаг был в кэше: колонки уже нет — ищем только по name_std
+            set_rekey_in_progress(False)
+            rows = None
+    if missing and rows is None:
+        rows = session.execute(
+            text("SELECT name_std, id FROM products_cleaned WHERE name_std = ANY(:names)"),
+            {"names": missing}
+        ).fetchall()
+        found.update(rows)
+        with _lock:
+            if generation == _generation:
+                _standard_ids.update(rows)
+
+    return found
+
+
+def resolve_product_ids(session, pairs) -> dict:
+    """(standard_id, name) → products.id: сначала из памяти, промахи одним запросом в БД.
+
+    Только что вставленные (ещё не закоммиченные) товары сюда не попадают —
+    они окажутся в индексе при следующем промахе, уже после коммита.
+    """
+    _ensure_warm()
+    found = {}
+    missing = []
+    with _lock:
+        generation = _generation
+        for pair in pairs:
+            product_id = _product_ids.get(pair)
+            if product_id is None:
+                missing.append(pair)
+            else:
+                found[pair] = product_id
+        index_stats["product_hits"] += len(found)
+        index_stats["product_misses"] += len(missing)
+
+    if missing:
+        rows = session.execute(
+            text("""
+                SELECT p.standard_id, p.name, p.id
+                FROM products p
+                JOIN unnest(CAST(:sids AS integer[]), CAST(:names AS text[])) AS v(standard_id, name)
+                  ON p.standard_id = v.standard_id AND p.name = v.name
+            """),
+            {"sids": [p[0] for p in missing], "names": [p[1] for p in missing]}
+        ).fetchall()
+        fetched = {(sid, name): id_ for sid, name, id_ in rows}
+        found.update(fetched)
+        with _lock:
+            if generation == _generation:
+                _product_ids.update(fetched)
+
+    return found
+
+
+def get_index_stats() -> dict:
+    with _lock:
+        stats = dict(index_stats)
+        stats["standards"] = len(_standard_ids)
+        stats["products"] = len(_product_ids)
+    lookups = stats["standard_hits"] + stats["standard_misses"]
+    stats["standard_hit_ratio"] = round(stats["standard_hits"] / lookups, 3) if lookups else None
+    return stats
@@ -0,0 +1,171 @@
+# rate_limiter.py — общий для аккаунта лимитер запросов к Telegram с учётом FloodWait
+
+import asyncio
+import logging
+import time
+from telethon.errors import FloodWaitError
+from config import TG_RATE_PER_SEC, TG_BURST, TG_MIN_RATE_PER_SEC
+
+logger = logging.getLogger(__name__)
+
+# Telethon запрашивает сообщения и диалоги страницами по 100 штук
+PAGE_SIZE = 100
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket на один аккаунт.
+
+    Каждый запрос к Telegram забирает токен до отправки. На FloodWait лимитер
+    засыпает на указанное время, вдвое снижает скорость и продолжает; после серии
+    успешных запросов скорость постепенно возвращается к исходной. Чтобы лимитер
+    видел все FloodWait, у клиентов выставлен flood_sleep_threshold = 0
+    (см. disable_flood_sleep) — иначе Telethon молча отсыпает короткие ожидания сам.
+    """
+
+    def __init__(self, account_id: str, rate: float = TG_RATE_PER_SEC, burst: int = TG_BURST,
+                 min_rate: float = TG_MIN_RATE_PER_SEC, max_retries: int = 5):
+        self.account_id = account_id
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_retries = max_retries
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._successes = 0
+        self._lock = asyncio.Lock()
+        self.stats = {"requests": 0, "flood_waits": 0, "flood_wait_seconds": 0, "throttled_seconds": 0.0}
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    delay = self._paused_until - now
+                else:
+                    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        self.stats["requests"] += 1
+                        return
+                    delay = (1 - self._tokens) / self.rate
+                self.stats["throttled_seconds"] += delay
+                await asyncio.sleep(delay)
+
+    def on_success(self):
+        self._successes += 1
+        # Аддитивный рост: +10% от максимума за каждые 50 успешных запросов
+        if self.rate < self.max_rate and self._successes % 50 == 0:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.1)
+
+    async def on_flood_wait(self, seconds: int):
+        self._successes = 0
+        self.rate = max(self.min_rate, self.rate / 2)
+        self._tokens = 0
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self.stats["flood_waits"] += 1
+        self.stats["flood_wait_seconds"] += seconds
+        logger.warning(f"🐢 FloodWait {seconds}s для {self.account_id}: пауза, скорость снижена до {self.rate:.2f} запр/с")
+        await asyncio.sleep(seconds)
+
+    async def call(self, request):
+        """Выполняет request() — фабрику корутины — с учётом лимита и повтором после FloodWait."""
+        for attempt in range(self.max_retries + 1):
+            await self.acquire()
+            try:
+                result = await request()
+            except FloodWaitError as e:
+                if attempt == self.max_retries:
+                    raise
+                await self.on_flood_wait(e.seconds)
+                continue
+            self.on_success()
+            return result
+
+    async def iter_messages(self, client, entity, **kwargs):
+        """client.iter_messages с токеном на каждую страницу и продолжением после FloodWait."""
+        limit = kwargs.pop("limit", None)
+        reverse = kwargs.get("reverse", False)
+        yielded = 0
+        floods = 0
+        while True:
+            try:
+                await self.acquire()
+                page = 0
+                async for message in client.iter_messages(entity, limit=None if limit is None else limit - yielded, **kwargs):
+                    yielded += 1
+                    # Точка продолжения, если следующая страница упадёт с FloodWait
+                    if reverse:
+                        kwargs["min_id"] = message.id
+                    else:
+                        kwargs["offset_id"] = message.id
+                    yield message
+                    page += 1
+                    if page == PAGE_SIZE:
+                        # Страница исчерпана: следующий шаг итератора — новый запрос, токен берём до него
+                        await self.acquire()
+                        page = 0
+                self.on_success()
+                return
+            except FloodWaitError as e:
+                floods += 1
+                if floods > self.max_retries:
+                    raise
+                await self.on_flood_wait(e.seconds)
+
+    async def iter_dialogs(self, client, **kwargs):
+        """client.iter_dialogs с токеном на каждую страницу; после FloodWait обход повторяется без дублей."""
+        seen = set()
+        floods = 0
+        while True:
+            try:
+                await self.acquire()
+                page = 0
+                async for dialog in client.iter_dialogs(**kwargs):
+                    page += 1
+                    if page == PAGE_SIZE:
+                        # Токен на следующую страницу — до её запроса
+                        await self.acquire()
+                        page = 0
+                    if dialog.id in seen:
+                        continue
+                    seen.add(dialog.id)
+                    yield dialog
+                self.on_success()
+                return
+            except FloodWaitError as e:
+                floods += 1
+                if floods > self.max_retries:
+                    raise
+                await self.on_flood_wait(e.seconds)
+
+    def get_stats(self) -> dict:
+        return {
+            "rate": round(self.rate, 2),
+            "max_rate": self.max_rate,
+            **self.stats,
+            "throttled_seconds": round(self.stats["throttled_seconds"], 1),
+        }
+
+
+def disable_flood_sleep(client):
+    """Telethon не отсыпает FloodWait сам: любое ожидание приходит в лимитер как FloodWaitError."""
+    client.flood_sleep_threshold = 0
+    return client
+
+
+_limiters = {}
+
+
+def get_limiter(account_id: str) -> AdaptiveRateLimiter:
+    limiter = _limiters.get(account_id)
+    if limiter is None:
+        limiter = _limiters[account_id] = AdaptiveRateLimiter(account_id)
+    return limiter
+
+
+def get_limiter_stats() -> dict:
+    return {account_id: limiter.get_stats() for account_id, limiter in _limiters.items()}
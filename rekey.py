@@ -0,0 +1,395 @@
+"""
+Пересчёт products_cleaned.name_std после смены NORMALIZER_VERSION.
+
+Новый ключ — normalize_model_name(name_std) по текущим правилам. Перед любой записью
+строится план: сколько ключей изменится и какие эталоны будут слиты; он пишется в лог
+и в rekey_stats["plan"]. Дальше — короткими транзакциями по chunk строк:
+  1. новые ключи пишутся во временную колонку name_std_next;
+  2. эталоны, получившие одинаковый ключ, сливаются в самый старый (products и prices
+     перепривязываются, дубли товаров удаляются);
+  3. name_std заменяется на name_std_next, колонка удаляется, версия сохраняется.
+Пока колонка name_std_next есть, product_index ищет эталон по обоим ключам, поэтому
+загрузка цен во время пересчёта не теряет строки.
+
+Запуск только вручную:
+    python rekey.py [--chunk 1000] [--force]          — только план, без записи
+    python rekey.py --apply [--chunk 1000] [--force]  — план и пересчёт
+или кнопками «Проверить» и «Пересчитать» на /manage-parsing.
+"""
+import argparse
+import logging
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import text
+from database import get_session, get_normalizer_version, save_normalizer_version
+from normalizer import NORMALIZER_VERSION, normalize_model_name
+
+logger = logging.getLogger(__name__)
+
+REKEY_CHUNK = 1000
+# Сколько групп слияния держать в rekey_stats для страницы; в лог пишутся все
+PLAN_GROUPS_SHOWN = 50
+
+_run_lock = threading.Lock()
+rekey_stats = {
+    "running": False,
+    "version": None,
+    "scanned": 0,
+    "changed": 0,
+    "merged": 0,
+    "started_at": None,
+    "finished_at": None,
+    "duration_s": None,
+    "error": None,
+    "plan": None,
+}
+
+
+def _new_key(name_std: str) -> str:
+    return normalize_model_name(name_std or "") or name_std
+
+
+def _build_plan(chunk: int) -> dict:
+    """Пробный проход без записи: сколько ключей изменится и какие эталоны сольются."""
+    by_key = {}
+    scanned = changed = 0
+    last_id = 0
+    while True:
+        with get_session() as session:
+            rows = session.execute(
+                text("""
+                    SELECT id, name_std FROM products_cleaned
+                    WHERE id > :last_id ORDER BY id LIMIT :chunk
+                """),
+                {"last_id": last_id, "chunk": chunk}
+            ).fetchall()
+        if not rows:
+            break
+        for row in rows:
+            key = _new_key(row.name_std)
+            if key != row.name_std:
+                changed += 1
+            if key is not None:
+                by_key.setdefault(key, []).append((row.id, row.name_std))
+        scanned += len(rows)
+        last_id = rows[-1].id
+
+    groups = [
+        {"key": key, "survivor": members[0], "merged": members[1:]}
+        for key, members in by_key.items() if len(members) > 1
+    ]
+    return {
+        "version": NORMALIZER_VERSION,
+        "scanned": scanned,
+        "changed": changed,
+        "merges": sum(len(g["merged"]) for g in groups),
+        "groups": groups,
+    }
+
+
+def _log_plan(plan: dict):
+    logger.info(
+        f"📝 План пересчёта name_std (версия {plan['version']}): строк {plan['scanned']}, "
+        f"изменится {plan['changed']}, будет слито {plan['merges']} в {len(plan['groups'])} группах"
+    )
+    for group in plan["groups"]:
+        survivor_id, survivor_name = group["survivor"]
+        merged = ", ".join(f"{id_} «{name}»" for id_, name in group["merged"])
+        logger.info(f"🔀 «{group['key']}»: {survivor_id} «{survivor_name}» ← {merged}")
+
+
+def _compute_keys(chunk: int) -> int:
+    """Шаг 1: name_std_next для всех строк, по chunk за транзакцию."""
+    last_id = 0
+    changed = 0
+    while True:
+        with get_session() as session:
+            rows = session.execute(
+                text("""
+                    SELECT id, name_std
+                    FROM products_cleaned WHERE id > :last_id
+                    ORDER BY id LIMIT :chunk
+                """),
+                {"last_id": last_id, "chunk": chunk}
+            ).fetchall()
+            if not rows:
+                return changed
+
+            ids, keys = [], []
+            for row in rows:
+                # Ключ — заново нормализованный name_std: части эталона могли быть записаны иначе
+                key = _new_key(row.name_std)
+                ids.append(row.id)
+                keys.append(key)
+                if key != row.name_std:
+                    changed += 1
+
+            session.execute(
+                text("""
+                    UPDATE products_cleaned pc SET name_std_next = v.key
+                    FROM unnest(CAST(:ids AS integer[]), CAST(:keys AS text[])) AS v(id, key)
+                    WHERE pc.id = v.id
+                """),
+                {"ids": ids, "keys": keys}
+            )
+            session.commit()
+            rekey_stats["scanned"] += len(rows)
+            last_id = rows[-1].id
+
+
+def _merge_into(session, survivor: int, loser: int):
+    # Цены товаров-дублей переезжают к одноимённому товару эталона-победителя
+    session.execute(text("""
+        DELETE FROM prices p
+        USING products l, products s, prices ps
+        WHERE l.standard_id = :loser AND s.standard_id = :survivor AND s.name = l.name
+          AND p.product_id = l.id AND ps.product_id = s.id AND ps.message_id = p.message_id
+    """), {"survivor": survivor, "loser": loser})
+    session.execute(text("""
+        UPDATE prices p SET product_id = s.id
+        FROM products l, products s
+        WHERE l.standard_id = :loser AND s.standard_id = :survivor AND s.name = l.name
+          AND p.product_id = l.id
+    """), {"survivor": survivor, "loser": loser})
+    session.execute(text("""
+        DELETE FROM products l
+        USING products s
+        WHERE l.standard_id = :loser AND s.standard_id = :survivor AND s.name = l.name
+    """), {"survivor": survivor, "loser": loser})
+    session.execute(
+        text("UPDATE products SET standard_id = :survivor WHERE standard_id = :loser"),
+        {"survivor": survivor, "loser": loser}
+    )
+    session.execute(
+        text("UPDATE product_aliases SET standard_id = :survivor WHERE standard_id = :loser"),
+        {"survivor": survivor, "loser": loser}
+    )
+    # Текущие цены дубля: более свежая по (регион, канал) побеждает, остальное уйдёт каскадом
+    session.execute(text("""
+        INSERT INTO latest_prices (standard_id, region, channel, price, previous_price, country, message_date, updated_at)
+        SELECT :survivor, region, channel, price, previous_price, country, message_date, updated_at
+        FROM latest_prices
+        WHERE standard_id = :loser
+        ON CONFLICT (standard_id, region, channel) DO UPDATE SET
+            price = EXCLUDED.price,
+            previous_price = EXCLUDED.previous_price,
+            country = EXCLUDED.country,
+            message_date = EXCLUDED.message_date,
+            updated_at = EXCLUDED.updated_at
+        WHERE EXCLUDED.message_date > latest_prices.message_date
+    """), {"survivor": survivor, "loser": loser})
+    session.execute(text("""
+        INSERT INTO price_daily (standard_id, region, channel, day, min_price, max_price, last_price, last_at, count)
+        SELECT :survivor, region, channel, day, min_price, max_price, last_price, last_at, count
+        FROM price_daily
+        WHERE standard_id = :loser
+        ON CONFLICT (standard_id, region, channel, day) DO UPDATE SET
+            min_price = LEAST(price_daily.min_price, EXCLUDED.min_price),
+            max_price = GREATEST(price_daily.max_price, EXCLUDED.max_price),
+            last_price = CASE
+                WHEN EXCLUDED.last_at >= price_daily.last_at THEN EXCLUDED.last_price
+                ELSE price_daily.last_price
+            END,
+            last_at = GREATEST(price_daily.last_at, EXCLUDED.last_at),
+            count = price_daily.count + EXCLUDED.count
+    """), {"survivor": survivor, "loser": loser})
+    session.execute(text("""
+        UPDATE products_cleaned SET catalog_product_id = COALESCE(
+            catalog_product_id,
+            (SELECT catalog_product_id FROM products_cleaned WHERE id = :loser)
+        )
+        WHERE id = :survivor
+    """), {"survivor": survivor, "loser": loser})
+    session.execute(text("DELETE FROM products_cleaned WHERE id = :loser"), {"loser": loser})
+
+
+def _merge_collisions(chunk: int) -> int:
+    """Шаг 2: группы с одинаковым name_std_next сливаются в эталон с наименьшим id."""
+    with get_session() as session:
+        groups = session.execute(text("""
+            SELECT array_agg(id ORDER BY id) AS ids
+            FROM products_cleaned
+            WHERE name_std_next IS NOT NULL
+            GROUP BY name_std_next
+            HAVING COUNT(*) > 1
+        """)).fetchall()
+
+    merged = 0
+    for start in range(0, len(groups), chunk):
+        with get_session() as session:
+            for group in groups[start:start + chunk]:
+                survivor, *losers = group.ids
+                for loser in losers:
+                    _merge_into(session, survivor, loser)
+                    merged += 1
+            session.commit()
+        rekey_stats["merged"] = merged
+    return merged
+
+
+def _apply_keys(chunk: int):
+    """Шаг 3: name_std := name_std_next. Строки, чей новый ключ ещё занят старым ключом
+    другой строки, ждут следующего прохода; взаимные перестановки разрываются через NULL."""
+    while True:
+        updated = 0
+        last_id = 0
+        while True:
+            with get_session() as session:
+                batch = session.execute(
+                    text("""
+                        SELECT id FROM products_cleaned
+                        WHERE id > :last_id AND name_std_next IS NOT NULL
+                          AND name_std IS DISTINCT FROM name_std_next
+                        ORDER BY id LIMIT :chunk
+                    """),
+                    {"last_id": last_id, "chunk": chunk}
+                ).scalars().all()
+                if not batch:
+                    break
+                updated += session.execute(
+                    text("""
+                        UPDATE products_cleaned pc SET name_std = pc.name_std_next
+                        WHERE pc.id = ANY(CAST(:ids AS integer[]))
+                          AND NOT EXISTS (
+                              SELECT 1 FROM products_cleaned o
+                              WHERE o.name_std = pc.name_std_next AND o.id <> pc.id
+                          )
+                    """),
+                    {"ids": batch}
+                ).rowcount
+                session.commit()
+                last_id = batch[-1]
+
+        with get_session() as session:
+            remaining = session.execute(text("""
+                SELECT COUNT(*) FROM products_cleaned
+                WHERE name_std_next IS NOT NULL AND name_std IS DISTINCT FROM name_std_next
+            """)).scalar()
+            if not remaining:
+                return
+            if updated:
+                continue
+
+            # Ключ занят строкой, которая уже не сдвинется (например, добавленной во время
+            # пересчёта) — сливаем в неё; оставшиеся взаимные перестановки разрываем через NULL
+            blocked = session.execute(text("""
+                SELECT pc.id AS loser, o.id AS survivor
+                FROM products_cleaned pc
+                JOIN products_cleaned o ON o.name_std = pc.name_std_next AND o.id <> pc.id
+                WHERE pc.name_std_next IS NOT NULL AND pc.name_std IS DISTINCT FROM pc.name_std_next
+                  AND (o.name_std_next IS NULL OR o.name_std_next = o.name_std)
+            """)).fetchall()
+            for row in blocked:
+                _merge_into(session, row.survivor, row.loser)
+                rekey_stats["merged"] += 1
+            if not blocked:
+                session.execute(text("""
+                    UPDATE products_cleaned SET name_std = NULL
+                    WHERE name_std_next IS NOT NULL AND name_std IS DISTINCT FROM name_std_next
+                """))
+            session.commit()
+
+
+def run_rekey(chunk: int = REKEY_CHUNK, force: bool = False, dry_run: bool = False) -> dict:
+    """
+    Пересчитывает name_std, если сохранённая версия отличается от NORMALIZER_VERSION.
+    Сначала всегда строит и логирует план слияний; при dry_run на этом и останавливается.
+    """
+    if not _run_lock.acquire(blocking=False):
+        logger.info("🔁 Пересчёт name_std уже идёт")
+        return dict(rekey_stats)
+    try:
+        current = get_normalizer_version()
+        if current == NORMALIZER_VERSION and not force:
+            logger.info(f"🔁 name_std уже посчитаны версией {current}")
+            return dict(rekey_stats)
+
+        started = time.monotonic()
+        rekey_stats.update({
+            "running": True, "version": NORMALIZER_VERSION, "scanned": 0, "changed": 0, "merged": 0,
+            "started_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "finished_at": None,
+            "duration_s": None, "error": None,
+        })
+
+        plan = _build_plan(chunk)
+        _log_plan(plan)
+        rekey_stats["plan"] = {**plan, "groups": plan["groups"][:PLAN_GROUPS_SHOWN], "dry_run": dry_run}
+        if dry_run:
+            return dict(rekey_stats)
+
+        logger.info(f"🔁 Пересчёт name_std: версия {current} → {NORMALIZER_VERSION}")
+
+        from product_index import invalidate_product_index, set_rekey_in_progress
+        with get_session() as session:
+            session.execute(text("ALTER TABLE products_cleaned ADD COLUMN IF NOT EXISTS name_std_next TEXT"))
+            session.commit()
+        set_rekey_in_progress(True)
+
+        rekey_stats["changed"] = _compute_keys(chunk)
+        _merge_collisions(chunk)
+        # Слитые эталоны удалены — их id не должны остаться в индексе до конца пересчёта
+        invalidate_product_index()
+        _apply_keys(chunk)
+
+        set_rekey_in_progress(False)
+        with get_session() as session:
+            session.execute(text("ALTER TABLE products_cleaned DROP COLUMN IF EXISTS name_std_next"))
+            session.commit()
+        save_normalizer_version(NORMALIZER_VERSION)
+
+        from parse_cache import invalidate_parse_caches
+        from alias_index import invalidate_alias_index
+        invalidate_product_index()
+        invalidate_alias_index()
+        invalidate_parse_caches()
+
+        rekey_stats["duration_s"] = round(time.monotonic() - started, 1)
+        logger.info(
+            f"🔁 Пересчёт name_std завершён: строк {rekey_stats['scanned']}, изменено {rekey_stats['changed']}, "
+            f"слито {rekey_stats['merged']} за {rekey_stats['duration_s']} с"
+        )
+    except Exception as e:
+        rekey_stats["error"] = str(e)
+        logger.exception("🔥 Ошибка при пересчёте name_std")
+    finally:
+        rekey_stats["running"] = False
+        rekey_stats["finished_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        _run_lock.release()
+    return dict(rekey_stats)
+
+
+def get_rekey_stats() -> dict:
+    return {"normalizer_version": NORMALIZER_VERSION, **rekey_stats}
+
+
+def warn_if_rekey_needed():
+    """При старте: предупреждает, что name_std посчитаны старой версией правил. Сам пересчёт не запускает."""
+    current = get_normalizer_version()
+    if current != NORMALIZER_VERSION:
+        logger.warning(
+            f"⚠️ name_std посчитаны версией {current}, правила — версии {NORMALIZER_VERSION}: "
+            f"проверьте план и запустите пересчёт на /manage-parsing или python rekey.py --apply"
+        )
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunk", type=int, default=REKEY_CHUNK, help="строк в одной транзакции")
+    ap.add_argument("--force", action="store_true", help="пересчитать, даже если версия совпадает")
+    ap.add_argument("--apply", action="store_true", help="после плана записать изменения (без флага — только план)")
+    args = ap.parse_args()
+    stats = run_rekey(chunk=args.chunk, force=args.force, dry_run=not args.apply)
+    plan = stats.get("plan")
+    if plan:
+        print(f"📝 Изменится ключей: {plan['changed']} из {plan['scanned']}, будет слито эталонов: {plan['merges']}")
+        for group in plan["groups"]:
+            print(f"   «{group['key']}»: {group['survivor'][0]} ← {', '.join(str(id_) for id_, _ in group['merged'])}")
+        if not args.apply:
+            print(f"   Показано групп: не больше {PLAN_GROUPS_SHOWN}, полный список — в логе; для записи запустите с --apply")
+    print({key: value for key, value in stats.items() if key != "plan"})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# resources.py — реестр тяжёлых ресурсов, которые создаются при первом обращении
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_registry = {}  # имя → {"factory", "value", "loaded", "load_ms", "error"}
+
+
+def register_resource(name: str, factory):
+    """Регистрирует фабрику ресурса; сама фабрика вызывается только в get_resource."""
+    with _lock:
+        if name not in _registry:
+            _registry[name] = {"factory": factory, "value": None, "loaded": False, "load_ms": None, "error": None}
+
+
+def get_resource(name: str):
+    """Значение ресурса; при первом обращении вызывает фабрику (один раз на процесс)."""
+    entry = _registry[name]
+    if entry["loaded"]:
+        return entry["value"]
+    with _lock:
+        if not entry["loaded"]:
+            started = time.monotonic()
+            try:
+                entry["value"] = entry["factory"]()
+            except Exception as e:
+                entry["error"] = str(e)
+                raise
+            entry["load_ms"] = round((time.monotonic() - started) * 1000, 1)
+            entry["loaded"] = True
+            entry["error"] = None
+            logger.info(f"📦 Ресурс {name} загружен за {entry['load_ms']} мс")
+    return entry["value"]
+
+
+def reset_resource(name: str):
+    """Забывает значение; следующий get_resource создаст ресурс заново."""
+    with _lock:
+        entry = _registry.get(name)
+        if entry is not None:
+            entry["value"] = None
+            entry["loaded"] = False
+
+
+def get_resource_stats() -> dict:
+    with _lock:
+        return {
+            name: {"loaded": entry["loaded"], "load_ms": entry["load_ms"], "error": entry["error"]}
+            for name, entry in _registry.items()
+        }
+
+
+def _load_nlp():
+    import spacy
+    from config import NER_MODEL
+
+    nlp = spacy.load(NER_MODEL)
+    # Для извлечения брендов нужен только ner и tok2vec, если ner его слушает
+    keep = {"ner"}
+    if "tok2vec" in nlp.pipe_names and "ner" in getattr(nlp.get_pipe("tok2vec"), "listening_components", []):
+        keep.add("tok2vec")
+    nlp.select_pipes(enable=[name for name in nlp.pipe_names if name in keep])
+    return nlp
+
+
+def _load_region_map():
+    from database import get_region_map
+    return get_region_map()
+
+
+register_resource("nlp", _load_nlp)
+register_resource("region_map", _load_region_map)
@@ -11,14 +11,20 @@ from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from utils import log_monitoring_result
+from resources import register_resource, get_resource
+from partitions import maintain_price_partitions
+from compaction import compact_prices
 
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 scheduler = AsyncIOScheduler()
-bot = Bot(token=API_TOKEN)
+# Бот создаётся при первой отправке: импорт модуля не требует API_TOKEN
+register_resource("notify_bot", lambda: Bot(token=API_TOKEN))
 
 TICK_INTERVAL_MINUTES = 60
+PARTITION_MAINTENANCE_HOURS = 24
+PRICE_COMPACTION_HOURS = 24
 
 MONITORING_STATUS_FILE = Path("monitoring_status.json")
 MONITORING_LOG_FILE = Path("monitoring_log.json")
@@ -80,7 +86,7 @@ def toggle_monitoring_parsing(enabled: bool):
 
                         user_id = load_user_id()
                         if user_id:
-                            await bot.send_message(
+                            await get_resource("notify_bot").send_message(
                                 chat_id=user_id,
                                 text=f"📊 {label}: {total_channels} каналов, {total_products} товаров"
                             )
@@ -145,12 +151,29 @@ async def test_ping():
         logger.warning("⚠️ user_id не найден")
         return
     try:
-        await bot.send_message(chat_id=user_id, text="✅ Бот на связи. Всё работает.")
+        await get_resource("notify_bot").send_message(chat_id=user_id, text="✅ Бот на связи. Всё работает.")
     except Exception as e:
         logger.exception("Ошибка при тестовой отправке")
 
 
+async def run_partition_maintenance():
+    try:
+        result = await asyncio.to_thread(maintain_price_partitions)
+        logger.info(f"🗓️ Обслуживание секций цен: {result}")
+    except Exception:
+        logger.exception("🔥 Ошибка при обслуживании секций цен")
+
+
+async def run_price_compaction():
+    try:
+        await asyncio.to_thread(compact_prices)
+    except Exception:
+        logger.exception("🔥 Ошибка при сжатии истории цен")
+
+
 def start_scheduler():
+    scheduler.add_job(run_partition_maintenance, "interval", hours=PARTITION_MAINTENANCE_HOURS, id="price_partitions", replace_existing=True)
+    scheduler.add_job(run_price_compaction, "interval", hours=PRICE_COMPACTION_HOURS, id="price_compaction", replace_existing=True)
     scheduler.start()
     if load_monitoring_status():
         toggle_monitoring_parsing(True)
@@ -3,56 +3,140 @@
 import os
 import asyncio
 import logging
-from datetime import datetime
-from telethon import TelegramClient, events
-from telethon.tl.types import PeerChannel, PeerChat
+from datetime import datetime, timedelta
+from telethon import TelegramClient, events, utils as tg_utils
+from telethon.tl.types import PeerChannel, PeerChat, InputPeerChannel
 from utils import ensure_messages_table, log_message, get_all_clients
-from database import insert_product_if_new, save_source_id, get_allowed_sources_by_id
+from ingest_queue import get_ingest_queue
+from rate_limiter import get_limiter
+from dedupe import RecentMessages
+from config import LIVE_DEDUPE_PER_CHAT, LIVE_DEDUPE_MAX_CHATS, LIVE_DEDUPE_TTL_HOURS, ENTITY_CACHE_TTL_HOURS
+from database import insert_product_if_new, save_source_id, get_allowed_sources_by_id, get_cached_entities, save_cached_entity
 from llm import generate_reply
 
 logger = logging.getLogger(__name__)
-processed_messages = set()
-_clients_cache = []
-
+processed_messages = RecentMessages(
+    per_chat=LIVE_DEDUPE_PER_CHAT,
+    max_chats=LIVE_DEDUPE_MAX_CHATS,
+    ttl=LIVE_DEDUPE_TTL_HOURS * 3600
+)
+
+# account_id → frozenset id; при обновлении множества подменяются целиком,
+# поэтому обработчик всегда видит согласованный снимок без блокировок
 CLIENT_ALLOWED_CHANNELS = {}
 CLIENT_ALLOWED_CHATS = {}
+CLIENT_ALLOWED_SOURCES = {}
 _resolved_accounts = set()  # 🧠 запоминаем, чтобы не дублировать логи
 
+_source_snapshots = {}   # account_id → {(type, id): данные разрешённой entity}
+_failed_at = {}          # (account_id, type, id) → время последней неудачной попытки
+FAILED_RETRY_SECONDS = 600
+
+def _entity_kind(entity) -> str:
+    if getattr(entity, "broadcast", False):
+        return "broadcast"
+    if getattr(entity, "megagroup", False):
+        return "megagroup"
+    return type(entity).__name__.lower()
+
+def get_source_peer(account_id: str, type_: str, entity_id: int):
+    """
+    Peer источника для запросов: InputPeerChannel с access_hash из снимка,
+    если entity — канал или супергруппа, иначе PeerChannel/PeerChat по типу источника.
+    """
+    entity = _source_snapshots.get(account_id, {}).get((type_, entity_id))
+    if entity and entity.get("access_hash") and entity.get("kind") in ("broadcast", "megagroup"):
+        return InputPeerChannel(entity_id, entity["access_hash"])
+    return PeerChannel(entity_id) if type_ == "channel" else PeerChat(entity_id)
+
+async def _resolve_entity(client: TelegramClient, account_id: str, type_: str, entity_id: int):
+    peer = PeerChannel(entity_id) if type_ == "channel" else PeerChat(entity_id)
+    entity = await get_limiter(account_id).call(lambda: client.get_entity(peer))
+    return {
+        "entity_id": entity.id,
+        "type": type_,
+        "access_hash": getattr(entity, "access_hash", None),
+        "kind": _entity_kind(entity),
+        "title": getattr(entity, "title", None),
+        "username": getattr(entity, "username", None),
+        "resolved_at": datetime.now()
+    }
+
+def _is_stale(entity: dict) -> bool:
+    resolved_at = entity.get("resolved_at")
+    return resolved_at is None or datetime.now() - resolved_at > timedelta(hours=ENTITY_CACHE_TTL_HOURS)
+
 async def resolve_entity_ids(client: TelegramClient, account_id: str):
+    """
+    Сравнивает список источников с предыдущим снимком и разрешает только новые id
+    и те, что разрешались дольше ENTITY_CACHE_TTL_HOURS назад. Разрешённые entity
+    хранятся в entity_cache, поэтому после рестарта get_entity и save_source_id
+    повторно не вызываются. Переименование канала только логируется: уже сохранённые
+    цены остаются под прежним названием.
+    """
     first_run = account_id not in _resolved_accounts
     if first_run:
         _resolved_accounts.add(account_id)
 
-    channels = []
-    chats = []
-
-    for type_, target_list in [("channel", channels), ("chat", chats)]:
-        source_ids = get_allowed_sources_by_id(type_, account_id)
+    current = set()
+    for type_ in ("channel", "chat"):
+        source_ids = await asyncio.to_thread(get_allowed_sources_by_id, type_, account_id)
         if first_run:
             logger.info(f"📥 Источники типа {type_} для {account_id}: {source_ids}")
-        for entity_id in source_ids:
-            try:
-                peer = PeerChannel(entity_id) if type_ == "channel" else PeerChat(entity_id)
-                entity = await client.get_entity(peer)
-
-                if type_ == "channel" and not getattr(entity, "broadcast", False):
-                    continue
-                if type_ == "chat" and not getattr(entity, "megagroup", False):
-                    continue
-
-                target_list.append(entity.id)
-                title_or_id = entity.username or getattr(entity, "title", None) or str(entity.id)
-                save_source_id(entity.id, title_or_id, type_)
-            except Exception as e:
-                if first_run:
-                    logger.warning(f"❌ Не удалось получить {type_} {entity_id} (аккаунт: {account_id}): {e}")
-
-    CLIENT_ALLOWED_CHANNELS[account_id] = channels
-    CLIENT_ALLOWED_CHATS[account_id] = chats
+        current.update((type_, entity_id) for entity_id in source_ids)
+
+    previous = _source_snapshots.get(account_id)
+    if previous is None:
+        # Первый запуск процесса: прошлые результаты берём из постоянного кэша
+        previous = await asyncio.to_thread(get_cached_entities, account_id)
+    snapshot = {key: previous[key] for key in current if previous.get(key)}
+
+    now = asyncio.get_running_loop().time()
+    stale = {key for key, entity in snapshot.items() if _is_stale(entity)}
+    for key in (current - snapshot.keys()) | stale:
+        type_, entity_id = key
+        failed_at = _failed_at.get((account_id, *key))
+        if failed_at is not None and now - failed_at < FAILED_RETRY_SECONDS:
+            continue
+        try:
+            entity = await _resolve_entity(client, account_id, type_, entity_id)
+        except Exception as e:
+            # Устаревшая запись остаётся в снимке до следующей удачной попытки
+            _failed_at[(account_id, *key)] = now
+            logger.warning(f"❌ Не удалось получить {type_} {entity_id} (аккаунт: {account_id}): {e}")
+            continue
+        _failed_at.pop((account_id, *key), None)
+        previous_title = snapshot[key].get("title") if key in snapshot else None
+        snapshot[key] = entity
+
+        if previous_title and entity["title"] and previous_title != entity["title"]:
+            logger.info(f"✏️ Источник {entity_id} переименован: «{previous_title}» → «{entity['title']}»")
+
+        await asyncio.to_thread(save_cached_entity, account_id, entity)
+        title_or_id = entity["username"] or entity["title"] or str(entity["entity_id"])
+        await asyncio.to_thread(save_source_id, entity["entity_id"], title_or_id, type_)
+
+    _source_snapshots[account_id] = snapshot
+
+    channels = [e["entity_id"] for (type_, _), e in snapshot.items() if type_ == "channel" and e["kind"] == "broadcast"]
+    chats = [e["entity_id"] for (type_, _), e in snapshot.items() if type_ == "chat" and e["kind"] == "megagroup"]
+
+    CLIENT_ALLOWED_CHANNELS[account_id] = frozenset(channels)
+    CLIENT_ALLOWED_CHATS[account_id] = frozenset(chats)
+    CLIENT_ALLOWED_SOURCES[account_id] = frozenset(channels) | frozenset(chats)
     if first_run:
         logger.info(f"🔎 Разрешённые каналы ({account_id}): {channels}")
         logger.info(f"🔎 Разрешённые чаты ({account_id}): {chats}")
 
+def is_monitored_update(account_id: str, marked_chat_id) -> bool:
+    """
+    Дешёвый фильтр апдейтов: только event.chat_id, без запросов к Telegram.
+    chat_id у событий «помеченный» (-100… для каналов), а в источниках лежат голые id.
+    """
+    if marked_chat_id is None:
+        return False
+    return tg_utils.resolve_id(marked_chat_id)[0] in CLIENT_ALLOWED_SOURCES.get(account_id, frozenset())
+
 async def periodic_refresh_sources(client: TelegramClient, account_id: str):
     while True:
         try:
@@ -61,37 +145,15 @@ async def periodic_refresh_sources(client: TelegramClient, account_id: str):
             logger.warning(f"Ошибка при обновлении источников (аккаунт: {account_id}): {e}")
         await asyncio.sleep(60)
 
-async def fetch_history_from_allowed_sources():
-    for client, account_id in _clients_cache:
-        for source_type in ["channel", "chat"]:
-            source_ids = get_allowed_sources_by_id(source_type, account_id)
-            logger.info(f"📦 История {source_type} для {account_id}: {source_ids}")
-            for source_id in source_ids:
-                try:
-                    peer = PeerChannel(source_id)
-                    entity = await client.get_entity(peer)
-
-                    async for message in client.iter_messages(entity, limit=50):
-                        if message.text:
-                            from parser import parse_message_text
-                            parse_message_text(message.text, {
-                                "account_id": account_id,
-                                "channel_id": entity.id,
-                                "channel_name": getattr(entity, "title", "unknown"),
-                                "message_id": message.id,
-                                "date": message.date
-                            })
-                except Exception as e:
-                    logger.warning(f"⚠️ Ошибка при загрузке истории из {source_type} {source_id} ({account_id}): {e}")
-
 async def start_telethon_monitoring(client: TelegramClient, account_id: str, monitoring_stats: dict):
     logger.info(f"📦 Запуск мониторинга аккаунта: {account_id}")
-    me = await client.get_me()
+    me = await get_limiter(account_id).call(lambda: client.get_me())
     logger.info(f"🔐 Авторизован: {me.username or me.phone} (как {account_id})")
 
     await resolve_entity_ids(client, account_id)
     asyncio.create_task(periodic_refresh_sources(client, account_id))
-    asyncio.create_task(fetch_history_from_allowed_sources())
+    from backfill import start_backfill
+    start_backfill()
 
     monitoring_stats[account_id] = {
         "channels": 0,
@@ -100,43 +162,38 @@ async def start_telethon_monitoring(client: TelegramClient, account_id: str, mon
         "details": []
     }
 
-    @client.on(events.NewMessage())
+    # Апдейты из немониторящихся чатов отбрасываются до вызова обработчика
+    @client.on(events.NewMessage(func=lambda e: is_monitored_update(account_id, e.chat_id)))
     async def live_handler(event):
         try:
-            chat = await event.get_chat()
-            chat_id = chat.id
+            chat_id = tg_utils.resolve_id(event.chat_id)[0]
             msg = event.message.message
             msg_id = event.message.id
 
-            if (chat_id, msg_id) in processed_messages:
+            if processed_messages.seen(chat_id, msg_id):
                 return
-            processed_messages.add((chat_id, msg_id))
-
-            allowed_channels = CLIENT_ALLOWED_CHANNELS.get(account_id, [])
-            allowed_chats = CLIENT_ALLOWED_CHATS.get(account_id, [])
 
-            if chat_id not in allowed_channels and chat_id not in allowed_chats:
-                return
+            # get_chat/get_sender могут уйти в Telegram — через лимитер аккаунта, как и прочие запросы
+            limiter = get_limiter(account_id)
+            chat = await limiter.call(lambda: event.get_chat())
 
-            from parser import parse_message_text
-            parse_message_text(msg, {
+            # Разбор прайса и запись в messages — в потоках очереди, не в event loop
+            sender = await limiter.call(lambda: event.get_sender())
+            await get_ingest_queue().put(msg, {
                 "account_id": account_id,
                 "channel_id": chat_id,
                 "channel_name": getattr(chat, "title", "unknown"),
                 "message_id": msg_id,
                 "date": event.message.date
+            }, {
+                "chat_id": chat_id,
+                "user_id": sender.id,
+                "username": getattr(sender, "username", None) or "",
+                "text_msg": msg.strip(),
+                "timestamp": datetime.utcnow().isoformat(),
+                "account_id": account_id
             })
 
-            sender = await event.get_sender()
-            log_message(
-                chat_id=chat_id,
-                user_id=sender.id,
-                username=sender.username or "",
-                text_msg=msg.strip(),
-                timestamp=datetime.utcnow().isoformat(),
-                account_id=account_id
-            )
-
             # Обновление общей статистики
             monitoring_stats[account_id]["messages"] += 1
 
@@ -152,10 +209,10 @@ async def start_telethon_monitoring(client: TelegramClient, account_id: str, mon
                     "products": 0
                 })
 
-            if chat_id in CLIENT_ALLOWED_CHATS.get(account_id, []):
+            if chat_id in CLIENT_ALLOWED_CHATS.get(account_id, frozenset()):
                 try:
-                    reply = generate_reply(chat_id, msg.strip())
-                    await client.send_message(chat_id, reply, reply_to=msg_id)
+                    reply = await asyncio.to_thread(generate_reply, chat_id, msg.strip())
+                    await limiter.call(lambda: client.send_message(chat_id, reply, reply_to=msg_id))
                     logger.info(f"✅ Ответ отправлен от {account_id} в чат {chat_id}")
                 except Exception as e:
                     logger.warning(f"❌ Ошибка при генерации/отправке ответа: {e}")
@@ -0,0 +1,37 @@
+# Строки из прайсов поставщиков (как они приходят в каналы) — общий образец для тестов разбора
+PRICE_LINES = [
+    "iPhone 16 Pro Max 256 Desert 🇺🇸 118500",
+    "iPhone 16 Pro 128 Black Titanium 🇯🇵 99800",
+    "📱 iPhone 15 128 Blue 🇮🇳 61200",
+    "• iPhone 15 Pro 256 Natural 87000🇺🇸",
+    "- iPhone 13 128 Pink 🇭🇰 - 48900",
+    "iPhone 16e 128 White 56300 🇪🇺",
+    "iPad Air 11 M2 128 Wi-Fi Gray 54500",
+    "iPad Pro 13 M4 512 LTE Silver 🇺🇸 158000",
+    "MacBook Air 13 M3 8/256 Midnight 🇺🇸 96500",
+    "MacBook Pro 14 M4 16/512 Space Black 174000",
+    "AirPods Pro 2 USB-C 18900",
+    "AirPods 4 ANC 🇪🇺 14200",
+    "Watch Series 10 46mm Jet Black 🇺🇸 36700",
+    "Watch Ultra 2 Black Titanium Milanese 🇭🇰 78500",
+    "Galaxy S24 Ultra 12/256 Titanium Gray 🇭🇰 92000",
+    "Galaxy A55 8/256 Navy 🇷🇺 31500",
+    "Samsung A35 8/128 Lilac 🇰🇿 23900",
+    "Pixel 9 Pro 16/128 Obsidian 🇺🇸 79900",
+    "Pixel 8a 8/128 Bay 🇯🇵 41500",
+    "Redmi Note 13 Pro 8/256 Black 🇨🇳 21900",
+    "Poco X6 Pro 12/512 Yellow 24800",
+    "Xiaomi 14T Pro 12/512 Titan Gray 🇪🇺 49900",
+    "Mi Band 9 Black 🇨🇳 3200 руб",
+    "OnePlus 12 16/512 Flowy Emerald 🇮🇳 64500",
+    "Realme GT 6 12/256 Silver 🇲🇾 38900",
+    "Nokia 105 4G Charcoal 1500",
+    "🔥 iPhone 16 Pro Max 1TB Natural Titanium 🇦🇪 152000 🔥",
+    "✅ iPhone 14 128 Red 🇹🇭 52500",
+    "ℹ️ iPhone 15 Plus 256 Black 🇰🇷 76000",
+    "iMac 24 M3 8/256 Blue 139900",
+    "Dyson V15 Detect Absolute 🇪🇺 64000",
+    "iPhone 15 Pro 128 White 🇺🇸 82000 / 🇭🇰 83500",
+    "Без цены: iPhone 15 128 Blue",
+    "Доставка по Москве 500",
+]
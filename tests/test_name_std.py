@@ -0,0 +1,61 @@
+import pytest
+
+import tokenizer
+from normalizer import name_std_from_parts
+from price_lines import PRICE_LINES
+from vocabulary import Vocabulary, _default_sources, get_builtin_vocabulary
+
+# name_std, под которыми эти строки уже лежат в products_cleaned: изменение
+# любого из них требует NORMALIZER_VERSION + 1 и rekey
+PINNED = {
+    "iPhone 16 Pro Max 256 Desert 🇺🇸 118500": "apple iphone iphone us",
+    "• iPhone 15 Pro 256 Natural 87000🇺🇸": "apple iphone iphone",
+    "iPad Pro 13 M4 512 LTE Silver 🇺🇸 158000": "apple ipad ipad pro us",
+    "MacBook Air 13 M3 8/256 Midnight 🇺🇸 96500": "apple macbook macbook air us",
+    "AirPods Pro 2 USB-C 18900": "apple airpods airpods pro 2 usbc",
+    "Watch Ultra 2 Black Titanium Milanese 🇭🇰 78500": "apple watch watch ultra 2 hk",
+    "Galaxy S24 Ultra 12/256 Titanium Gray 🇭🇰 92000": "samsung galaxy galaxy s24 ultra hk",
+    "Samsung A35 8/128 Lilac 🇰🇿 23900": "unknown samsung a35 kz",
+    "Redmi Note 13 Pro 8/256 Black 🇨🇳 21900": "redmi redmi redmi note cn",
+    "Xiaomi 14T Pro 12/512 Titan Gray 🇪🇺 49900": "unknown xiaomi eu",
+    "ℹ️ iPhone 15 Plus 256 Black 🇰🇷 76000": "apple iphone iphone kr",
+    "Dyson V15 Detect Absolute 🇪🇺 64000": "unknown dyson v15 detect absolute eu",
+}
+
+
+def _db_vocabulary():
+    # Так выглядят словари после того, как в БД добавили линейки, бренды, цвета и регионы
+    lineups, brands, colors, flag_regions, region_names = _default_sources()
+    lineups.update({"iphone 16 pro": "Apple", "samsung": "Samsung", "xiaomi": "Xiaomi"})
+    brands.update({"Dyson"})
+    colors.update({"desert", "lilac", "titanium gray"})
+    flag_regions["🇨🇭"] = "ch"
+    region_names["гонконг"] = "hk"
+    return Vocabulary(lineups, brands, colors, flag_regions, region_names)
+
+
+def _name_std(line):
+    return name_std_from_parts(*tokenizer.tokenize_line(line).name_key)
+
+
+@pytest.mark.parametrize("line, name_std", PINNED.items())
+def test_name_std_is_pinned(monkeypatch, line, name_std):
+    monkeypatch.setattr(tokenizer, "get_vocabulary", get_builtin_vocabulary)
+    assert _name_std(line) == name_std
+
+
+@pytest.mark.parametrize("line", [line for line in PRICE_LINES if tokenizer.split_price(line)])
+def test_name_std_does_not_depend_on_db_vocabulary(monkeypatch, line):
+    monkeypatch.setattr(tokenizer, "get_vocabulary", get_builtin_vocabulary)
+    builtin = _name_std(line)
+    vocabulary = _db_vocabulary()
+    monkeypatch.setattr(tokenizer, "get_vocabulary", lambda: vocabulary)
+    assert _name_std(line) == builtin
+
+
+def test_db_vocabulary_still_refines_descriptive_fields(monkeypatch):
+    vocabulary = _db_vocabulary()
+    monkeypatch.setattr(tokenizer, "get_vocabulary", lambda: vocabulary)
+    line = tokenizer.tokenize_line("Samsung A35 8/128 Lilac 🇰🇿 23900")
+    assert (line.brand, line.lineup) == ("Samsung", "samsung")
+    assert line.name_key[:2] == ("Unknown", None)
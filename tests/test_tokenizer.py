@@ -0,0 +1,32 @@
+import pytest
+
+import tokenizer
+from bench_tokenizer import legacy_parse_line
+from price_lines import PRICE_LINES
+from vocabulary import Vocabulary, _default_sources
+
+
+@pytest.fixture(autouse=True)
+def builtin_vocabulary(monkeypatch):
+    # Прежний разбор знал только встроенные словари — сравниваем на них, без БД
+    vocabulary = Vocabulary(*_default_sources())
+    monkeypatch.setattr(tokenizer, "get_vocabulary", lambda: vocabulary)
+    return vocabulary
+
+
+@pytest.mark.parametrize("line", PRICE_LINES)
+def test_tokenize_line_matches_legacy_parser(line):
+    old = legacy_parse_line(line)
+    new = tokenizer.tokenize_line(line)
+    if old is None:
+        assert new is None
+        return
+    assert (new.model_text, new.price, new.flag, new.brand, new.lineup, new.model, new.region) == old
+
+
+def test_split_price_uses_first_price_and_removes_all():
+    assert tokenizer.split_price("iPhone 15 Pro 128 White 🇺🇸 82000 / 🇭🇰 83500") == (
+        "iPhone 15 Pro 128 White 🇺🇸  / 🇭🇰", 82000, None
+    )
+    assert tokenizer.split_price("• iPhone 15 Pro 256 Natural 87000🇺🇸") == ("iPhone 15 Pro 256 Natural", 87000, "🇺🇸")
+    assert tokenizer.split_price("Без цены: iPhone 15 128 Blue") is None
@@ -0,0 +1,167 @@
+# tokenizer.py — разбор строки прайса: один проход по строке и один по названию без цены
+
+import re
+from collections import namedtuple
+import emoji
+from vocabulary import get_vocabulary, get_builtin_vocabulary
+
+FLAG_PATTERN = r"[\U0001F1E6-\U0001F1FF]{2}"
+
+# Цена из 5-7 цифр и, возможно, флаг сразу после неё
+_PRICE_RE = re.compile(r"(?P<price>\d{5,7})(?:\s?(?P<flag>" + FLAG_PATTERN + r"))?")
+_MODEL_STOP_RE = re.compile(r"\d{2,4}")
+
+
+def _build_strip_re():
+    # Всё, что не буква/цифра/пробел/-/+, плюс одиночные emoji, которые \w считает буквами
+    # (например, ℹ). Флаги — не \w, поэтому тоже уходят одним проходом.
+    word_like = sorted(
+        ch for ch in emoji.EMOJI_DATA
+        if len(ch) == 1 and not "\U0001F1E6" <= ch <= "\U0001F1FF" and re.match(r"[\w\s\-+]", ch)
+    )
+    pattern = r"[^\w\s\-+]"
+    if word_like:
+        pattern += "|[" + "".join(re.escape(ch) for ch in word_like) + "]"
+    return re.compile(pattern)
+
+
+_STRIP_RE = _build_strip_re()
+# Флаг в названии и удаляемые символы — одним проходом: флаг пробуется первым, чтобы попасть в region_flag целиком
+_SCAN_RE = re.compile(r"(?P<flag>" + FLAG_PATTERN + r")|" + _STRIP_RE.pattern)
+
+KNOWN_LINEUPS = {
+    "iphone": "Apple",
+    "ipad": "Apple",
+    "macbook": "Apple",
+    "airpods": "Apple",
+    "watch": "Apple",
+    "imac": "Apple",
+    "pixel": "Google",
+    "galaxy": "Samsung",
+    "note": "Xiaomi",
+    "redmi": "Redmi",
+    "mi": "Xiaomi",
+    "poco": "Poco",
+    "realme": "Realme",
+    "oneplus": "OnePlus",
+    "nokia": "Nokia",
+}
+
+COLORS = frozenset(["teal", "blue", "black", "white", "natural", "gray", "gold", "pink", "red"])
+
+FLAG_REGIONS = {
+    '🇺🇸': 'us', '🇷🇺': 'ru', '🇪🇺': 'eu', '🇭🇰': 'hk',
+    '🇨🇳': 'cn', '🇰🇿': 'kz', '🇮🇳': 'in', '🇹🇭': 'th',
+    '🇦🇪': 'ae', '🇲🇾': 'my', '🇯🇵': 'jp', '🇰🇷': 'kr'
+}
+
+# model_text — строка без цены; name_tokens — нормализованные токены названия;
+# flag — флаг при цене, region_flag/region — первый флаг в названии и его код;
+# standard_id — эталон, если строка узнана по подтверждённому псевдониму (alias_index);
+# name_key — (brand, lineup, model, region) по встроенным словарям, из него строится name_std.
+# Словари из БД и уточнения NER меняют только описательные поля, name_key остаётся прежним:
+# подтверждённые в /manage-parsing линейки, бренды, цвета и регионы на привязку строки
+# к эталону не влияют — для этого есть псевдонимы (alias_index). Чтобы словари из БД
+# участвовали в name_std, их нужно перенести во встроенные, поднять NORMALIZER_VERSION и пересчитать эталоны
+PriceLine = namedtuple(
+    "PriceLine",
+    "model_text name_tokens price flag region_flag brand lineup model region standard_id name_key",
+    defaults=(None, None)
+)
+
+
+def extract_parts(model_text: str, vocabulary=None):
+    """Бренд, линейка, модель и регион по тексту без цены. Возвращает (tokens, region_flag, brand, lineup, model, region)."""
+    if vocabulary is None:
+        vocabulary = get_vocabulary()
+
+    region_flag = None
+    pieces = []
+    pos = 0
+    for match in _SCAN_RE.finditer(model_text):
+        if region_flag is None and match.group("flag"):
+            region_flag = match.group("flag")
+        pieces.append(model_text[pos:match.start()])
+        pos = match.end()
+    pieces.append(model_text[pos:])
+    tokens = "".join(pieces).lower().split()
+
+    brand = "Unknown"
+    lineup = None
+    model_tokens = []
+    cut = False
+    lineups, colors = vocabulary.lineups, vocabulary.colors
+    lineup_starts, color_starts = lineups.root, colors.root
+    for i, token in enumerate(tokens):
+        if lineup is None and token in lineup_starts:
+            match = lineups.longest(tokens, i)
+            if match:
+                lineup, brand = match[1]
+        if not cut:
+            if _MODEL_STOP_RE.match(token) or (token in color_starts and colors.longest(tokens, i)):
+                cut = True
+            else:
+                model_tokens.append(token)
+        elif lineup is not None:
+            break
+
+    if lineup is None:
+        brand = vocabulary.brands.scan(tokens) or brand
+
+    region = vocabulary.flag_regions.get(region_flag)
+    if region is None:
+        region = vocabulary.region_names.scan(tokens)
+
+    model = " ".join(model_tokens).title()
+    return tokens, region_flag, brand, lineup, model, region
+
+
+def name_key_for(model_text: str) -> tuple:
+    """(brand, lineup, model, region) для name_std — только по встроенным словарям."""
+    return extract_parts(model_text, get_builtin_vocabulary())[2:]
+
+
+def split_price(line: str):
+    """(model_text, price, flag) без разбора названия; None, если в строке нет цены.
+
+    Цена и флаг берутся из первого совпадения, а все совпадения вырезаются из строки — за один проход.
+    """
+    price = flag = None
+    pieces = []
+    pos = 0
+    for match in _PRICE_RE.finditer(line):
+        if price is None:
+            price, flag = int(match.group("price")), match.group("flag")
+        pieces.append(line[pos:match.start()])
+        pos = match.end()
+    if price is None:
+        return None
+    pieces.append(line[pos:])
+    return "".join(pieces).strip("•- "), price, flag
+
+
+def tokenize_line(line: str):
+    """Разбирает одну строку прайса; None, если в строке нет цены."""
+    split = split_price(line)
+    if split is None:
+        return None
+
+    model_text, price, flag = split
+    vocabulary = get_vocabulary()
+    tokens, region_flag, brand, lineup, model, region = extract_parts(model_text, vocabulary)
+    if vocabulary is get_builtin_vocabulary():
+        name_key = (brand, lineup, model, region)
+    else:
+        name_key = name_key_for(model_text)
+    return PriceLine(
+        model_text=model_text,
+        name_tokens=tuple(tokens),
+        price=price,
+        flag=flag,
+        region_flag=region_flag,
+        brand=brand,
+        lineup=lineup,
+        model=model,
+        region=region,
+        name_key=name_key,
+    )
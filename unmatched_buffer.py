@@ -0,0 +1,148 @@
+# unmatched_buffer.py — агрегирование нераспознанных строк в памяти и пакетная запись
+
+import logging
+import threading
+import time
+from datetime import datetime
+from config import UNMATCHED_FLUSH_SECONDS, UNMATCHED_FLUSH_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class UnmatchedBuffer:
+    """
+    Буфер нераспознанных строк, сгруппированных по (raw_name, source_channel).
+
+    Для каждой пары копятся число появлений, первое/последнее время и min/max цены.
+    Сброс в unmatched_models — одним upsert на всю пачку: по таймеру раз в
+    interval секунд, при достижении max_size пар и при остановке процесса.
+    """
+
+    def __init__(self, interval: float = UNMATCHED_FLUSH_SECONDS, max_size: int = UNMATCHED_FLUSH_SIZE):
+        self.interval = interval
+        self.max_size = max(1, max_size)
+        self._items = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"added": 0, "flushes": 0, "flushed_rows": 0, "failed_flushes": 0, "last_flush_ms": None}
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="unmatched-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Останавливает таймер и записывает всё, что осталось в буфере."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def add(self, models: list):
+        """models — словари с raw_name, source_channel, price и необязательными brand, model, region, is_auto."""
+        now = datetime.now()
+        with self._lock:
+            for m in models:
+                key = (m["raw_name"], m["source_channel"])
+                item = self._items.get(key)
+                price = m.get("price")
+                if item is None:
+                    # Первая встреченная строка задаёт распознанные части, как и раньше
+                    self._items[key] = {
+                        "raw_name": m["raw_name"],
+                        "source_channel": m["source_channel"],
+                        "brand": m.get("brand"),
+                        "model": m.get("model"),
+                        "region": m.get("region"),
+                        "is_auto": m.get("is_auto", False),
+                        "price": price,
+                        "count": 1,
+                        "first_seen": now,
+                        "last_seen": now,
+                        "min_price": price,
+                        "max_price": price,
+                    }
+                else:
+                    item["count"] += 1
+                    item["last_seen"] = now
+                    if price is not None:
+                        item["min_price"] = price if item["min_price"] is None else min(item["min_price"], price)
+                        item["max_price"] = price if item["max_price"] is None else max(item["max_price"], price)
+            self.stats["added"] += len(models)
+            full = len(self._items) >= self.max_size
+        if full:
+            self.flush()
+
+    def _merge_back(self, rows: list):
+        # Неудачный сброс: возвращаем строки в буфер, сливая с накопленными за это время
+        with self._lock:
+            for row in rows:
+                key = (row["raw_name"], row["source_channel"])
+                item = self._items.get(key)
+                if item is None:
+                    self._items[key] = row
+                    continue
+                item["count"] += row["count"]
+                item["first_seen"] = min(item["first_seen"], row["first_seen"])
+                for field, pick in (("min_price", min), ("max_price", max)):
+                    values = [v for v in (item[field], row[field]) if v is not None]
+                    item[field] = pick(values) if values else None
+
+    def flush(self) -> int:
+        from database import save_unmatched_models
+
+        with self._flush_lock:
+            with self._lock:
+                rows = list(self._items.values())
+                self._items = {}
+            if not rows:
+                return 0
+
+            started = time.monotonic()
+            try:
+                save_unmatched_models(rows)
+            except Exception as e:
+                logger.warning(f"⚠️ Не удалось записать {len(rows)} нераспознанных строк: {e}")
+                self._merge_back(rows)
+                with self._lock:
+                    self.stats["failed_flushes"] += 1
+                return 0
+
+            with self._lock:
+                self.stats["flushes"] += 1
+                self.stats["flushed_rows"] += len(rows)
+                self.stats["last_flush_ms"] = round((time.monotonic() - started) * 1000, 1)
+            return len(rows)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {"pending": len(self._items), "max_size": self.max_size, "interval_s": self.interval, **self.stats}
+
+
+_unmatched_buffer = None
+
+
+def get_unmatched_buffer() -> UnmatchedBuffer:
+    global _unmatched_buffer
+    if _unmatched_buffer is None:
+        _unmatched_buffer = UnmatchedBuffer()
+        _unmatched_buffer.start()
+    return _unmatched_buffer
+
+
+def get_unmatched_buffer_stats() -> dict:
+    return _unmatched_buffer.get_stats() if _unmatched_buffer is not None else {}
+
+
+def stop_unmatched_buffer():
+    if _unmatched_buffer is not None:
+        _unmatched_buffer.stop()
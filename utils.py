@@ -1,11 +1,11 @@
 import os
-import re
 import asyncio
 import json
 import logging
 from sqlalchemy import text
 from database import get_connection
 from telethon import TelegramClient
+from rate_limiter import disable_flood_sleep
 from datetime import datetime
 from pathlib import Path
 
@@ -16,13 +16,6 @@ MONITORING_LOG_FILE = Path("monitoring_log.json")
 _clients_cache = []
 _clients_lock = asyncio.Lock()
 
-def normalize_model_name(text):
-    text = text.lower()
-    text = re.sub(r"[^a-z0-9 ]", "", text)
-    text = text.replace("gb", "")
-    parts = text.strip().split()
-    return " ".join(sorted(parts))
-
 def get_unique_field_values(field: str) -> list:
     session = get_connection()
     try:
@@ -75,6 +68,29 @@ def log_message(chat_id, user_id, username, text_msg, timestamp, account_id, dir
     finally:
         session.close()
 
+def log_messages(rows: list):
+    """Пакетная запись сообщений: rows — словари с полями log_message."""
+    session = get_connection()
+    try:
+        session.execute(text('''
+            INSERT INTO messages (chat_id, user_id, username, text, timestamp, account_id, direction)
+            VALUES (:chat_id, :user_id, :username, :text, :timestamp, :account_id, :direction)
+        '''), [
+            {
+                "chat_id": row["chat_id"],
+                "user_id": row["user_id"],
+                "username": row["username"],
+                "text": row["text_msg"],
+                "timestamp": row["timestamp"],
+                "account_id": row["account_id"],
+                "direction": row.get("direction", "incoming")
+            }
+            for row in rows
+        ])
+        session.commit()
+    finally:
+        session.close()
+
 def get_recent_dialogue(chat_id: int, limit=10) -> str:
     session = get_connection()
     try:
@@ -135,7 +151,7 @@ async def get_all_clients(client_configs):
 
         for cfg in client_configs:
             session_path = os.path.join(SESSIONS_DIR, f"{cfg['session']}.session")
-            client = TelegramClient(session_path, cfg["api_id"], cfg["api_hash"])
+            client = disable_flood_sleep(TelegramClient(session_path, cfg["api_id"], cfg["api_hash"]))
 
             try:
                 await client.connect()
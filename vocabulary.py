@@ -0,0 +1,171 @@
+# vocabulary.py — словари линеек, брендов, цветов и регионов из БД, собранные в префиксные деревья токенов.
+# Словари из БД заполняют только описательные поля разбора; name_std строится по встроенным (get_builtin_vocabulary)
+
+import logging
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+_END = "\0"  # ключ значения в узле дерева; среди токенов строки его не бывает
+
+# Если БД недоступна, словарь из встроенных значений перепроверяется не чаще раза в минуту
+RETRY_SECONDS = 60
+
+
+def _split(phrase: str) -> list:
+    return phrase.strip().lower().split()
+
+
+class TokenTrie:
+    """Префиксное дерево по токенам: поиск самой длинной фразы, начинающейся с позиции i."""
+
+    def __init__(self, entries=()):
+        # Ключи root — первые токены фраз: проверка token in root отсекает почти все позиции без вызова longest
+        self.root = {}
+        self.size = 0
+        for phrase, value in entries:
+            self.add(phrase, value)
+
+    def add(self, phrase: str, value):
+        tokens = _split(phrase)
+        if not tokens:
+            return
+        node = self.root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        if _END not in node:
+            self.size += 1
+        node[_END] = value
+
+    def longest(self, tokens, i: int):
+        """(конец совпадения, значение) или None."""
+        node = self.root
+        best = None
+        for j in range(i, len(tokens)):
+            node = node.get(tokens[j])
+            if node is None:
+                break
+            if _END in node:
+                best = (j + 1, node[_END])
+        return best
+
+    def scan(self, tokens):
+        """Первое самое длинное совпадение при проходе по строке слева направо."""
+        root = self.root
+        for i, token in enumerate(tokens):
+            if token in root:
+                match = self.longest(tokens, i)
+                if match:
+                    return match[1]
+        return None
+
+
+class Vocabulary:
+    """Скомпилированный неизменяемый набор словарей; заменяется целиком при перезагрузке."""
+
+    def __init__(self, lineups: dict, brands, colors, flag_regions: dict, region_names: dict):
+        # lineup → (lineup, brand); brand → brand; color → color; название региона → код
+        self.lineups = TokenTrie((name, (" ".join(_split(name)), brand)) for name, brand in lineups.items())
+        self.brands = TokenTrie((name, name.strip()) for name in brands)
+        self.colors = TokenTrie((name, name) for name in colors)
+        self.region_names = TokenTrie(region_names.items())
+        self.flag_regions = dict(flag_regions)
+
+    def get_stats(self) -> dict:
+        return {
+            "lineups": self.lineups.size,
+            "brands": self.brands.size,
+            "colors": self.colors.size,
+            "region_flags": len(self.flag_regions),
+            "region_names": self.region_names.size,
+        }
+
+
+def _default_sources():
+    from tokenizer import KNOWN_LINEUPS, COLORS, FLAG_REGIONS
+    return dict(KNOWN_LINEUPS), set(), set(COLORS), dict(FLAG_REGIONS), {}
+
+
+_builtin = None
+
+
+def get_builtin_vocabulary() -> Vocabulary:
+    """Словари только из встроенных значений. По ним строится name_key, поэтому name_std не зависит от БД."""
+    global _builtin
+    if _builtin is None:
+        _builtin = Vocabulary(*_default_sources())
+    return _builtin
+
+
+def _query(sql: str) -> list:
+    from sqlalchemy import text
+    from database import get_session
+    with get_session() as session:
+        return session.execute(text(sql)).fetchall()
+
+
+def _load_from_db() -> Vocabulary:
+    lineups, brands, colors, flag_regions, region_names = _default_sources()
+    for name, brand in _query("SELECT name, brand FROM lineups WHERE name IS NOT NULL"):
+        lineups[name.lower()] = brand or "Unknown"
+    brands.update(name for (name,) in _query("SELECT DISTINCT name FROM brands WHERE name IS NOT NULL"))
+    colors.update(name.lower() for (name,) in _query("SELECT name FROM colors WHERE name IS NOT NULL"))
+    for code, name, flag in _query("SELECT code, name, flag FROM regions WHERE code IS NOT NULL"):
+        if flag:
+            flag_regions[flag] = code
+        # Короткие названия вроде "US"/"IN" совпадают с обычными словами — ищем только по флагу
+        if name and len(name.strip()) > 3:
+            region_names[name] = code
+    return Vocabulary(lineups, brands, colors, flag_regions, region_names)
+
+
+_lock = threading.Lock()
+_vocabulary = None
+_retry_at = 0.0
+
+vocabulary_stats = {
+    "reloads": 0,
+    "loaded_at": None,
+    "source": None,
+}
+
+
+def get_vocabulary() -> Vocabulary:
+    """Текущие словари; загружаются при первом обращении и после invalidate_vocabulary."""
+    global _vocabulary, _retry_at
+    vocabulary = _vocabulary
+    if vocabulary is not None and (vocabulary_stats["source"] == "db" or time.monotonic() < _retry_at):
+        return vocabulary
+
+    with _lock:
+        if _vocabulary is not None and (vocabulary_stats["source"] == "db" or time.monotonic() < _retry_at):
+            return _vocabulary
+        try:
+            _vocabulary = _load_from_db()
+            if vocabulary_stats["source"] == "builtin":
+                # Закэшированные разборы сделаны по встроенным словарям — описательные поля в них неполные
+                from parse_cache import parse_line
+                parse_line.cache_clear()
+            vocabulary_stats["source"] = "db"
+        except Exception as e:
+            logger.warning(f"⚠️ Словари разбора не загружены из БД, используются встроенные: {e}")
+            _vocabulary = get_builtin_vocabulary()
+            vocabulary_stats["source"] = "builtin"
+            _retry_at = time.monotonic() + RETRY_SECONDS
+        vocabulary_stats["reloads"] += 1
+        vocabulary_stats["loaded_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        logger.info(f"📚 Словари разбора собраны: {_vocabulary.get_stats()}")
+        return _vocabulary
+
+
+def invalidate_vocabulary():
+    global _vocabulary
+    with _lock:
+        _vocabulary = None
+
+
+def get_vocabulary_stats() -> dict:
+    vocabulary = _vocabulary
+    return {**vocabulary_stats, **(vocabulary.get_stats() if vocabulary is not None else {})}
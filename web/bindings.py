@@ -2,7 +2,10 @@ from fastapi import APIRouter, Request, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy import text
-from database import get_session
+from database import get_session, save_aliases, delete_aliases
+from product_index import invalidate_product_index
+from alias_index import alias_key, invalidate_alias_index
+from normalizer import normalize_model_name
 
 router = APIRouter()
 templates = Jinja2Templates(directory="web/templates")
@@ -59,14 +62,28 @@ def edit_cleaned(
             "lineup": lineup,
             "model": model,
             "region": region,
-            "name_std": name_std
+            "name_std": normalize_model_name(name_std)
         })
+        # Сохранение привязки — подтверждение всех привязанных к эталону названий
+        linked = session.execute(
+            text("SELECT name FROM products WHERE standard_id = :id AND name IS NOT NULL"),
+            {"id": cleaned_id}
+        ).scalars().all()
+        save_aliases(session, [(alias_key(name), cleaned_id) for name in linked], source="binding")
         session.commit()
+    invalidate_product_index()
+    invalidate_alias_index()
     return RedirectResponse(url="/bindings", status_code=303)
 
 @router.post("/unlink")
 def unlink_product(product_id: int = Form(...)):
     with get_session() as session:
-        session.execute(text("DELETE FROM products WHERE id = :id"), {"id": product_id})
+        unlinked = session.execute(
+            text("DELETE FROM products WHERE id = :id RETURNING name, standard_id"), {"id": product_id}
+        ).first()
+        if unlinked and unlinked.name:
+            delete_aliases(session, [(alias_key(unlinked.name), unlinked.standard_id)])
         session.commit()
+    invalidate_product_index()
+    invalidate_alias_index()
     return RedirectResponse(url="/bindings", status_code=303)
@@ -7,6 +7,7 @@ from pydantic import BaseModel
 from typing import List, Optional
 from sqlalchemy import text
 from database import get_session
+from parse_cache import invalidate_parse_caches
 
 router = APIRouter()
 templates = Jinja2Templates(directory="web/templates")
@@ -174,6 +175,7 @@ def add_brand(name: str = Form(...)):
         )
         session.commit()
         brand_id = result.scalar()
+    invalidate_parse_caches()
     return JSONResponse({"id": brand_id, "name": name})  # <-- важно
 
 @router.post("/catalog/edit/link-brand-to-category")
@@ -200,6 +202,7 @@ def rename_brand(brand_id: int = Form(...), new_name: str = Form(...)):
             {"name": new_name, "id": brand_id}
         )
         session.commit()
+    invalidate_parse_caches()
     return RedirectResponse(url="/catalog/edit", status_code=303)
 
 @router.post("/catalog/edit/delete-brand")
@@ -207,6 +210,7 @@ def delete_brand(brand_id: int = Form(...)):
     with get_session() as session:
         session.execute(text("DELETE FROM brands WHERE id = :id"), {"id": brand_id})
         session.commit()
+    invalidate_parse_caches()
     return RedirectResponse(url="/catalog/edit", status_code=303)
 
 @router.post("/catalog/edit/add-model")
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Request, Form, UploadFile, File, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy import text
 from database import get_session
@@ -50,14 +50,24 @@ def catalog_product_detail(request: Request, product_id: int):
         if not row:
             raise HTTPException(status_code=404, detail="Товар не найден")
 
+        # Текущие предложения — из сводки latest_prices, без обхода истории
+        offers = session.execute(text("""
+            SELECT lp.region, lp.channel, lp.price, lp.previous_price, lp.message_date
+            FROM latest_prices lp
+            JOIN products_cleaned pc ON pc.id = lp.standard_id
+            WHERE pc.catalog_product_id = :id
+            ORDER BY lp.price, lp.message_date DESC
+        """), {"id": product_id}).fetchall()
+
+        # График показывает не больше 30 дней — читаем только свежие секции prices
         prices = session.execute(text("""
-            SELECT pr.price, pr.updated_at
+            SELECT pr.price, pr.message_date AS updated_at
             FROM prices pr
             JOIN products p ON pr.product_id = p.id
-            WHERE p.standard_id = (
-                SELECT pc.id FROM products_cleaned pc WHERE pc.catalog_product_id = :id
-            )
-            ORDER BY pr.updated_at DESC
+            JOIN products_cleaned pc ON pc.id = p.standard_id
+            WHERE pc.catalog_product_id = :id
+              AND pr.message_date >= now() - INTERVAL '30 days'
+            ORDER BY pr.message_date DESC
         """), {"id": product_id}).fetchall()
 
         images = session.execute(text("SELECT url FROM product_images WHERE product_id = :id ORDER BY sort_order, id"), {"id": product_id}).fetchall()
@@ -88,9 +98,52 @@ def catalog_product_detail(request: Request, product_id: int):
             "links": [l.url for l in links]
         },
         "prices": prices,
+        "offers": offers,
         "features": features
     })
 
+@router.get("/catalog/product/{product_id}/price-history")
+def catalog_product_price_history(product_id: int, days: int = 365):
+    """Дневной ряд цен за days дней: сжатая история из price_daily плюс ещё не сжатые сырые цены."""
+    with get_session() as session:
+        rows = session.execute(text("""
+            WITH standards AS (
+                SELECT id FROM products_cleaned WHERE catalog_product_id = :id
+            ),
+            points AS (
+                SELECT pd.day, pd.min_price, pd.max_price, pd.last_price, pd.last_at, pd.count
+                FROM price_daily pd
+                WHERE pd.standard_id IN (SELECT id FROM standards)
+                  AND pd.day >= (now() AT TIME ZONE 'UTC')::date - :days
+                UNION ALL
+                SELECT (pr.message_date AT TIME ZONE 'UTC')::date, pr.price, pr.price, pr.price, pr.message_date, 1
+                FROM prices pr
+                JOIN products p ON p.id = pr.product_id
+                WHERE p.standard_id IN (SELECT id FROM standards)
+                  AND pr.message_date >= now() - make_interval(days => :days)
+                  AND pr.price IS NOT NULL
+            )
+            SELECT day,
+                   MIN(min_price) AS min_price,
+                   MAX(max_price) AS max_price,
+                   (ARRAY_AGG(last_price ORDER BY last_at DESC))[1] AS last_price,
+                   SUM(count) AS count
+            FROM points
+            GROUP BY day
+            ORDER BY day
+        """), {"id": product_id, "days": days}).fetchall()
+
+    return JSONResponse([
+        {
+            "day": row.day.isoformat(),
+            "min": row.min_price,
+            "max": row.max_price,
+            "last": row.last_price,
+            "count": int(row.count)
+        }
+        for row in rows
+    ])
+
 @router.get("/catalog/product/{product_id}/edit", response_class=HTMLResponse)
 def edit_product(request: Request, product_id: int):
     with get_session() as session:
@@ -28,6 +28,8 @@ def submit_response_review(message_id: int = Form(...), is_ok: str = Form(...)):
 async def clear_database(request: Request):
     with get_connection() as conn:
         with conn.cursor() as cur:
+            cur.execute("DELETE FROM latest_prices")
+            cur.execute("DELETE FROM price_daily")
             cur.execute("DELETE FROM prices")
             cur.execute("DELETE FROM products")
             conn.commit()
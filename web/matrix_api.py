@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Request, Form, HTTPException
+from fastapi import APIRouter, Request, Form, HTTPException, Depends
 from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy import text
-from database import get_session
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_connection
+from async_database import get_async_session
+from product_index import invalidate_product_index
+from alias_index import invalidate_alias_index
 from datetime import datetime
 import logging
 
@@ -12,25 +16,23 @@ router = APIRouter()
 templates = Jinja2Templates(directory="web/templates")
 
 @router.get("/matrix", response_class=HTMLResponse)
-def view_matrix(request: Request):
+async def view_matrix(request: Request, session: AsyncSession = Depends(get_async_session)):
     try:
-        with get_session() as session:
-            rows = session.execute(text("""
-                SELECT
-                    pc.id AS cleaned_id,
-                    pc.catalog_product_id AS category,
-                    pc.brand,
-                    pc.lineup,
-                    pc.model,
-                    pc.name_std,
-                    pc.region,
-                    pr.price
-                FROM products_cleaned pc
-                LEFT JOIN products p ON pc.id = p.standard_id
-                LEFT JOIN prices pr ON p.id = pr.product_id
-                WHERE p.approved = true
-                ORDER BY pc.catalog_product_id, pc.brand, pc.model, pc.region, pr.price
-            """)).fetchall()
+        rows = (await session.execute(text("""
+            SELECT
+                pc.id AS cleaned_id,
+                pc.catalog_product_id AS category,
+                pc.brand,
+                pc.lineup,
+                pc.model,
+                pc.name_std,
+                pc.region,
+                lp.price
+            FROM products_cleaned pc
+            LEFT JOIN latest_prices lp ON lp.standard_id = pc.id
+            WHERE EXISTS (SELECT 1 FROM products p WHERE p.standard_id = pc.id AND p.approved = true)
+            ORDER BY pc.catalog_product_id, pc.brand, pc.model, pc.region, lp.price
+        """))).fetchall()
 
         tree = {}
 
@@ -93,7 +95,7 @@ def view_matrix(request: Request):
 
 @router.post("/matrix/unlink")
 def unlink_product(cleaned_id: int = Form(...)):
-    session = get_session()
+    session = get_connection()
     try:
         row = session.execute(text("""
             SELECT name_std, brand, model, region
@@ -114,6 +116,7 @@ def unlink_product(cleaned_id: int = Form(...)):
             ) VALUES (
                 :raw_name, 'manual_unlinked', :now, 0, :brand, :model, :region, TRUE
             )
+            ON CONFLICT (raw_name, (COALESCE(source_channel, ''))) DO NOTHING
         """), {
             "raw_name": row.name_std,
             "now": datetime.now().isoformat(),
@@ -123,6 +126,8 @@ def unlink_product(cleaned_id: int = Form(...)):
         })
 
         session.commit()
+        invalidate_product_index()
+        invalidate_alias_index()
     except Exception:
         session.rollback()
         raise
@@ -133,7 +138,7 @@ def unlink_product(cleaned_id: int = Form(...)):
 
 @router.get("/admin/clean-products")
 def clean_invalid_cleaned_products():
-    session = get_session()
+    session = get_connection()
     try:
         dangling = session.execute(text("""
             SELECT pc.id FROM products_cleaned pc
@@ -154,6 +159,9 @@ def clean_invalid_cleaned_products():
             )
 
         session.commit()
+        if cleaned_ids:
+            invalidate_product_index()
+            invalidate_alias_index()
         return JSONResponse({"ok": True, "deleted": len(cleaned_ids)})
     except Exception as e:
         session.rollback()
@@ -10,6 +10,21 @@ from utils import log_monitoring_result, MONITORING_LOG_FILE
 from config import client_configs
 from telethon_client import get_all_clients
 from database import get_allowed_sources
+from product_index import get_index_stats
+from alias_index import get_alias_stats
+from parse_cache import get_parse_cache_stats
+from vocabulary import get_vocabulary_stats
+from exclusion_filter import get_filter_stats
+from ner_stage import get_ner_stats
+from resources import get_resource_stats
+from rekey import get_rekey_stats
+from partitions import get_partition_stats
+from compaction import get_compaction_stats
+from async_database import get_async_pool_stats
+from ingest_queue import get_ingest_stats
+from unmatched_buffer import get_unmatched_buffer_stats
+from rate_limiter import get_limiter_stats
+from telethon_client import processed_messages
 
 router = APIRouter()
 templates = Jinja2Templates(directory="web/templates")
@@ -17,6 +32,26 @@ logger = logging.getLogger(__name__)
 
 MONITORING_STATUS_FILE = Path("monitoring_status.json")
 
+def get_runtime_stats() -> dict:
+    """Счётчики внутренних кэшей и очередей процесса для страницы мониторинга."""
+    return {
+        "Псевдонимы": get_alias_stats(),
+        "Индекс товаров": get_index_stats(),
+        "Кэш разбора строк": get_parse_cache_stats(),
+        "Словари разбора": get_vocabulary_stats(),
+        "Фильтр исключений": get_filter_stats(),
+        "NER-разбор": get_ner_stats(),
+        "Пересчёт name_std": get_rekey_stats(),
+        "Секции цен": get_partition_stats(),
+        "Сжатие истории цен": get_compaction_stats(),
+        "Пул async-соединений": get_async_pool_stats(),
+        "Очередь загрузки": get_ingest_stats(),
+        "Буфер нераспознанных строк": get_unmatched_buffer_stats(),
+        "Дедупликация live-сообщений": processed_messages.get_stats(),
+        **{f"Ресурс {name}": stats for name, stats in get_resource_stats().items()},
+        **{f"Лимитер Telegram ({account_id})": stats for account_id, stats in get_limiter_stats().items()},
+    }
+
 def schedule_periodic_parsing(interval_minutes: int = 60):
     async def periodic():
         while True:
@@ -44,8 +79,8 @@ def schedule_periodic_parsing(interval_minutes: int = 60):
     asyncio.create_task(periodic())
 
 @router.get("/monitoring/run-parser", response_class=HTMLResponse)
-async def run_monitoring_ui(request: Request):
-    stats = await parse_all_channels(manual=True)
+async def run_monitoring_ui(request: Request, full: bool = False):
+    stats = await parse_all_channels(manual=True, full_backfill=full)
 
     formatted_stats = {}
     detailed_stats = {}
@@ -66,11 +101,11 @@ async def run_monitoring_ui(request: Request):
     })
 
 @router.post("/monitoring/run-parser")
-async def run_monitoring():
+async def run_monitoring(full: bool = False):
     async def wrapper():
-        logger.info("🧪 [POST] Ручной запуск parse_all_channels()")
+        logger.info(f"🧪 [POST] Ручной запуск parse_all_channels() (full_backfill={full})")
         try:
-            stats = await parse_all_channels(manual=True)
+            stats = await parse_all_channels(manual=True, full_backfill=full)
             for label, result in stats.items():
                 log_monitoring_result(
                     channels=result.get("channels", 0),
@@ -128,4 +163,9 @@ async def monitoring_page(request: Request):
         "request": request,
         "monitoring_enabled": monitoring_enabled,
         "history": history[-20:][::-1],
+        "runtime_stats": get_runtime_stats(),
     })
+
+@router.get("/monitoring/runtime")
+async def monitoring_runtime():
+    return JSONResponse(content=get_runtime_stats())
@@ -1,8 +1,12 @@
+import asyncio
 from fastapi import APIRouter, Request, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy import text
 from database import get_connection
+from parse_cache import invalidate_parse_caches
+from exclusion_filter import invalidate_exclusion_filter
+from rekey import run_rekey, get_rekey_stats
 
 router = APIRouter()
 templates = Jinja2Templates(directory="web/templates")
@@ -13,6 +17,8 @@ def manage_parsing_view(request: Request):
     try:
         lineups = session.execute(text("SELECT name FROM unknown_lineups ORDER BY name")).fetchall()
         exclusions = session.execute(text("SELECT phrase FROM exclusion_phrases ORDER BY phrase")).fetchall()
+        excluded_lines = session.execute(text("SELECT line_key FROM excluded_lines ORDER BY line_key")).fetchall()
+        colors = session.execute(text("SELECT name FROM colors ORDER BY name")).fetchall()
         unmatched = session.execute(text("""
             SELECT id, raw_name, price, source_channel, brand, model, region 
             FROM unmatched_models ORDER BY id DESC LIMIT 50
@@ -22,7 +28,10 @@ def manage_parsing_view(request: Request):
             "request": request,
             "lineups": [l[0] for l in lineups],
             "exclusions": [e[0] for e in exclusions],
-            "unmatched": unmatched
+            "excluded_lines": [e[0] for e in excluded_lines],
+            "colors": [c[0] for c in colors],
+            "unmatched": unmatched,
+            "rekey": get_rekey_stats()
         })
     finally:
         session.close()
@@ -33,6 +42,7 @@ def add_exclusion(phrase: str = Form(...)):
     session.execute(text("INSERT INTO exclusion_phrases (phrase) VALUES (:phrase) ON CONFLICT DO NOTHING"), {"phrase": phrase})
     session.commit()
     session.close()
+    invalidate_exclusion_filter()
     return RedirectResponse("/manage-parsing", status_code=303)
 
 @router.post("/manage-parsing/delete-exclusion")
@@ -41,13 +51,60 @@ def delete_exclusion(phrase: str = Form(...)):
     session.execute(text("DELETE FROM exclusion_phrases WHERE phrase = :phrase"), {"phrase": phrase})
     session.commit()
     session.close()
+    invalidate_exclusion_filter()
+    return RedirectResponse("/manage-parsing", status_code=303)
+
+@router.post("/manage-parsing/delete-excluded-line")
+def delete_excluded_line(line_key: str = Form(...)):
+    session = get_connection()
+    session.execute(text("DELETE FROM excluded_lines WHERE line_key = :line_key"), {"line_key": line_key})
+    session.commit()
+    session.close()
+    invalidate_exclusion_filter()
     return RedirectResponse("/manage-parsing", status_code=303)
 
 @router.post("/manage-parsing/confirm-lineup")
 def confirm_lineup(name: str = Form(...), brand: str = Form(...)):
+    # Линейка попадает в описательные поля разбора (brand/lineup нераспознанных строк),
+    # но не в name_std: привязку строки к эталону она не меняет
     session = get_connection()
     session.execute(text("INSERT INTO lineups (name, brand) VALUES (:name, :brand) ON CONFLICT DO NOTHING"), {"name": name, "brand": brand})
     session.execute(text("DELETE FROM unknown_lineups WHERE name = :name"), {"name": name})
     session.commit()
     session.close()
+    invalidate_parse_caches()
+    return RedirectResponse("/manage-parsing", status_code=303)
+
+@router.post("/manage-parsing/add-color")
+def add_color(name: str = Form(...)):
+    session = get_connection()
+    session.execute(text("INSERT INTO colors (name) VALUES (:name) ON CONFLICT DO NOTHING"), {"name": name.strip().lower()})
+    session.commit()
+    session.close()
+    invalidate_parse_caches()
+    return RedirectResponse("/manage-parsing", status_code=303)
+
+@router.post("/manage-parsing/delete-color")
+def delete_color(name: str = Form(...)):
+    session = get_connection()
+    session.execute(text("DELETE FROM colors WHERE name = :name"), {"name": name})
+    session.commit()
+    session.close()
+    invalidate_parse_caches()
+    return RedirectResponse("/manage-parsing", status_code=303)
+
+@router.post("/manage-parsing/rekey-plan")
+async def plan_rekey(force: bool = Form(False)):
+    # Пробный проход без записи: план слияний появится на этой же странице
+    if not get_rekey_stats()["running"]:
+        asyncio.create_task(asyncio.to_thread(run_rekey, force=force, dry_run=True))
+    return RedirectResponse("/manage-parsing", status_code=303)
+
+@router.post("/manage-parsing/rekey")
+async def rekey_name_std(force: bool = Form(False)):
+    # Запись — только после просмотренного плана для текущей версии правил
+    stats = get_rekey_stats()
+    plan = stats["plan"]
+    if not stats["running"] and plan and plan["dry_run"] and plan["version"] == stats["normalizer_version"]:
+        asyncio.create_task(asyncio.to_thread(run_rekey, force=force))
     return RedirectResponse("/manage-parsing", status_code=303)
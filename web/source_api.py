@@ -17,6 +17,7 @@ from config import (
 from contextlib import suppress
 from asyncio import TimeoutError
 from shutil import copyfile
+from rate_limiter import get_limiter, disable_flood_sleep
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -49,6 +50,34 @@ def list_sources(request: Request, status: str = ""):
 
 from typing import Optional
 
+# Синхронные запросы к БД для async-маршрутов: вызываются через asyncio.to_thread,
+# чтобы не блокировать event loop, где крутятся клиенты Telethon
+def _fetch_sources():
+    with get_session() as session:
+        return session.execute(
+            text("SELECT id, name, type, monitored, channel_id FROM source_ids ORDER BY type, name")
+        ).fetchall()
+
+def _source_exists(name: str) -> bool:
+    with get_session() as session:
+        return session.execute(text("SELECT id FROM source_ids WHERE name = :name"), {"name": name}).fetchone() is not None
+
+def _insert_source(name: str, type_: str, monitored: bool, channel_id: int, account_id: str):
+    with get_session() as session:
+        added = session.execute(text("""
+            INSERT INTO source_ids (name, type, monitored, channel_id, account_id)
+            VALUES (:name, :type, :monitored, :channel_id, :account_id)
+            RETURNING id
+        """), {
+            "name": name,
+            "type": type_,
+            "monitored": monitored,
+            "channel_id": channel_id,
+            "account_id": account_id
+        }).scalar()
+        session.commit()
+        return added
+
 @router.post("/form", response_class=HTMLResponse)
 async def add_source_form(
     request: Request,
@@ -65,10 +94,7 @@ async def add_source_form(
         return RedirectResponse(url="/sources/?status=notfound", status_code=303)
 
     if len(matches) > 1:
-        with get_session() as session:
-            sources = session.execute(
-                text("SELECT id, name, type, monitored, channel_id FROM source_ids ORDER BY type, name")
-            ).fetchall()
+        sources = await asyncio.to_thread(_fetch_sources)
         return templates.TemplateResponse("sources.html", {
             "request": request,
             "status": "match",
@@ -80,53 +106,36 @@ async def add_source_form(
 
     selected = matches[0]
     try:
-        with get_session() as session:
-            existing = session.execute(
-                text("SELECT id FROM source_ids WHERE name = :name"),
-                {"name": name}
-            ).fetchone()
-            if existing:
-                logger.warning("⚠️ Источник уже существует")
-                return RedirectResponse(url="/sources/?status=exists", status_code=303)
-
-            entity_type = selected["type"]
-
-            if entity_type == "channel":
-                final_type = "channel"
-            elif entity_type == "chat":
-                client = TelegramClient("sessions/temp_check", API_ID_1, API_HASH_1)
-                await client.start()
-                messages = [msg async for msg in client.iter_messages(selected["id"], limit=10)]
-                await client.disconnect()
-                found_keyword = any(
-                    any(kw in (m.text or "").lower() for kw in KEYWORDS_MESSAGES)
-                    for m in messages if hasattr(m, "text")
-                )
-                final_type = "chat_messages" if found_keyword else "chat_prices"
-            else:
-                final_type = entity_type
-
-            session.execute(text("""
-                INSERT INTO source_ids (name, type, monitored, channel_id, account_id)
-                VALUES (:name, :type, :monitored, :channel_id, :account_id)
-            """), {
-                "name": name,
-                "type": final_type,
-                "monitored": monitored_bool,
-                "channel_id": selected["id"],
-                "account_id": selected["account_id"]
-            })
-            session.commit()
-
-            added = session.execute(
-                text("SELECT id FROM source_ids WHERE name = :name ORDER BY id DESC LIMIT 1"),
-                {"name": name}
-            ).fetchone()
-            if not added:
-                logger.error("❌ Ошибка вставки источника")
-                return RedirectResponse(url="/sources/?status=fail", status_code=303)
+        if await asyncio.to_thread(_source_exists, name):
+            logger.warning("⚠️ Источник уже существует")
+            return RedirectResponse(url="/sources/?status=exists", status_code=303)
+
+        entity_type = selected["type"]
+
+        if entity_type == "channel":
+            final_type = "channel"
+        elif entity_type == "chat":
+            client = disable_flood_sleep(TelegramClient("sessions/temp_check", API_ID_1, API_HASH_1))
+            await client.start()
+            limiter = get_limiter(ACCOUNT_LABEL_1)
+            messages = [msg async for msg in limiter.iter_messages(client, selected["id"], limit=10)]
+            await client.disconnect()
+            found_keyword = any(
+                any(kw in (m.text or "").lower() for kw in KEYWORDS_MESSAGES)
+                for m in messages if hasattr(m, "text")
+            )
+            final_type = "chat_messages" if found_keyword else "chat_prices"
+        else:
+            final_type = entity_type
+
+        added = await asyncio.to_thread(
+            _insert_source, name, final_type, monitored_bool, selected["id"], selected["account_id"]
+        )
+        if not added:
+            logger.error("❌ Ошибка вставки источника")
+            return RedirectResponse(url="/sources/?status=fail", status_code=303)
 
-            logger.info(f"✅ Источник добавлен с id={added[0]}, channel_id={selected['id']}")
+        logger.info(f"✅ Источник добавлен с id={added}, channel_id={selected['id']}")
         return RedirectResponse(url="/sources/?status=ok", status_code=303)
     except Exception as e:
         logger.exception("🔥 Исключение при добавлении источника")
@@ -174,24 +183,12 @@ def add_if_not_exists(source: SourceIn):
         return {"ok": True, "exists": False, "id": added[0]}
 
 @router.post("/confirm-source")
-async def confirm_source(request: Request, name: str = Form(...), type: str = Form(...), channel_id: int = Form(...), account_id: str = Form(...), monitored: Optional[str] = Form("on")):
+def confirm_source(request: Request, name: str = Form(...), type: str = Form(...), channel_id: int = Form(...), account_id: str = Form(...), monitored: Optional[str] = Form("on")):
     monitored_bool = monitored == "on"
     try:
-        with get_session() as session:
-            existing = session.execute(text("SELECT id FROM source_ids WHERE name = :name"), {"name": name}).fetchone()
-            if existing:
-                return RedirectResponse(url="/sources/?status=exists", status_code=303)
-            session.execute(text("""
-                INSERT INTO source_ids (name, type, monitored, channel_id, account_id)
-                VALUES (:name, :type, :monitored, :channel_id, :account_id)
-            """), {
-                "name": name,
-                "type": type,
-                "monitored": monitored_bool,
-                "channel_id": channel_id,
-                "account_id": account_id
-            })
-            session.commit()
+        if _source_exists(name):
+            return RedirectResponse(url="/sources/?status=exists", status_code=303)
+        _insert_source(name, type, monitored_bool, channel_id, account_id)
     except Exception as e:
         logger.exception("🔥 Ошибка при подтверждении источника")
         return RedirectResponse(url="/sources/?status=error", status_code=303)
@@ -231,7 +228,7 @@ async def search_dialogs(api_id, api_hash, session_name, account_label, title: s
     logger.info(f"🔍 [search_dialogs] account_label={account_label} session_path={temp_session_path}")
 
     matches = []
-    client = TelegramClient(temp_session_path, api_id, api_hash)
+    client = disable_flood_sleep(TelegramClient(temp_session_path, api_id, api_hash))
 
     try:
         await asyncio.wait_for(client.connect(), timeout=15)
@@ -250,7 +247,7 @@ async def search_dialogs(api_id, api_hash, session_name, account_label, title: s
     found = 0
     title_clean = title.strip().lower()
 
-    async for dialog in client.iter_dialogs(limit=300):
+    async for dialog in get_limiter(account_label).iter_dialogs(client, limit=300):
         count += 1
         if not dialog.name:
             continue
@@ -1,9 +1,16 @@
-from fastapi import APIRouter, Request, Form, HTTPException
+from fastapi import APIRouter, Request, Form, HTTPException, Depends
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy import text
-from database import get_session
-from normalizer import normalize_model_name
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_session, save_aliases, upsert_latest_prices
+from async_database import get_async_session
+from product_index import invalidate_product_index
+from alias_index import alias_key, invalidate_alias_index
+from parse_cache import invalidate_parse_caches
+from exclusion_filter import invalidate_exclusion_filter
+from normalizer import name_std_from_parts
+from tokenizer import name_key_for
 from typing import Optional
 import asyncio
 
@@ -11,28 +18,29 @@ router = APIRouter()
 templates = Jinja2Templates(directory="web/templates")
 
 @router.get("/", response_class=HTMLResponse)
-async def view_unknowns(request: Request, page: int = 1):
+async def view_unknowns(request: Request, page: int = 1, session: AsyncSession = Depends(get_async_session)):
     limit = 50
     offset = (page - 1) * limit
 
-    with get_session() as session:
-        total = session.execute(text("SELECT COUNT(*) FROM unmatched_models")).scalar()
+    total = (await session.execute(text("SELECT COUNT(*) FROM unmatched_models"))).scalar()
 
-        unknowns = session.execute(text("""
-            SELECT id, raw_name, detected_region, region_flag FROM unmatched_models 
-            ORDER BY first_seen DESC
-            LIMIT :limit OFFSET :offset
-        """), {"limit": limit, "offset": offset}).mappings().all()
+    unknowns = (await session.execute(text("""
+        SELECT id, raw_name, detected_region, region_flag,
+               source_channel, occurrences, last_seen, min_price, max_price
+        FROM unmatched_models
+        ORDER BY first_seen DESC
+        LIMIT :limit OFFSET :offset
+    """), {"limit": limit, "offset": offset})).mappings().all()
 
-        products = session.execute(text("""
-            SELECT id, name FROM catalog_products ORDER BY name
-        """)).fetchall()
-        model_map = {row[0]: row[1] for row in products}
+    products = (await session.execute(text("""
+        SELECT id, name FROM catalog_products ORDER BY name
+    """))).fetchall()
+    model_map = {row[0]: row[1] for row in products}
 
-        categories = session.execute(text("SELECT id, name FROM categories ORDER BY name")).fetchall()
-        brands = session.execute(text("SELECT name FROM brands ORDER BY name")).fetchall()
-        models = session.execute(text("SELECT name FROM models ORDER BY name")).fetchall()
-        regions = session.execute(text("SELECT code, name, flag FROM regions ORDER BY name")).fetchall()
+    categories = (await session.execute(text("SELECT id, name FROM categories ORDER BY name"))).fetchall()
+    brands = (await session.execute(text("SELECT name FROM brands ORDER BY name"))).fetchall()
+    models = (await session.execute(text("SELECT name FROM models ORDER BY name"))).fetchall()
+    regions = (await session.execute(text("SELECT code, name, flag FROM regions ORDER BY name"))).fetchall()
 
     total_pages = max(1, (total + limit - 1) // limit)
 
@@ -64,6 +72,14 @@ async def approve_unknown(
             uid, mid = part.split(":")
             model_map[int(uid)] = int(mid)
 
+    # Форма читается асинхронно, а запись в БД — синхронная, в потоке, чтобы не держать event loop
+    await asyncio.to_thread(_approve_unknowns, approved, model_map, form_data)
+    return RedirectResponse("/unknowns", status_code=303)
+
+
+def _approve_unknowns(approved: list, model_map: dict, form_data):
+    vocabulary_changed = False
+    aliases = []
     with get_session() as session:
         for uid in approved:
             uid_int = int(uid)
@@ -83,36 +99,56 @@ async def approve_unknown(
                         text("INSERT INTO regions (code, name) VALUES (:code, :name)"),
                         {"code": region_code, "name": region_code.upper()}
                     )
+                    vocabulary_changed = True
 
             # Обновляем запись
-            session.execute(
+            raw_name = session.execute(
                 text("""
                     UPDATE unmatched_models
                     SET is_approved = true,
                         model_id = :mid,
                         detected_region = :region
                     WHERE id = :uid
+                    RETURNING raw_name
                 """),
                 {"uid": uid_int, "mid": model_id, "region": region_code or None}
-            )
+            ).scalar()
 
+            # Псевдоним — только если у выбранного товара каталога есть эталон того же региона:
+            # иначе строка с одним флагом навсегда привязалась бы к цене другого региона
+            if raw_name and model_id:
+                standard_id = session.execute(
+                    text("""
+                        SELECT id FROM products_cleaned
+                        WHERE catalog_product_id = :mid AND region IS NOT DISTINCT FROM :region
+                        ORDER BY id
+                        LIMIT 1
+                    """),
+                    {"mid": model_id, "region": region_code or None}
+                ).scalar()
+                if standard_id:
+                    aliases.append((alias_key(raw_name), standard_id))
+
+        save_aliases(session, aliases, source="approve")
         session.commit()
 
-    return RedirectResponse("/unknowns", status_code=303)
+    if aliases:
+        invalidate_alias_index()
+    if vocabulary_changed:
+        invalidate_parse_caches()
 
 
 @router.get("/api/catalog/search")
-async def search_catalog_models(q: str):
-    with get_session() as session:
-        rows = session.execute(text("""
-            SELECT id, name FROM catalog_products
-            WHERE LOWER(name) LIKE :term
-            ORDER BY name LIMIT 10
-        """), {"term": f"%{q.lower()}%"}).fetchall()
-        return [{"id": row.id, "name": row.name} for row in rows]
+async def search_catalog_models(q: str, session: AsyncSession = Depends(get_async_session)):
+    rows = (await session.execute(text("""
+        SELECT id, name FROM catalog_products
+        WHERE LOWER(name) LIKE :term
+        ORDER BY name LIMIT 10
+    """), {"term": f"%{q.lower()}%"})).fetchall()
+    return [{"id": row.id, "name": row.name} for row in rows]
 
 @router.post("/reset-processed")
-async def reset_processed_channels():
+def reset_processed_channels():
     with get_session() as session:
         session.execute(text("TRUNCATE TABLE processed_channels"))
         session.commit()
@@ -128,9 +164,9 @@ def create_and_confirm_product(
     product_name: str = Form(...),
     region_code: Optional[str] = Form(None)
 ):
-    from normalizer import normalize_model_name
-    from datetime import datetime
+    from datetime import datetime, timezone
 
+    vocabulary_changed = False
     try:
         with get_session() as session:
             # 1. Получаем строку из unmatched_models
@@ -150,6 +186,7 @@ def create_and_confirm_product(
                 text("INSERT INTO brands (name, category_id) VALUES (:name, :cat_id) RETURNING id"),
                 {"name": brand_name, "cat_id": category_id}
             ).scalar()
+            vocabulary_changed = vocabulary_changed or brand is None  # новый бренд — тоже словарь разбора
 
             # 3. Получаем или создаём модель
             model = session.execute(
@@ -179,9 +216,10 @@ def create_and_confirm_product(
                         text("INSERT INTO regions (code, name) VALUES (:code, :name)"),
                         {"code": region, "name": region.upper()}
                     )
+                    vocabulary_changed = True
 
-            # 6. Строим name_std
-            name_std = normalize_model_name(f"{brand_name} {model_name} {unmatched.detected_model or ''} {region or ''}")
+            # 6. name_std — так же, как его посчитает парсер для этой строки
+            name_std = name_std_from_parts(*name_key_for(unmatched.raw_name))
 
             # 7. Добавляем в products_cleaned
             session.execute(
@@ -204,14 +242,16 @@ def create_and_confirm_product(
                 text("""
                     INSERT INTO products (name, standard_id, approved)
                     VALUES (:name, (SELECT id FROM products_cleaned WHERE name_std = :name_std), TRUE)
+                    ON CONFLICT (standard_id, name) DO NOTHING
                 """),
                 {"name": unmatched.raw_name, "name_std": name_std}
             )
 
             # 🔥 9. Добавляем в prices
+            now = datetime.now(timezone.utc)
             session.execute(
                 text("""
-                    INSERT INTO prices (product_id, price, updated_at)
+                    INSERT INTO prices (product_id, price, message_date)
                     VALUES (
                         (SELECT id FROM products WHERE name = :name AND standard_id = (SELECT id FROM products_cleaned WHERE name_std = :name_std)),
                         :price,
@@ -222,17 +262,30 @@ def create_and_confirm_product(
                     "name": unmatched.raw_name,
                     "name_std": name_std,
                     "price": unmatched.sample_price or 0,
-                    "now": datetime.now().isoformat()
+                    "now": now
                 }
             )
 
-            # 10. Удаляем из unmatched_models
+            # 10. Запоминаем сырое название как псевдоним нового эталона
+            standard_id = session.execute(
+                text("SELECT id FROM products_cleaned WHERE name_std = :name_std"),
+                {"name_std": name_std}
+            ).scalar()
+            save_aliases(session, [(alias_key(unmatched.raw_name), standard_id)], source="create")
+            if unmatched.sample_price:
+                upsert_latest_prices(session, [(standard_id, unmatched.source_channel, unmatched.sample_price, None, now)])
+
+            # 11. Удаляем из unmatched_models
             session.execute(
                 text("DELETE FROM unmatched_models WHERE id = :id"),
                 {"id": unmatched_id}
             )
 
             session.commit()
+            invalidate_product_index()
+            invalidate_alias_index()
+            if vocabulary_changed:
+                invalidate_parse_caches()
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка при подтверждении: {e}")
@@ -244,26 +297,21 @@ def create_and_confirm_product(
 def exclude_unmatched(request: Request, unmatched_id: int = Form(...)):
     try:
         with get_session() as session:
-            # Получаем raw_text
+            # Получаем raw_name
             raw = session.execute(
-                text("SELECT raw_text FROM unmatched_models WHERE id = :id"),
+                text("SELECT raw_name FROM unmatched_models WHERE id = :id"),
                 {"id": unmatched_id}
             ).scalar()
 
             if not raw:
                 raise HTTPException(status_code=404, detail="Не найдено")
 
-            # Проверяем — нет ли уже такой фразы в исключениях
-            exists = session.execute(
-                text("SELECT 1 FROM exclusion_phrases WHERE phrase = :raw"),
-                {"raw": raw}
-            ).first()
-
-            if not exists:
-                session.execute(
-                    text("INSERT INTO exclusion_phrases (phrase) VALUES (:raw)"),
-                    {"raw": raw}
-                )
+            # Исключается именно эта строка целиком: как фраза она отсекала бы
+            # и более длинные корректные строки, которые её содержат
+            session.execute(
+                text("INSERT INTO excluded_lines (line_key) VALUES (:key) ON CONFLICT (line_key) DO NOTHING"),
+                {"key": alias_key(raw)}
+            )
 
             # Удаляем из unmatched_models
             session.execute(
@@ -272,6 +320,7 @@ def exclude_unmatched(request: Request, unmatched_id: int = Form(...)):
             )
 
             session.commit()
+            invalidate_exclusion_filter()
             return RedirectResponse("/unknowns", status_code=303)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -279,7 +328,7 @@ def exclude_unmatched(request: Request, unmatched_id: int = Form(...)):
 
 
 @router.post("/clear-unmatched")
-async def clear_unmatched_models():
+def clear_unmatched_models():
     print("🧹 Очищаю unmatched_models")  # Лог для проверки, вызывается ли функция
 
     with get_session() as session:
@@ -289,27 +338,31 @@ async def clear_unmatched_models():
     return RedirectResponse(url="/unknowns", status_code=303)
 
 @router.get("/api/rows", response_class=HTMLResponse)
-async def load_unknowns_rows(request: Request, page: int = 1):
+async def load_unknowns_rows(request: Request, page: int = 1, session: AsyncSession = Depends(get_async_session)):
     limit = 50
     offset = (page - 1) * limit
 
-    with get_session() as session:
-        unknowns = session.execute(text("""
-            SELECT 
-                um.id,
-                um.raw_name,
-                um.detected_region,
-                r.flag AS region_flag
-            FROM unmatched_models um
-            LEFT JOIN regions r ON r.code = um.detected_region
-            ORDER BY um.first_seen DESC
-            LIMIT :limit OFFSET :offset
-        """), {"limit": limit, "offset": offset}).mappings().all()
-
-        products = session.execute(text("SELECT id, name FROM catalog_products ORDER BY name")).fetchall()
-        model_map = {row[0]: row[1] for row in products}
-
-        regions = session.execute(text("SELECT code, name, flag FROM regions ORDER BY name")).fetchall()
+    unknowns = (await session.execute(text("""
+        SELECT 
+            um.id,
+            um.raw_name,
+            um.detected_region,
+            r.flag AS region_flag,
+            um.source_channel,
+            um.occurrences,
+            um.last_seen,
+            um.min_price,
+            um.max_price
+        FROM unmatched_models um
+        LEFT JOIN regions r ON r.code = um.detected_region
+        ORDER BY um.first_seen DESC
+        LIMIT :limit OFFSET :offset
+    """), {"limit": limit, "offset": offset})).mappings().all()
+
+    products = (await session.execute(text("SELECT id, name FROM catalog_products ORDER BY name"))).fetchall()
+    model_map = {row[0]: row[1] for row in products}
+
+    regions = (await session.execute(text("SELECT code, name, flag FROM regions ORDER BY name"))).fetchall()
 
     return templates.TemplateResponse("partials/unknowns_rows.html", {
         "request": request,